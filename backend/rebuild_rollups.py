@@ -0,0 +1,18 @@
+"""
+Rebuild script for Civil ERP - Recomputes project_rollups from billings, CVRs, POs and attendance
+Run: python rebuild_rollups.py
+"""
+import asyncio
+
+from server import client, rebuild_project_rollups
+
+
+async def rebuild():
+    print("Rebuilding project rollups...")
+    result = await rebuild_project_rollups()
+    print(f"Rebuilt {result['projects']} project rollup(s), removed {result['removed']} stale")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
@@ -1,10 +1,15 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Form, Query, Request, Response
+from fastapi.routing import APIRoute
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring, UpdateOne, ReplaceOne, ReturnDocument, ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from bson import json_util as bson_json
 import os
+import asyncio
 import logging
 import httpx
 import hashlib
@@ -17,9 +22,21 @@ import cloudinary.uploader
 from io import BytesIO
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable
 import uuid
+import time
+import threading
+import queue
+import pickle
+import tempfile
+import multiprocessing
+import calendar
+import numpy as np
 from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import lru_cache, partial, wraps
+from collections import OrderedDict, deque
+from contextvars import ContextVar
 import jwt
 from passlib.context import CryptContext
 from cryptography.fernet import Fernet
@@ -29,9 +46,115 @@ import xmltodict
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# ==================== QUERY MONITORING ====================
+# A pymongo CommandListener attributes every Mongo command to the HTTP route that
+# issued it (Motor copies contextvars into its executor threads), keeps running
+# per-route totals and a ring buffer of slow commands.
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+SLOW_QUERY_LOG_SIZE = int(os.environ.get('SLOW_QUERY_LOG_SIZE', '200'))
+UNMONITORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "buildInfo", "saslStart", "saslContinue", "endSessions", "killCursors"}
+
+class RequestDbStats:
+    """Mongo usage of one HTTP request"""
+    def __init__(self):
+        self.commands = 0
+        self.get_mores = 0
+        self.duration_ms = 0.0
+        self.documents = 0
+
+    @property
+    def round_trips(self) -> int:
+        """Commands that start new work; getMore batches of an open cursor are not counted"""
+        return self.commands - self.get_mores
+
+_request_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db_stats", default=None)
+_request_route: ContextVar[str] = ContextVar("request_route", default="background")
+_route_db_stats: Dict[str, dict] = {}
+_slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+def _reply_documents(reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if "value" in reply:  # findAndModify
+        return 1 if reply["value"] else 0
+    if "values" in reply:  # distinct
+        return len(reply["values"])
+    return 0
+
+class MongoCommandMonitor(monitoring.CommandListener):
+    def __init__(self):
+        self._pending: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name in UNMONITORED_COMMANDS:
+            return
+        command = event.command
+        collection = command.get("collection") if event.command_name == "getMore" else command.get(event.command_name)
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (
+                _request_db_stats.get(), _request_route.get(), event.command_name,
+                collection if isinstance(collection, str) else None
+            )
+
+    def succeeded(self, event):
+        self._finish(event, _reply_documents(event.reply), failed=False)
+
+    def failed(self, event):
+        self._finish(event, 0, failed=True)
+
+    def _finish(self, event, documents: int, failed: bool):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+            if pending is None:
+                return
+            stats, route, command_name, collection = pending
+            duration_ms = event.duration_micros / 1000
+            if stats is not None:
+                stats.commands += 1
+                stats.get_mores += command_name == "getMore"
+                stats.duration_ms += duration_ms
+                stats.documents += documents
+        if duration_ms >= SLOW_QUERY_MS or failed:
+            entry = {
+                "at": datetime.now(timezone.utc).isoformat(), "route": route, "command": command_name,
+                "collection": collection, "duration_ms": round(duration_ms, 2), "documents": documents, "failed": failed
+            }
+            _slow_queries.append(entry)
+            logger.warning(f"Slow Mongo {command_name} on {collection} from {route}: {duration_ms:.1f}ms")
+
+# Round-trip budgets are declared per route with @db_budget and enforced by
+# tests/test_db_budgets.py; in production they are only reported next to the
+# measured totals in /admin/db-stats.
+
+def db_budget(commands: Optional[int], documents: Optional[int] = None):
+    """Declare the Mongo round trips and returned documents a route may use; None disables that check"""
+    def decorator(func):
+        func.db_budget = (commands, documents)
+        return func
+    return decorator
+
+def route_db_budget(endpoint) -> tuple:
+    return getattr(endpoint, "db_budget", (None, None))
+
+def record_route_db_stats(route: str, stats: RequestDbStats):
+    totals = _route_db_stats.setdefault(route, {
+        "requests": 0, "commands": 0, "round_trips": 0, "duration_ms": 0.0, "documents": 0, "max_round_trips": 0
+    })
+    totals["requests"] += 1
+    totals["commands"] += stats.commands
+    totals["round_trips"] += stats.round_trips
+    totals["duration_ms"] += stats.duration_ms
+    totals["documents"] += stats.documents
+    totals["max_round_trips"] = max(totals["max_round_trips"], stats.round_trips)
+
+command_monitor = MongoCommandMonitor()
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[command_monitor])
 db = client[os.environ['DB_NAME']]
 
 # JWT and Password Config
@@ -106,6 +229,7 @@ class Role(BaseModel):
     name: str
     description: Optional[str] = None
     permissions: List[Dict] = []
+    permission_mask: int = 0  # Bitmask over AVAILABLE_MODULES x AVAILABLE_ACTIONS, see PERMISSION_BITS
     is_system_role: bool = False  # System roles cannot be deleted
     is_active: bool = True
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
@@ -294,6 +418,8 @@ class PurchaseOrder(BaseModel):
     gst_amount: float = 0.0
     total: float = 0.0
     status: str = "pending"
+    received_quantities: List[float] = []  # receipt ledger: GRN quantity received per item index
+    receipt_open: bool = True
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 # GRN Models
@@ -359,6 +485,19 @@ class Attendance(AttendanceCreate):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+class AttendanceMusterEntry(BaseModel):
+    employee_id: str
+    check_in: Optional[str] = None
+    check_out: Optional[str] = None
+    status: str = "present"
+    overtime_hours: float = 0.0
+
+class AttendanceMuster(BaseModel):
+    """A whole day's attendance for one project site"""
+    project_id: str
+    date: str
+    entries: List[AttendanceMusterEntry]
+
 # Payroll Models
 class PayrollCreate(BaseModel):
     employee_id: str
@@ -378,6 +517,8 @@ class Payroll(PayrollCreate):
     gross_salary: float = 0.0
     total_deductions: float = 0.0
     net_salary: float = 0.0
+    paid_days: Optional[float] = None  # set by the month-end payroll run
+    overtime_hours: Optional[float] = None
     status: str = "pending"
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
@@ -417,6 +558,26 @@ class RERAProject(RERAProjectCreate):
     last_quarterly_update: Optional[str] = None
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# Export Job Models
+class ExportJobCreate(BaseModel):
+    report_type: str
+    format: str = "excel"
+
+class ExportJob(ExportJobCreate):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = "queued"
+    progress: int = 0
+    filename: Optional[str] = None
+    size: Optional[int] = None
+    error: Optional[str] = None
+    requested_by: str
+    instance_id: Optional[str] = None
+    heartbeat_at: Optional[str] = None
+    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    started_at: Optional[str] = None
+    completed_at: Optional[str] = None
+
 # ==================== GST E-INVOICE MODELS ====================
 
 class EInvoiceItemCreate(BaseModel):
@@ -587,110 +748,296 @@ class AIRequest(BaseModel):
 
 # ==================== AUTH HELPERS ====================
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+# bcrypt is deliberately slow (~200ms per call), so it runs in a small thread
+# pool instead of on the event loop. BCRYPT_MAX_PENDING caps running plus
+# queued jobs; beyond that requests fail fast with 429 rather than piling up.
+BCRYPT_MAX_WORKERS = int(os.environ.get('BCRYPT_MAX_WORKERS', '4'))
+BCRYPT_MAX_PENDING = int(os.environ.get('BCRYPT_MAX_PENDING', '32'))
+
+bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_MAX_WORKERS, thread_name_prefix="bcrypt")
+_bcrypt_slots = asyncio.Semaphore(BCRYPT_MAX_PENDING)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def _run_bcrypt(fn, *args):
+    if _bcrypt_slots.locked():
+        raise HTTPException(status_code=429, detail="Too many concurrent sign-in requests, please retry", headers={"Retry-After": "1"})
+    async with _bcrypt_slots:
+        return await asyncio.get_running_loop().run_in_executor(bcrypt_executor, fn, *args)
 
-def create_access_token(data: dict) -> str:
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_bcrypt(pwd_context.verify, plain_password, hashed_password)
+
+async def get_password_hash(password: str) -> str:
+    return await _run_bcrypt(pwd_context.hash, password)
+
+def create_access_token(data: dict, user_doc: Optional[dict] = None, permission_mask: int = 0, role_name: Optional[str] = None) -> str:
+    """Create a JWT; when user_doc is given the token also carries the claims needed for authorization"""
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
-    to_encode.update({"exp": expire})
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
+    to_encode.update({"exp": expire, "iat": now})
+    if user_doc is not None and JWT_EMBED_CLAIMS:
+        to_encode.update({
+            "email": user_doc.get("email"),
+            "name": user_doc.get("name"),
+            "role": user_doc.get("role", UserRole.SITE_ENGINEER),
+            "role_id": user_doc.get("role_id"),
+            "role_name": role_name,
+            "pm": permission_mask,
+            "tv": user_doc.get("token_version", 0)
+        })
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-async def get_user_permissions(user_doc: dict) -> Dict[str, Dict[str, bool]]:
-    """Get user permissions based on their assigned role"""
-    permissions = {}
-    
-    # Initialize all modules with no permissions
-    for module in AVAILABLE_MODULES:
-        permissions[module] = {"view": False, "create": False, "edit": False, "delete": False}
-    
-    # Check for RBAC role_id first
-    if user_doc.get("role_id"):
-        role_doc = await db.roles.find_one({"id": user_doc["role_id"], "is_active": True}, {"_id": 0})
-        if role_doc:
-            for perm in role_doc.get("permissions", []):
-                module = perm.get("module")
-                if module in permissions:
-                    permissions[module] = {
-                        "view": perm.get("view", False),
-                        "create": perm.get("create", False),
-                        "edit": perm.get("edit", False),
-                        "delete": perm.get("delete", False)
-                    }
-            return permissions
-    
-    # Fallback to legacy role-based permissions
-    legacy_role = user_doc.get("role", "site_engineer")
-    
-    # Admin has full access
-    if legacy_role == "admin":
-        for module in AVAILABLE_MODULES:
-            permissions[module] = {"view": True, "create": True, "edit": True, "delete": True}
-    elif legacy_role == "site_engineer":
-        permissions["dashboard"] = {"view": True, "create": False, "edit": False, "delete": False}
-        permissions["projects"] = {"view": True, "create": True, "edit": True, "delete": False}
-        permissions["reports"] = {"view": True, "create": False, "edit": False, "delete": False}
-        permissions["ai_assistant"] = {"view": True, "create": True, "edit": False, "delete": False}
-    elif legacy_role == "finance":
-        permissions["dashboard"] = {"view": True, "create": False, "edit": False, "delete": False}
-        permissions["projects"] = {"view": True, "create": False, "edit": False, "delete": False}
-        permissions["financial"] = {"view": True, "create": True, "edit": True, "delete": True}
-        permissions["compliance"] = {"view": True, "create": True, "edit": True, "delete": True}
-        permissions["einvoicing"] = {"view": True, "create": True, "edit": True, "delete": True}
-        permissions["reports"] = {"view": True, "create": True, "edit": False, "delete": False}
-    elif legacy_role == "procurement":
-        permissions["dashboard"] = {"view": True, "create": False, "edit": False, "delete": False}
-        permissions["projects"] = {"view": True, "create": False, "edit": False, "delete": False}
-        permissions["procurement"] = {"view": True, "create": True, "edit": True, "delete": True}
-        permissions["reports"] = {"view": True, "create": False, "edit": False, "delete": False}
-    
-    return permissions
+# ==================== TOKEN VERSIONS ====================
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+# Tokens carrying claims are trusted without a user lookup only while their
+# "tv" claim matches the user's current token_version. The map is refreshed in
+# the background; bumps made by this process are applied to it immediately.
+JWT_EMBED_CLAIMS = os.environ.get('JWT_EMBED_CLAIMS', 'true').lower() == 'true'
+TOKEN_VERSION_REFRESH_SECONDS = int(os.environ.get('TOKEN_VERSION_REFRESH_SECONDS', '30'))
+
+_token_versions: Dict[str, int] = {}
+_token_versions_loaded_at: Optional[float] = None
+
+async def refresh_token_versions():
+    global _token_versions, _token_versions_loaded_at
+    users = await db.users.find({}, {"_id": 0, "id": 1, "token_version": 1}).to_list(None)
+    _token_versions = {u["id"]: u.get("token_version", 0) for u in users if u.get("id")}
+    _token_versions_loaded_at = time.monotonic()
+
+async def _token_version_refresher():
+    while True:
+        try:
+            await refresh_token_versions()
+        except Exception as e:
+            logger.error(f"Token version refresh failed: {e}")
+        await asyncio.sleep(TOKEN_VERSION_REFRESH_SECONDS)
+
+def _token_versions_fresh() -> bool:
+    # A map that missed two refreshes is not trusted; requests fall back to the DB
+    return _token_versions_loaded_at is not None and time.monotonic() - _token_versions_loaded_at < TOKEN_VERSION_REFRESH_SECONDS * 2
+
+async def bump_token_versions(query: dict, extra_set: Optional[dict] = None):
+    """Invalidate the claims of every token issued to users matching query"""
+    update = {"$inc": {"token_version": 1}}
+    if extra_set:
+        update["$set"] = extra_set
+    await db.users.update_many(query, update)
+    users = await db.users.find(query, {"_id": 0, "id": 1, "token_version": 1}).to_list(None)
+    for u in users:
+        _token_versions[u["id"]] = u.get("token_version", 0)
+
+def _claims_are_current(payload: dict) -> bool:
+    if "tv" not in payload or not _token_versions_fresh():
+        return False
+    return _token_versions.get(payload["sub"]) == payload["tv"]
+
+def _decode_token(credentials: HTTPAuthorizationCredentials) -> dict:
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        user_doc = await db.users.find_one({"id": user_id}, {"_id": 0})
-        if user_doc is None:
-            raise HTTPException(status_code=401, detail="User not found")
-        return User(**user_doc)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+def _check_not_revoked(payload: dict, user_doc: dict):
+    revoked_at = user_doc.get("sessions_revoked_at")
+    if revoked_at and payload.get("iat", 0) <= revoked_at:
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+# ==================== PERMISSION BITMASK ====================
+
+# Each (module, action) pair owns one bit: module index * len(AVAILABLE_ACTIONS) + action index.
+# 11 modules x 4 actions fit in 44 bits, stored on role documents as permission_mask.
+PERMISSION_BITS = {
+    (module, action): module_idx * len(AVAILABLE_ACTIONS) + action_idx
+    for module_idx, module in enumerate(AVAILABLE_MODULES)
+    for action_idx, action in enumerate(AVAILABLE_ACTIONS)
+}
+
+def permissions_to_mask(permissions: List[Dict]) -> int:
+    """Convert a role's list of per-module permission dicts into a bitmask"""
+    mask = 0
+    for perm in permissions:
+        for action in AVAILABLE_ACTIONS:
+            bit = PERMISSION_BITS.get((perm.get("module"), action))
+            if bit is not None and perm.get(action, False):
+                mask |= 1 << bit
+    return mask
+
+@lru_cache(maxsize=256)
+def mask_to_permissions(mask: int) -> Dict[str, Dict[str, bool]]:
+    """Expand a bitmask into the nested dict shape returned by /auth/me (shared, do not mutate)"""
+    return {
+        module: {action: bool(mask >> PERMISSION_BITS[(module, action)] & 1) for action in AVAILABLE_ACTIONS}
+        for module in AVAILABLE_MODULES
+    }
+
+def has_permission(mask: int, module: str, action: str) -> bool:
+    bit = PERMISSION_BITS.get((module, action))
+    return bit is not None and bool(mask >> bit & 1)
+
+def role_permission_mask(role_doc: dict) -> int:
+    if "permission_mask" in role_doc:
+        return role_doc["permission_mask"]
+    return permissions_to_mask(role_doc.get("permissions", []))
+
+LEGACY_ROLE_PERMISSIONS = {
+    UserRole.ADMIN: [{"module": m, "view": True, "create": True, "edit": True, "delete": True} for m in AVAILABLE_MODULES],
+    UserRole.SITE_ENGINEER: [
+        {"module": "dashboard", "view": True},
+        {"module": "projects", "view": True, "create": True, "edit": True},
+        {"module": "reports", "view": True},
+        {"module": "ai_assistant", "view": True, "create": True},
+    ],
+    UserRole.FINANCE: [
+        {"module": "dashboard", "view": True},
+        {"module": "projects", "view": True},
+        {"module": "financial", "view": True, "create": True, "edit": True, "delete": True},
+        {"module": "compliance", "view": True, "create": True, "edit": True, "delete": True},
+        {"module": "einvoicing", "view": True, "create": True, "edit": True, "delete": True},
+        {"module": "reports", "view": True, "create": True},
+    ],
+    UserRole.PROCUREMENT: [
+        {"module": "dashboard", "view": True},
+        {"module": "projects", "view": True},
+        {"module": "procurement", "view": True, "create": True, "edit": True, "delete": True},
+        {"module": "reports", "view": True},
+    ],
+}
+LEGACY_ROLE_MASKS = {role: permissions_to_mask(perms) for role, perms in LEGACY_ROLE_PERMISSIONS.items()}
+
+def _legacy_mask(user_doc: dict) -> int:
+    return LEGACY_ROLE_MASKS.get(user_doc.get("role", "site_engineer"), 0)
+
+async def backfill_role_permission_masks() -> int:
+    """Store permission_mask on roles created before the bitmask existed"""
+    roles = await db.roles.find({"permission_mask": {"$exists": False}}, {"_id": 0, "id": 1, "permissions": 1}).to_list(None)
+    if roles:
+        await db.roles.bulk_write([
+            UpdateOne({"id": r["id"]}, {"$set": {"permission_mask": permissions_to_mask(r.get("permissions", []))}})
+            for r in roles
+        ], ordered=False)
+    return len(roles)
+
+# ==================== PERMISSION CACHE ====================
+
+# Resolved permissions are cached in-process per role and per user. Role entries
+# live until a role-mutating route invalidates them; user entries also expire
+# after a TTL so profile changes made outside the RBAC routes are picked up.
+PERMISSION_CACHE_TTL_SECONDS = int(os.environ.get('PERMISSION_CACHE_TTL_SECONDS', '60'))
+
+# role_id -> {"name": str, "mask": int or None (role inactive)}, or None if the role does not exist
+_role_permission_cache: Dict[str, Optional[Dict[str, Any]]] = {}
+# user_id -> {"user": user doc without password, "expires_at": float}
+_user_permission_cache: Dict[str, Dict[str, Any]] = {}
+
+def _cache_role(role_id: str, role_doc: Optional[dict]):
+    if role_doc is None:
+        _role_permission_cache[role_id] = None
+        return
+    _role_permission_cache[role_id] = {
+        "name": role_doc.get("name"),
+        "mask": role_permission_mask(role_doc) if role_doc.get("is_active", True) else None
+    }
+
+def _get_cached_user(user_id: str) -> Optional[dict]:
+    entry = _user_permission_cache.get(user_id)
+    if entry is None:
+        return None
+    if entry["expires_at"] < time.monotonic():
+        _user_permission_cache.pop(user_id, None)
+        return None
+    return entry["user"]
+
+def _cache_user(user_doc: dict):
+    _user_permission_cache[user_doc["id"]] = {
+        "user": user_doc,
+        "expires_at": time.monotonic() + PERMISSION_CACHE_TTL_SECONDS
+    }
+
+def invalidate_role_permissions(role_id: str):
+    """Drop a role and every cached user resolved through it"""
+    _role_permission_cache.pop(role_id, None)
+    for user_id in [uid for uid, entry in _user_permission_cache.items() if entry["user"].get("role_id") == role_id]:
+        _user_permission_cache.pop(user_id, None)
+
+def invalidate_user_permissions(user_id: str):
+    _user_permission_cache.pop(user_id, None)
+
+def clear_permission_cache():
+    _role_permission_cache.clear()
+    _user_permission_cache.clear()
+
+async def resolve_permission_mask(user_doc: dict) -> tuple:
+    """Return (permission_mask, role_name) for a user, hitting the roles collection only on a cache miss"""
+    role_id = user_doc.get("role_id")
+    if role_id:
+        if role_id not in _role_permission_cache:
+            role_doc = await db.roles.find_one({"id": role_id}, {"_id": 0})
+            _cache_role(role_id, role_doc)
+        role_entry = _role_permission_cache[role_id]
+        if role_entry is not None:
+            # Inactive roles keep their name but fall back to legacy permissions
+            mask = role_entry["mask"] if role_entry["mask"] is not None else _legacy_mask(user_doc)
+            return mask, role_entry["name"]
+    
+    # Fallback to legacy role-based permissions
+    return _legacy_mask(user_doc), None
+
+async def get_user_permissions(user_doc: dict) -> Dict[str, Dict[str, bool]]:
+    """Get user permissions based on their assigned role"""
+    mask, _ = await resolve_permission_mask(user_doc)
+    return mask_to_permissions(mask)
+
+async def _load_user_with_role(user_id: str) -> Optional[dict]:
+    """Fetch a user and their RBAC role in a single round trip and warm both caches"""
+    pipeline = [
+        {"$match": {"id": user_id}},
+        {"$limit": 1},
+        {"$lookup": {"from": "roles", "localField": "role_id", "foreignField": "id", "as": "_role"}},
+        {"$project": {"_id": 0, "password": 0, "_role._id": 0}}
+    ]
+    docs = await db.users.aggregate(pipeline).to_list(1)
+    if not docs:
+        return None
+    user_doc = docs[0]
+    roles = user_doc.pop("_role", [])
+    if user_doc.get("role_id"):
+        _cache_role(user_doc["role_id"], roles[0] if roles else None)
+    _cache_user(user_doc)
+    return user_doc
+
+async def _resolve_authorized_user(payload: dict) -> tuple:
+    """Return (user_doc, permission_mask, role_name) for a decoded token via the permission cache"""
+    user_id = payload["sub"]
+    user_doc = _get_cached_user(user_id)
+    if user_doc is None:
+        user_doc = await _load_user_with_role(user_id)
+    if user_doc is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    _check_not_revoked(payload, user_doc)
+    mask, role_name = await resolve_permission_mask(user_doc)
+    return user_doc, mask, role_name
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+    payload = _decode_token(credentials)
+    user_id = payload["sub"]
+    if _claims_are_current(payload):
+        return User(id=user_id, email=payload["email"], name=payload["name"], role=payload["role"], role_id=payload.get("role_id"))
+    user_doc = await db.users.find_one({"id": user_id}, {"_id": 0})
+    if user_doc is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    _check_not_revoked(payload, user_doc)
+    return User(**user_doc)
 
 async def get_current_user_with_permissions(credentials: HTTPAuthorizationCredentials = Depends(security)) -> UserWithPermissions:
     """Get current user with their permissions"""
-    try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        user_doc = await db.users.find_one({"id": user_id}, {"_id": 0})
-        if user_doc is None:
-            raise HTTPException(status_code=401, detail="User not found")
-        
-        # Get permissions
-        permissions = await get_user_permissions(user_doc)
-        
-        # Get role name if using RBAC
-        role_name = None
-        if user_doc.get("role_id"):
-            role_doc = await db.roles.find_one({"id": user_doc["role_id"]}, {"_id": 0, "name": 1})
-            if role_doc:
-                role_name = role_doc.get("name")
-        
-        user_data = {k: v for k, v in user_doc.items() if k not in ['_id', 'password']}
-        return UserWithPermissions(**user_data, permissions=permissions, role_name=role_name)
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    payload = _decode_token(credentials)
+    user_doc, mask, role_name = await _resolve_authorized_user(payload)
+    return UserWithPermissions(**user_doc, permissions=mask_to_permissions(mask), role_name=role_name)
 
 def check_role(allowed_roles: List[str]):
     """Legacy role check decorator"""
@@ -703,16 +1050,21 @@ def check_role(allowed_roles: List[str]):
 def require_permission(module: str, action: str):
     """RBAC permission check decorator"""
     async def permission_checker(credentials: HTTPAuthorizationCredentials = Depends(security)) -> UserWithPermissions:
-        user = await get_current_user_with_permissions(credentials)
+        payload = _decode_token(credentials)
+        if _claims_are_current(payload) and "pm" in payload:
+            user_doc = {"id": payload["sub"], "email": payload["email"], "name": payload["name"], "role": payload["role"], "role_id": payload.get("role_id")}
+            mask, role_name = payload["pm"], payload.get("role_name")
+        else:
+            user_doc, mask, role_name = await _resolve_authorized_user(payload)
         
         # Check if user has required permission
-        if module not in user.permissions:
+        if module not in AVAILABLE_MODULES:
             raise HTTPException(status_code=403, detail=f"Access to {module} denied")
         
-        if not user.permissions[module].get(action, False):
+        if not has_permission(mask, module, action):
             raise HTTPException(status_code=403, detail=f"Insufficient permissions: {action} on {module} denied")
         
-        return user
+        return UserWithPermissions(**user_doc, permissions=mask_to_permissions(mask), role_name=role_name)
     return permission_checker
 
 def require_admin():
@@ -732,39 +1084,33 @@ async def register(user_data: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     user_dict = user_data.model_dump()
-    user_dict['password'] = get_password_hash(user_dict['password'])
+    user_dict['password'] = await get_password_hash(user_dict['password'])
     user_obj = User(**{k: v for k, v in user_dict.items() if k != 'password'})
     
     doc = {**user_obj.model_dump(), "password": user_dict['password']}
     await db.users.insert_one(doc)
     
     # Get user permissions for token response
-    permissions = await get_user_permissions(doc)
-    user_with_perms = UserWithPermissions(**user_obj.model_dump(), permissions=permissions)
+    mask, role_name = await resolve_permission_mask(doc)
+    user_with_perms = UserWithPermissions(**user_obj.model_dump(), permissions=mask_to_permissions(mask), role_name=role_name)
+    _token_versions.setdefault(user_obj.id, 0)
     
-    access_token = create_access_token({"sub": user_obj.id, "role": user_obj.role})
+    access_token = create_access_token({"sub": user_obj.id, "role": user_obj.role}, doc, mask, role_name)
     return Token(access_token=access_token, user=user_with_perms)
 
 @api_router.post("/auth/login", response_model=Token)
 async def login(credentials: UserLogin):
     user_doc = await db.users.find_one({"email": credentials.email})
-    if not user_doc or not verify_password(credentials.password, user_doc['password']):
+    if not user_doc or not await verify_password(credentials.password, user_doc['password']):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    # Get permissions
-    permissions = await get_user_permissions(user_doc)
-    
-    # Get role name if using RBAC
-    role_name = None
-    if user_doc.get("role_id"):
-        role_doc = await db.roles.find_one({"id": user_doc["role_id"]}, {"_id": 0, "name": 1})
-        if role_doc:
-            role_name = role_doc.get("name")
+    # Get permissions and role name (cached per role)
+    mask, role_name = await resolve_permission_mask(user_doc)
     
     user_data = {k: v for k, v in user_doc.items() if k not in ['_id', 'password']}
-    user_with_perms = UserWithPermissions(**user_data, permissions=permissions, role_name=role_name)
+    user_with_perms = UserWithPermissions(**user_data, permissions=mask_to_permissions(mask), role_name=role_name)
     
-    access_token = create_access_token({"sub": user_with_perms.id, "role": user_with_perms.role})
+    access_token = create_access_token({"sub": user_with_perms.id, "role": user_with_perms.role}, user_doc, mask, role_name)
     return Token(access_token=access_token, user=user_with_perms)
 
 @api_router.get("/auth/me", response_model=UserWithPermissions)
@@ -800,6 +1146,7 @@ async def create_role(role_data: RoleCreate, current_user: User = Depends(requir
         name=role_data.name.strip(),
         description=role_data.description,
         permissions=permissions_list,
+        permission_mask=permissions_to_mask(permissions_list),
         is_system_role=False
     )
     
@@ -850,6 +1197,7 @@ async def update_role(role_id: str, role_data: RoleUpdate, current_user: User =
                 raise HTTPException(status_code=400, detail=f"Invalid module: {perm.module}")
             permissions_list.append(perm.model_dump())
         update_data["permissions"] = permissions_list
+        update_data["permission_mask"] = permissions_to_mask(permissions_list)
     
     if role_data.is_active is not None:
         if role.get("is_system_role") and not role_data.is_active:
@@ -859,6 +1207,8 @@ async def update_role(role_id: str, role_data: RoleUpdate, current_user: User =
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
     
     await db.roles.update_one({"id": role_id}, {"$set": update_data})
+    invalidate_role_permissions(role_id)
+    await bump_token_versions({"role_id": role_id})
     
     updated_role = await db.roles.find_one({"id": role_id}, {"_id": 0})
     return Role(**updated_role)
@@ -878,6 +1228,7 @@ async def delete_role(role_id: str, current_user: User = Depends(require_admin()
         raise HTTPException(status_code=400, detail=f"Cannot delete role - {users_with_role} user(s) are assigned to it")
     
     await db.roles.delete_one({"id": role_id})
+    invalidate_role_permissions(role_id)
     return {"message": "Role deleted successfully"}
 
 # User Role Assignment
@@ -898,6 +1249,8 @@ async def assign_role_to_user(assignment: UserRoleAssignment, current_user: User
         {"id": assignment.user_id},
         {"$set": {"role_id": assignment.role_id}}
     )
+    invalidate_user_permissions(assignment.user_id)
+    await bump_token_versions({"id": assignment.user_id})
     
     return {"message": f"Role '{role['name']}' assigned to user successfully"}
 
@@ -911,9 +1264,23 @@ async def remove_role_from_user(user_id: str, current_user: User = Depends(requi
         {"id": user_id},
         {"$unset": {"role_id": ""}}
     )
+    invalidate_user_permissions(user_id)
+    await bump_token_versions({"id": user_id})
     
     return {"message": "Role removed from user, falling back to legacy role permissions"}
 
+@api_router.post("/rbac/users/{user_id}/revoke-sessions")
+async def revoke_user_sessions(user_id: str, current_user: User = Depends(require_admin())):
+    """Invalidate every token issued to a user so far"""
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "id": 1})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    await bump_token_versions({"id": user_id}, {"sessions_revoked_at": int(time.time())})
+    invalidate_user_permissions(user_id)
+    
+    return {"message": "User sessions revoked"}
+
 # Get users with their roles for admin management
 @api_router.get("/rbac/users")
 async def list_users_with_roles(current_user: User = Depends(require_admin())):
@@ -1037,47 +1404,467 @@ async def initialize_system_roles(current_user: User = Depends(require_admin()))
         },
     ]
     
-    created_count = 0
-    for role_data in default_roles:
-        existing = await db.roles.find_one({"name": role_data["name"]})
-        if not existing:
-            role = Role(**role_data)
-            await db.roles.insert_one(role.model_dump())
-            created_count += 1
+    existing = await db.roles.find({"name": {"$in": [r["name"] for r in default_roles]}}, {"_id": 0, "name": 1}).to_list(None)
+    existing_names = {r["name"] for r in existing}
+    missing = [
+        Role(**role_data, permission_mask=permissions_to_mask(role_data["permissions"])).model_dump()
+        for role_data in default_roles if role_data["name"] not in existing_names
+    ]
+    if missing:
+        await db.roles.insert_many(missing)
+    created_count = len(missing)
+    clear_permission_cache()
     
     return {"message": f"Initialized {created_count} system roles", "total_roles": len(default_roles)}
 
-# ==================== DASHBOARD ====================
+# ==================== PAGINATION ====================
 
-@api_router.get("/dashboard/stats")
-async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
-    total_projects = await db.projects.count_documents({})
-    active_projects = await db.projects.count_documents({"status": "in_progress"})
-    total_vendors = await db.vendors.count_documents({"is_active": True})
-    total_employees = await db.employees.count_documents({"is_active": True})
+# List endpoints page with an opaque keyset cursor instead of a fixed to_list cap.
+# Paging is opt-in: a request without limit/after gets the full list, so existing
+# clients never see a silently truncated result. With paging the body stays a plain
+# JSON array and X-Has-More / X-Next-Cursor headers carry the paging state.
+# Every sort ends on _id so the key is unique and index-backed.
+DEFAULT_PAGE_SIZE = 1000  # when only after is given
+MAX_PAGE_SIZE = 5000
+
+INSERTION_ORDER = [("_id", ASCENDING)]
+NEWEST_FIRST = [("created_at", DESCENDING), ("_id", DESCENDING)]
+ATTENDANCE_ORDER = [("date", DESCENDING), ("_id", DESCENDING)]
+
+# Clients sending "Accept: application/x-ndjson" get the whole result streamed one document per line
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_CHUNK_SIZE = 200
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(bson_json.dumps(values).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return bson_json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def keyset_filter(sort: List[tuple], values: list) -> dict:
+    """Match documents strictly after values in the given sort order"""
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {f: v for (f, _), v in zip(sort[:i], values[:i])}
+        clause[field] = {"$gt" if direction == ASCENDING else "$lt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+class PageParams:
+    """Paging inputs shared by list endpoints: limit, after and the negotiated response format"""
+    def __init__(
+        self,
+        request: Request,
+        response: Response,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[str] = None
+    ):
+        self.response = response
+        self.limit = limit
+        self.after = after
+        self.paged = limit is not None or after is not None
+        self.ndjson = NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+async def _ndjson_lines(cursor):
+    chunk = []
+    async for doc in cursor:
+        chunk.append(json.dumps(doc, default=str))
+        if len(chunk) >= NDJSON_CHUNK_SIZE:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+async def paginate(collection, query: dict, sort: List[tuple], page: PageParams):
+    """Fetch one page of documents and set the paging headers, or stream every match as NDJSON"""
+    if page.after:
+        values = decode_cursor(page.after)
+        if not isinstance(values, list) or len(values) != len(sort):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        query = {"$and": [query, keyset_filter(sort, values)]} if query else keyset_filter(sort, values)
     
-    # Financial stats
-    projects = await db.projects.find({}, {"_id": 0, "budget": 1, "actual_cost": 1}).to_list(1000)
-    total_budget = sum(p.get('budget', 0) for p in projects)
-    total_spent = sum(p.get('actual_cost', 0) for p in projects)
+    if page.ndjson:
+        # Streaming mode ignores limit: the Motor cursor is drained batch by batch
+        cursor = collection.find(query, {"_id": 0}).sort(sort).batch_size(NDJSON_CHUNK_SIZE)
+        return StreamingResponse(_ndjson_lines(cursor), media_type=NDJSON_MEDIA_TYPE)
     
-    # Recent POs
-    pending_pos = await db.purchase_orders.count_documents({"status": "pending"})
+    if not page.paged:
+        return await collection.find(query, {"_id": 0}).sort(sort).to_list(None)
     
-    # Attendance today
+    limit = page.limit or DEFAULT_PAGE_SIZE
+    docs = await collection.find(query).sort(sort).limit(limit + 1).to_list(limit + 1)
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    page.response.headers["X-Has-More"] = "true" if has_more else "false"
+    if has_more:
+        last = docs[-1]
+        page.response.headers["X-Next-Cursor"] = encode_cursor([last.get(field) for field, _ in sort])
+    for doc in docs:
+        doc.pop("_id", None)
+    return docs
+
+# ==================== AGGREGATION HELPERS ====================
+# Dashboards and reports push their totals into $group/$facet pipelines so only
+# aggregated numbers leave the database.
+
+def sum_of(*fields: str) -> dict:
+    """$sum accumulator over one field (or the sum of several), treating missing values as 0"""
+    terms = [{"$ifNull": [f"${field}", 0]} for field in fields]
+    return {"$sum": terms[0] if len(terms) == 1 else {"$add": terms}}
+
+def count_where(field: str, value) -> dict:
+    """$sum accumulator counting documents where field == value"""
+    return {"$sum": {"$cond": [{"$eq": [f"${field}", value]}, 1, 0]}}
+
+def sum_where(field: str, value, amount: str) -> dict:
+    """$sum accumulator over amount for documents where field == value"""
+    return {"$sum": {"$cond": [{"$eq": [f"${field}", value]}, {"$ifNull": [f"${amount}", 0]}, 0]}}
+
+def totals_facet(**accumulators) -> List[dict]:
+    """Facet pipeline yielding a single row with a document count plus the given accumulators"""
+    return [{"$group": {"_id": None, "count": {"$sum": 1}, **accumulators}}]
+
+def group_facet(key: str, default=None, **accumulators) -> List[dict]:
+    """Facet pipeline yielding one row per value of key (missing values fall into default)"""
+    group_key = {"$ifNull": [f"${key}", default]} if default is not None else f"${key}"
+    return [{"$group": {"_id": group_key, "count": {"$sum": 1}, **accumulators}}]
+
+def union_source(collection: str, pipeline: Optional[List[dict]] = None, fields: tuple = ()) -> dict:
+    """$unionWith stage (MongoDB 4.4+) appending another collection's pre-aggregated rows, each tagged with source"""
+    return {"$unionWith": {"coll": collection, "pipeline": (pipeline or []) + [
+        {"$project": {"source": {"$literal": collection}, **{field: 1 for field in fields}}}
+    ]}}
+
+def by_source(rows: List[dict]) -> Dict[str, List[dict]]:
+    """Split the output of a $unionWith pipeline back into rows per source collection"""
+    out: Dict[str, List[dict]] = {}
+    for row in rows:
+        out.setdefault(row.pop("source"), []).append(row)
+    return out
+
+async def facet(collection, facets: Dict[str, List[dict]], match: Optional[dict] = None) -> Dict[str, List[dict]]:
+    """Run several grouping pipelines over one collection in a single round trip"""
+    pipeline = ([{"$match": match}] if match else []) + [{"$facet": facets}]
+    result = await collection.aggregate(pipeline).to_list(1)
+    return result[0] if result else {name: [] for name in facets}
+
+async def group_by_project(collection, project_ids: Optional[List[str]] = None, **accumulators) -> Dict[str, dict]:
+    """One grouped query keyed by project_id, optionally limited to the given projects"""
+    match = {"project_id": {"$in": project_ids}} if project_ids is not None else None
+    pipeline = ([{"$match": match}] if match else []) + group_facet("project_id", **accumulators)
+    rows = await collection.aggregate(pipeline).to_list(None)
+    return {row["_id"]: row for row in rows}
+
+def first_row(rows: List[dict], *fields: str) -> dict:
+    """The single row of a totals facet, with 0 for every field when the collection is empty"""
+    row = rows[0] if rows else {}
+    return {field: row.get(field, 0) for field in ("count",) + fields}
+
+def keyed(rows: List[dict], field: str = "count", base: Optional[dict] = None) -> dict:
+    """Map group keys to one accumulator, on top of an optional dict of zeroed defaults"""
+    out = dict(base or {})
+    for row in rows:
+        out[row["_id"]] = row.get(field, 0)
+    return out
+
+# ==================== REPORT CACHE ====================
+# /reports/* responses are cached in-process, keyed by report type, filters, the
+# current date and the data version of every collection the report reads. Write
+# handlers bump the version of the collection they touch, so a changed collection
+# simply stops matching old keys; those entries age out of the LRU.
+# Versions are counters in one shared data_versions document, so a write handled
+# by any worker invalidates the cached reports of every worker.
+
+REPORT_CACHE_MAX_ENTRIES = int(os.environ.get('REPORT_CACHE_MAX_ENTRIES', '256'))
+DATA_VERSIONS_ID = "collections"
+
+_report_cache: "OrderedDict[tuple, Any]" = OrderedDict()
+_report_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+async def bump_data_version(*collections: str):
+    await db.data_versions.update_one(
+        {"_id": DATA_VERSIONS_ID},
+        {"$inc": {name: 1 for name in collections}},
+        upsert=True
+    )
+
+async def data_versions(collections: List[str]) -> tuple:
+    """Current version of each collection, read with a single find_one"""
+    doc = await db.data_versions.find_one({"_id": DATA_VERSIONS_ID}) or {}
+    return tuple(doc.get(name, 0) for name in collections)
+
+def cached_report(report_type: str, collections: List[str]):
+    """Serve a report from the cache while none of its collections have changed. The cache keeps
+    the payload without generated_at; each response is a shallow copy stamped with a fresh one."""
+    def stamped(payload: dict) -> dict:
+        return {**payload, "generated_at": datetime.now(timezone.utc).isoformat()}
+
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(**kwargs):
+            filters = tuple(sorted((k, v) for k, v in kwargs.items() if k != "current_user"))
+            today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+            key = (report_type, filters, today, await data_versions(collections))
+            if key in _report_cache:
+                _report_cache.move_to_end(key)
+                _report_cache_stats["hits"] += 1
+                return stamped(_report_cache[key])
+            _report_cache_stats["misses"] += 1
+            result = await handler(**kwargs)
+            _report_cache[key] = {k: v for k, v in result.items() if k != "generated_at"}
+            while len(_report_cache) > REPORT_CACHE_MAX_ENTRIES:
+                _report_cache.popitem(last=False)
+                _report_cache_stats["evictions"] += 1
+            return stamped(_report_cache[key])
+        return wrapper
+    return decorator
+
+async def report_cache_metrics() -> dict:
+    versions = await db.data_versions.find_one({"_id": DATA_VERSIONS_ID}, {"_id": 0}) or {}
+    lookups = _report_cache_stats["hits"] + _report_cache_stats["misses"]
+    return {
+        **_report_cache_stats,
+        "hit_ratio": round(_report_cache_stats["hits"] / lookups, 4) if lookups else 0,
+        "entries": len(_report_cache),
+        "max_entries": REPORT_CACHE_MAX_ENTRIES,
+        "data_versions": versions
+    }
+
+@api_router.get("/admin/report-cache")
+async def get_report_cache_metrics(current_user: User = Depends(require_admin())):
+    return await report_cache_metrics()
+
+@api_router.delete("/admin/report-cache")
+async def clear_report_cache(current_user: User = Depends(require_admin())):
+    _report_cache.clear()
+    return {"message": "Report cache cleared"}
+
+# ==================== PROJECT ROLLUPS ====================
+# One document per project in project_rollups carries running financial totals.
+# Billing, CVR, PO and attendance writes apply $inc deltas, so dashboards read a
+# handful of small documents instead of re-summing raw rows. Float totals can
+# drift by rounding over time; rebuild_project_rollups() recomputes from scratch.
+
+ROLLUP_CVR_FIELDS = ["contracted_value", "work_done_value", "billed_value", "received_value", "retention_held"]
+
+BILL_STATUSES = ["pending", "approved", "paid"]
+BILL_TYPES = ["running", "final", "advance"]
+
+def check_bill_field(name: str, value: str, allowed: List[str]):
+    """Status and type become $inc path segments in the rollups, so only known values may be written"""
+    if value not in allowed:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {value}. Must be one of {', '.join(allowed)}")
+
+def _bill_key(value: str, allowed: List[str]) -> str:
+    if value not in allowed:
+        raise ValueError(f"Refusing rollup path for unknown value {value!r}")
+    return value
+
+def billing_rollup_delta(bill: dict, sign: int = 1) -> dict:
+    total = bill.get("total_amount", 0)
+    delta = {
+        "billing.count": sign,
+        "billing.total_amount": sign * total,
+        "billing.gst_amount": sign * bill.get("gst_amount", 0),
+        f"billing.count_by_status.{_bill_key(bill.get('status', 'pending'), BILL_STATUSES)}": sign,
+        f"billing.count_by_type.{_bill_key(bill.get('bill_type', 'running'), BILL_TYPES)}": sign,
+    }
+    # Amounts are only attributed to an explicit status, as the dashboards always did
+    if bill.get("status"):
+        delta[f"billing.amount_by_status.{_bill_key(bill['status'], BILL_STATUSES)}"] = sign * total
+    return delta
+
+def billing_status_rollup_delta(bill: dict, new_status: str) -> dict:
+    old_status = bill.get("status")
+    if old_status == new_status:
+        return {}
+    total = bill.get("total_amount", 0)
+    new_status = _bill_key(new_status, BILL_STATUSES)
+    old_counted = _bill_key(old_status or "pending", BILL_STATUSES)
+    delta = {f"billing.amount_by_status.{new_status}": total}
+    if old_status:
+        delta[f"billing.amount_by_status.{old_counted}"] = -total
+    if old_counted != new_status:
+        delta[f"billing.count_by_status.{old_counted}"] = -1
+        delta[f"billing.count_by_status.{new_status}"] = 1
+    return delta
+
+def cvr_rollup_delta(cvr: dict, sign: int = 1) -> dict:
+    delta = {"cvr.count": sign}
+    for field in ROLLUP_CVR_FIELDS:
+        delta[f"cvr.{field}"] = sign * cvr.get(field, 0)
+    return delta
+
+def po_rollup_delta(po: dict, sign: int = 1) -> dict:
+    return {"procurement.po_count": sign, "procurement.po_value": sign * po.get("total", 0)}
+
+def attendance_rollup_delta(att: dict, sign: int = 1) -> dict:
+    return {
+        "attendance.records": sign,
+        "attendance.present": sign if att.get("status") == "present" else 0,
+    }
+
+async def apply_rollup(project_id: Optional[str], delta: dict):
+    """Atomically add delta to a project's rollup document, creating it on first write"""
+    if not project_id or not delta:
+        return
+    await db.project_rollups.update_one(
+        {"project_id": project_id},
+        {"$inc": delta, "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}},
+        upsert=True
+    )
+    await bump_data_version("project_rollups")
+
+def _rollup_value(rollup: Optional[dict], path: str, default=0):
+    value = rollup or {}
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return default
+        value = value.get(key)
+    return default if value is None else value
+
+def _merge_counts(total: dict, part: dict):
+    for key, value in part.items():
+        if isinstance(value, dict):
+            _merge_counts(total.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)):
+            total[key] = total.get(key, 0) + value
+
+async def get_project_rollups(project_ids: Optional[List[str]] = None) -> Dict[str, dict]:
+    """Rollup documents keyed by project_id"""
+    query = {"project_id": {"$in": project_ids}} if project_ids is not None else {}
+    docs = await db.project_rollups.find(query, {"_id": 0}).to_list(None)
+    return {doc["project_id"]: doc for doc in docs}
+
+def sum_rollups(rollups) -> dict:
+    """Company-wide totals: every numeric leaf of the rollup documents summed"""
+    total = {}
+    for rollup in rollups:
+        _merge_counts(total, {k: v for k, v in rollup.items() if k not in ("project_id", "updated_at")})
+    return total
+
+async def rebuild_project_rollups() -> dict:
+    """Recompute every rollup document from the raw collections"""
+    pairs = {"project_id": "$project_id"}
+    bill_rows, bill_status_rows, bill_type_rows, cvrs, pos, attendance = await asyncio.gather(
+        group_by_project(db.billings, total_amount=sum_of("total_amount"), gst_amount=sum_of("gst_amount")),
+        db.billings.aggregate([{"$group": {
+            "_id": {**pairs, "status": "$status"},
+            "count": {"$sum": 1}, "amount": sum_of("total_amount")
+        }}]).to_list(None),
+        db.billings.aggregate([{"$group": {
+            "_id": {**pairs, "bill_type": {"$ifNull": ["$bill_type", "running"]}}, "count": {"$sum": 1}
+        }}]).to_list(None),
+        group_by_project(db.cvrs, **{field: sum_of(field) for field in ROLLUP_CVR_FIELDS}),
+        group_by_project(db.purchase_orders, value=sum_of("total")),
+        group_by_project(db.attendance, present=count_where("status", "present"))
+    )
+
+    rollups: Dict[str, dict] = {}
+    def rollup_for(pid):
+        return rollups.setdefault(pid, {
+            "project_id": pid,
+            "billing": {"count": 0, "total_amount": 0, "gst_amount": 0, "amount_by_status": {}, "count_by_status": {}, "count_by_type": {}},
+            "cvr": {"count": 0, **{field: 0 for field in ROLLUP_CVR_FIELDS}},
+            "procurement": {"po_count": 0, "po_value": 0},
+            "attendance": {"records": 0, "present": 0},
+        })
+
+    for pid, row in bill_rows.items():
+        rollup_for(pid)["billing"].update(count=row["count"], total_amount=row["total_amount"], gst_amount=row["gst_amount"])
+    for row in bill_status_rows:
+        billing = rollup_for(row["_id"].get("project_id"))["billing"]
+        status = row["_id"].get("status")
+        counts = billing["count_by_status"]
+        counts[status or "pending"] = counts.get(status or "pending", 0) + row["count"]
+        if status:
+            billing["amount_by_status"][status] = row["amount"]
+    for row in bill_type_rows:
+        rollup_for(row["_id"].get("project_id"))["billing"]["count_by_type"][row["_id"]["bill_type"]] = row["count"]
+    for pid, row in cvrs.items():
+        rollup_for(pid)["cvr"] = {"count": row["count"], **{field: row[field] for field in ROLLUP_CVR_FIELDS}}
+    for pid, row in pos.items():
+        rollup_for(pid)["procurement"] = {"po_count": row["count"], "po_value": row["value"]}
+    for pid, row in attendance.items():
+        rollup_for(pid)["attendance"] = {"records": row["count"], "present": row["present"]}
+
+    rollups.pop(None, None)
+    now = datetime.now(timezone.utc).isoformat()
+    ops = [ReplaceOne({"project_id": pid}, {**doc, "updated_at": now}, upsert=True) for pid, doc in rollups.items()]
+    if ops:
+        await db.project_rollups.bulk_write(ops, ordered=False)
+    stale = await db.project_rollups.delete_many({"project_id": {"$nin": list(rollups)}})
+    await bump_data_version("project_rollups")
+    return {"projects": len(rollups), "removed": stale.deleted_count}
+
+@api_router.post("/admin/rollups/rebuild")
+@db_budget(None)
+async def rebuild_rollups(current_user: User = Depends(require_admin())):
+    return await rebuild_project_rollups()
+
+# ==================== DASHBOARD ====================
+
+PROJECT_STATUSES = ["planning", "in_progress", "on_hold", "completed"]
+
+PROJECT_COUNTER_FACETS = {
+    "totals": totals_facet(budget=sum_of("budget"), spent=sum_of("actual_cost"), progress=sum_of("progress_percentage")),
+    "by_status": group_facet("status"),
+}
+
+def project_counters_from(result: Dict[str, List[dict]]) -> dict:
+    status_counts = keyed(result["by_status"])
+    return {
+        **first_row(result["totals"], "budget", "spent", "progress"),
+        "by_status": {status: status_counts.get(status, 0) for status in PROJECT_STATUSES}
+    }
+
+async def project_counters() -> dict:
+    """Project count, per-status counts and budget/spend/progress totals in one $facet"""
+    return project_counters_from(await facet(db.projects, PROJECT_COUNTER_FACETS))
+
+async def dashboard_counters() -> dict:
+    """Counters shared by the dashboard and executive summary: every collection is reduced
+    server-side and the per-collection rows come back from one $unionWith aggregate
+    (MongoDB 4.4+), keeping /dashboard/stats to a single round trip"""
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    present_today = await db.attendance.count_documents({"date": today, "status": "present"})
+    rows = by_source(await db.projects.aggregate([
+        {"$facet": PROJECT_COUNTER_FACETS},
+        {"$project": {"source": {"$literal": "projects"}, "totals": 1, "by_status": 1}},
+        union_source("vendors", [{"$match": {"is_active": True}}] + totals_facet(), ("count",)),
+        union_source("employees", [{"$match": {"is_active": True}}] + totals_facet(), ("count",)),
+        union_source("purchase_orders", totals_facet(value=sum_of("total"), pending=count_where("status", "pending")), ("count", "value", "pending")),
+        union_source("attendance", [{"$match": {"date": today, "status": "present"}}] + totals_facet(), ("count",)),
+    ]).to_list(None))
+    return {
+        "projects": project_counters_from(rows["projects"][0]),
+        "active_vendors": first_row(rows.get("vendors", []))["count"],
+        "active_employees": first_row(rows.get("employees", []))["count"],
+        "purchase_orders": first_row(rows.get("purchase_orders", []), "value", "pending"),
+        "present_today": first_row(rows.get("attendance", []))["count"]
+    }
+
+@api_router.get("/dashboard/stats")
+@db_budget(1, documents=5)
+async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
+    counters = await dashboard_counters()
+    projects = counters["projects"]
+    total_budget = projects["budget"]
+    total_spent = projects["spent"]
     
     return {
-        "total_projects": total_projects,
-        "active_projects": active_projects,
-        "total_vendors": total_vendors,
-        "total_employees": total_employees,
+        "total_projects": projects["count"],
+        "active_projects": projects["by_status"]["in_progress"],
+        "total_vendors": counters["active_vendors"],
+        "total_employees": counters["active_employees"],
         "total_budget": total_budget,
         "total_spent": total_spent,
         "budget_utilization": (total_spent / total_budget * 100) if total_budget > 0 else 0,
-        "pending_pos": pending_pos,
-        "present_today": present_today,
+        "pending_pos": counters["purchase_orders"]["pending"],
+        "present_today": counters["present_today"],
         "spi": 0.97,  # Schedule Performance Index - would be calculated from tasks
         "cost_variance": total_budget - total_spent,
         "safety_incidents": 0,
@@ -1085,11 +1872,11 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
     }
 
 @api_router.get("/dashboard/chart-data")
+@db_budget(1)
 async def get_chart_data(current_user: User = Depends(get_current_user)):
-    # Monthly cost data for charts
-    projects = await db.projects.find({}, {"_id": 0}).to_list(100)
+    projects = await project_counters()
     
-    # Simulate monthly data
+    # Monthly cost data for charts (simulated)
     months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
     budget_data = [120, 150, 180, 200, 220, 250]
     actual_data = [115, 155, 170, 210, 215, 240]
@@ -1100,12 +1887,7 @@ async def get_chart_data(current_user: User = Depends(get_current_user)):
             "budget": budget_data,
             "actual": actual_data
         },
-        "project_status": {
-            "planning": await db.projects.count_documents({"status": "planning"}),
-            "in_progress": await db.projects.count_documents({"status": "in_progress"}),
-            "on_hold": await db.projects.count_documents({"status": "on_hold"}),
-            "completed": await db.projects.count_documents({"status": "completed"})
-        },
+        "project_status": projects["by_status"],
         "expense_breakdown": {
             "materials": 45,
             "labor": 30,
@@ -1121,12 +1903,12 @@ async def create_project(project_data: ProjectCreate, current_user: User = Depen
     project = Project(**project_data.model_dump(), created_by=current_user.id)
     doc = project.model_dump()
     await db.projects.insert_one(doc)
+    await bump_data_version("projects")
     return project
 
 @api_router.get("/projects", response_model=List[Project])
-async def get_projects(current_user: User = Depends(get_current_user)):
-    projects = await db.projects.find({}, {"_id": 0}).to_list(1000)
-    return projects
+async def get_projects(page: PageParams = Depends(), current_user: User = Depends(get_current_user)):
+    return await paginate(db.projects, {}, INSERTION_ORDER, page)
 
 @api_router.get("/projects/{project_id}", response_model=Project)
 async def get_project(project_id: str, current_user: User = Depends(get_current_user)):
@@ -1143,12 +1925,14 @@ async def update_project(project_id: str, project_data: ProjectCreate, current_u
     
     update_dict = project_data.model_dump()
     await db.projects.update_one({"id": project_id}, {"$set": update_dict})
+    await bump_data_version("projects")
     updated = await db.projects.find_one({"id": project_id}, {"_id": 0})
     return Project(**updated)
 
 @api_router.delete("/projects/{project_id}")
 async def delete_project(project_id: str, current_user: User = Depends(check_role([UserRole.ADMIN]))):
     result = await db.projects.delete_one({"id": project_id})
+    await bump_data_version("projects")
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Project not found")
     return {"message": "Project deleted"}
@@ -1166,6 +1950,7 @@ async def update_project_status(project_id: str, data: ProjectStatusUpdate, curr
     if not existing:
         raise HTTPException(status_code=404, detail="Project not found")
     await db.projects.update_one({"id": project_id}, {"$set": {"status": data.status}})
+    await bump_data_version("projects")
     updated = await db.projects.find_one({"id": project_id}, {"_id": 0})
     return updated
 
@@ -1178,36 +1963,47 @@ async def update_project_progress(project_id: str, data: ProjectProgressUpdate,
     if data.actual_cost is not None:
         update["actual_cost"] = data.actual_cost
     await db.projects.update_one({"id": project_id}, {"$set": update})
+    await bump_data_version("projects")
     updated = await db.projects.find_one({"id": project_id}, {"_id": 0})
     return updated
 
 @api_router.get("/projects/{project_id}/summary")
+@db_budget(1, documents=10)
 async def get_project_summary(project_id: str, current_user: User = Depends(get_current_user)):
-    project = await db.projects.find_one({"id": project_id}, {"_id": 0})
-    if not project:
+    match = {"$match": {"project_id": project_id}}
+    rows = by_source(await db.projects.aggregate([
+        {"$match": {"id": project_id}},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "source": {"$literal": "projects"}, "project": "$$ROOT"}},
+        union_source("tasks", [match] + group_facet("status"), ("count",)),
+        union_source("dprs", [match, {"$sort": {"_id": -1}}, {"$group": {"_id": None, "count": {"$sum": 1}, "latest": {"$first": "$$ROOT"}}}], ("count", "latest")),
+        union_source("project_rollups", [match], ("project_id", "billing", "cvr", "procurement", "attendance")),
+    ]).to_list(None))
+    if not rows.get("projects"):
         raise HTTPException(status_code=404, detail="Project not found")
-    tasks = await db.tasks.find({"project_id": project_id}, {"_id": 0}).to_list(1000)
-    dprs = await db.dprs.find({"project_id": project_id}, {"_id": 0}).to_list(1000)
-    billings = await db.billings.find({"project_id": project_id}, {"_id": 0}).to_list(1000)
-    cvrs = await db.cvrs.find({"project_id": project_id}, {"_id": 0}).to_list(1000)
-    pos = await db.purchase_orders.find({"project_id": project_id}, {"_id": 0}).to_list(1000)
-    attendance = await db.attendance.find({"project_id": project_id}, {"_id": 0}).to_list(1000)
-
-    total_tasks = len(tasks)
-    completed_tasks = len([t for t in tasks if t.get('status') == 'completed'])
-    in_progress_tasks = len([t for t in tasks if t.get('status') == 'in_progress'])
-    total_billed = sum(b.get('total_amount', 0) for b in billings)
-    total_po = sum(p.get('total', 0) for p in pos)
-    total_cvr_work = sum(c.get('work_done_value', 0) for c in cvrs)
-    labor_days = len([a for a in attendance if a.get('status') == 'present'])
+    project = rows["projects"][0]["project"]
+    project.pop("_id", None)
+    rollup = (rows.get("project_rollups") or [None])[0]
+    dprs = (rows.get("dprs") or [{"count": 0, "latest": None}])[0]
+    latest_dpr = dprs["latest"]
+    if latest_dpr:
+        latest_dpr.pop("_id", None)
+
+    tasks_by_status = keyed(rows.get("tasks", []))
+    total_tasks = sum(tasks_by_status.values())
+    completed_tasks = tasks_by_status.get('completed', 0)
+    in_progress_tasks = tasks_by_status.get('in_progress', 0)
+    total_billed = _rollup_value(rollup, "billing.total_amount")
+    total_po = _rollup_value(rollup, "procurement.po_value")
+    total_cvr_work = _rollup_value(rollup, "cvr.work_done_value")
 
     return {
         "project": project,
         "tasks": {"total": total_tasks, "completed": completed_tasks, "in_progress": in_progress_tasks, "pending": total_tasks - completed_tasks - in_progress_tasks},
-        "dprs": {"total": len(dprs), "latest": dprs[-1] if dprs else None},
+        "dprs": {"total": dprs["count"], "latest": latest_dpr},
         "financial": {"total_billed": total_billed, "total_po_value": total_po, "total_cvr_work": total_cvr_work, "budget": project.get('budget', 0), "actual_cost": project.get('actual_cost', 0), "variance": project.get('budget', 0) - project.get('actual_cost', 0)},
-        "workforce": {"labor_days": labor_days, "attendance_records": len(attendance)},
-        "procurement": {"total_pos": len(pos), "total_po_value": total_po}
+        "workforce": {"labor_days": _rollup_value(rollup, "attendance.present"), "attendance_records": _rollup_value(rollup, "attendance.records")},
+        "procurement": {"total_pos": _rollup_value(rollup, "procurement.po_count"), "total_po_value": total_po}
     }
 
 # ==================== TASK ROUTES (WBS) ====================
@@ -1217,18 +2013,19 @@ async def create_task(task_data: TaskCreate, current_user: User = Depends(check_
     task = Task(**task_data.model_dump())
     doc = task.model_dump()
     await db.tasks.insert_one(doc)
+    await bump_data_version("tasks")
     return task
 
 @api_router.get("/tasks", response_model=List[Task])
-async def get_tasks(project_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_tasks(project_id: Optional[str] = None, page: PageParams = Depends(), current_user: User = Depends(get_current_user)):
     query = {"project_id": project_id} if project_id else {}
-    tasks = await db.tasks.find(query, {"_id": 0}).to_list(1000)
-    return tasks
+    return await paginate(db.tasks, query, INSERTION_ORDER, page)
 
 @api_router.put("/tasks/{task_id}", response_model=Task)
 async def update_task(task_id: str, task_data: TaskCreate, current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.SITE_ENGINEER]))):
     update_dict = task_data.model_dump()
     await db.tasks.update_one({"id": task_id}, {"$set": update_dict})
+    await bump_data_version("tasks")
     updated = await db.tasks.find_one({"id": task_id}, {"_id": 0})
     if not updated:
         raise HTTPException(status_code=404, detail="Task not found")
@@ -1249,12 +2046,14 @@ async def update_task_status(task_id: str, data: TaskStatusUpdate, current_user:
     elif data.status == "completed":
         update["progress"] = 100.0
     await db.tasks.update_one({"id": task_id}, {"$set": update})
+    await bump_data_version("tasks")
     updated = await db.tasks.find_one({"id": task_id}, {"_id": 0})
     return updated
 
 @api_router.delete("/tasks/{task_id}")
 async def delete_task(task_id: str, current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.SITE_ENGINEER]))):
     result = await db.tasks.delete_one({"id": task_id})
+    await bump_data_version("tasks")
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Task not found")
     return {"message": "Task deleted"}
@@ -1266,13 +2065,13 @@ async def create_dpr(dpr_data: DPRCreate, current_user: User = Depends(check_rol
     dpr = DPR(**dpr_data.model_dump(), created_by=current_user.id)
     doc = dpr.model_dump()
     await db.dprs.insert_one(doc)
+    await bump_data_version("dprs")
     return dpr
 
 @api_router.get("/dpr", response_model=List[DPR])
-async def get_dprs(project_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_dprs(project_id: Optional[str] = None, page: PageParams = Depends(), current_user: User = Depends(get_current_user)):
     query = {"project_id": project_id} if project_id else {}
-    dprs = await db.dprs.find(query, {"_id": 0}).to_list(1000)
-    return dprs
+    return await paginate(db.dprs, query, INSERTION_ORDER, page)
 
 # ==================== CVR ROUTES ====================
 
@@ -1282,34 +2081,41 @@ async def create_cvr(cvr_data: CVRCreate, current_user: User = Depends(check_rol
     cvr.variance = cvr.contracted_value - cvr.work_done_value
     doc = cvr.model_dump()
     await db.cvrs.insert_one(doc)
+    await bump_data_version("cvrs")
+    await apply_rollup(cvr.project_id, cvr_rollup_delta(doc))
     return cvr
 
 @api_router.get("/cvr", response_model=List[CVR])
-async def get_cvrs(project_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_cvrs(project_id: Optional[str] = None, page: PageParams = Depends(), current_user: User = Depends(get_current_user)):
     query = {"project_id": project_id} if project_id else {}
-    cvrs = await db.cvrs.find(query, {"_id": 0}).to_list(1000)
-    return cvrs
+    return await paginate(db.cvrs, query, INSERTION_ORDER, page)
 
 # ==================== BILLING ROUTES ====================
 
 @api_router.post("/billing", response_model=Billing)
 async def create_billing(billing_data: BillingCreate, current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.FINANCE]))):
+    check_bill_field("bill_type", billing_data.bill_type, BILL_TYPES)
     billing = Billing(**billing_data.model_dump())
     billing.gst_amount = billing.amount * billing.gst_rate / 100
     billing.total_amount = billing.amount + billing.gst_amount
     doc = billing.model_dump()
     await db.billings.insert_one(doc)
+    await bump_data_version("billings")
+    await apply_rollup(billing.project_id, billing_rollup_delta(doc))
     return billing
 
 @api_router.get("/billing", response_model=List[Billing])
-async def get_billings(project_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_billings(project_id: Optional[str] = None, page: PageParams = Depends(), current_user: User = Depends(get_current_user)):
     query = {"project_id": project_id} if project_id else {}
-    billings = await db.billings.find(query, {"_id": 0}).to_list(1000)
-    return billings
+    return await paginate(db.billings, query, INSERTION_ORDER, page)
 
 @api_router.put("/billing/{billing_id}/status")
 async def update_billing_status(billing_id: str, status: str, current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.FINANCE]))):
-    await db.billings.update_one({"id": billing_id}, {"$set": {"status": status}})
+    check_bill_field("status", status, BILL_STATUSES)
+    bill = await db.billings.find_one_and_update({"id": billing_id}, {"$set": {"status": status}}, {"_id": 0})
+    await bump_data_version("billings")
+    if bill:
+        await apply_rollup(bill.get("project_id"), billing_status_rollup_delta(bill, status))
     return {"message": "Status updated"}
 
 @api_router.get("/billing/{billing_id}")
@@ -1321,9 +2127,11 @@ async def get_billing(billing_id: str, current_user: User = Depends(check_role([
 
 @api_router.delete("/billing/{billing_id}")
 async def delete_billing(billing_id: str, current_user: User = Depends(check_role([UserRole.ADMIN]))):
-    result = await db.billings.delete_one({"id": billing_id})
-    if result.deleted_count == 0:
+    bill = await db.billings.find_one_and_delete({"id": billing_id}, {"_id": 0})
+    await bump_data_version("billings")
+    if not bill:
         raise HTTPException(status_code=404, detail="Bill not found")
+    await apply_rollup(bill.get("project_id"), billing_rollup_delta(bill, -1))
     return {"message": "Bill deleted"}
 
 class BillingStatusUpdate(BaseModel):
@@ -1331,35 +2139,35 @@ class BillingStatusUpdate(BaseModel):
 
 @api_router.patch("/billing/{billing_id}/status")
 async def patch_billing_status(billing_id: str, data: BillingStatusUpdate, current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.FINANCE]))):
-    existing = await db.billings.find_one({"id": billing_id}, {"_id": 0})
+    check_bill_field("status", data.status, BILL_STATUSES)
+    existing = await db.billings.find_one_and_update({"id": billing_id}, {"$set": {"status": data.status}}, {"_id": 0})
+    await bump_data_version("billings")
     if not existing:
         raise HTTPException(status_code=404, detail="Bill not found")
-    await db.billings.update_one({"id": billing_id}, {"$set": {"status": data.status}})
-    updated = await db.billings.find_one({"id": billing_id}, {"_id": 0})
-    return updated
+    await apply_rollup(existing.get("project_id"), billing_status_rollup_delta(existing, data.status))
+    return {**existing, "status": data.status}
 
 @api_router.delete("/cvr/{cvr_id}")
 async def delete_cvr(cvr_id: str, current_user: User = Depends(check_role([UserRole.ADMIN]))):
-    result = await db.cvrs.delete_one({"id": cvr_id})
-    if result.deleted_count == 0:
+    cvr = await db.cvrs.find_one_and_delete({"id": cvr_id}, {"_id": 0})
+    await bump_data_version("cvrs")
+    if not cvr:
         raise HTTPException(status_code=404, detail="CVR not found")
+    await apply_rollup(cvr.get("project_id"), cvr_rollup_delta(cvr, -1))
     return {"message": "CVR deleted"}
 
 @api_router.get("/financial/dashboard")
 async def get_financial_dashboard(current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.FINANCE]))):
-    billings = await db.billings.find({}, {"_id": 0}).to_list(1000)
-    cvrs = await db.cvrs.find({}, {"_id": 0}).to_list(1000)
-    projects = await db.projects.find({}, {"_id": 0}).to_list(1000)
-
-    total_billed = sum(b.get('total_amount', 0) for b in billings)
-    total_gst = sum(b.get('gst_amount', 0) for b in billings)
-    pending_amount = sum(b.get('total_amount', 0) for b in billings if b.get('status') == 'pending')
-    approved_amount = sum(b.get('total_amount', 0) for b in billings if b.get('status') == 'approved')
-    paid_amount = sum(b.get('total_amount', 0) for b in billings if b.get('status') == 'paid')
-    total_received = sum(c.get('received_value', 0) for c in cvrs)
-    total_retention = sum(c.get('retention_held', 0) for c in cvrs)
-    total_contracted = sum(c.get('contracted_value', 0) for c in cvrs)
-    total_work_done = sum(c.get('work_done_value', 0) for c in cvrs)
+    rollups, projects = await asyncio.gather(
+        get_project_rollups(),
+        db.projects.find({}, {"_id": 0, "id": 1, "name": 1, "budget": 1, "actual_cost": 1}).to_list(1000)
+    )
+    totals = sum_rollups(rollups.values())
+    amount_by_status = _rollup_value(totals, "billing.amount_by_status", {})
+
+    total_billed = _rollup_value(totals, "billing.total_amount")
+    total_received = _rollup_value(totals, "cvr.received_value")
+    total_work_done = _rollup_value(totals, "cvr.work_done_value")
     total_budget = sum(p.get('budget', 0) for p in projects)
     total_spent = sum(p.get('actual_cost', 0) for p in projects)
 
@@ -1370,51 +2178,38 @@ async def get_financial_dashboard(current_user: User = Depends(check_role([UserR
     project_breakdown = []
     for p in projects:
         pid = p.get('id')
-        p_bills = [b for b in billings if b.get('project_id') == pid]
-        p_cvrs = [c for c in cvrs if c.get('project_id') == pid]
+        rollup = rollups.get(pid)
         project_breakdown.append({
             "project_id": pid,
             "project_name": p.get('name'),
             "budget": p.get('budget', 0),
             "actual_cost": p.get('actual_cost', 0),
-            "total_billed": sum(b.get('total_amount', 0) for b in p_bills),
-            "bills_count": len(p_bills),
-            "received": sum(c.get('received_value', 0) for c in p_cvrs),
+            "total_billed": _rollup_value(rollup, "billing.total_amount"),
+            "bills_count": _rollup_value(rollup, "billing.count"),
+            "received": _rollup_value(rollup, "cvr.received_value"),
             "variance": p.get('budget', 0) - p.get('actual_cost', 0)
         })
 
-    # Bills by status
-    bills_by_status = {"pending": 0, "approved": 0, "paid": 0}
-    for b in billings:
-        s = b.get('status', 'pending')
-        bills_by_status[s] = bills_by_status.get(s, 0) + 1
-
-    # Bills by type
-    bills_by_type = {"running": 0, "final": 0, "advance": 0}
-    for b in billings:
-        t = b.get('bill_type', 'running')
-        bills_by_type[t] = bills_by_type.get(t, 0) + 1
-
     return {
         "summary": {
             "total_billed": total_billed,
-            "total_gst": total_gst,
-            "pending_collection": pending_amount,
-            "approved_amount": approved_amount,
-            "paid_amount": paid_amount,
+            "total_gst": _rollup_value(totals, "billing.gst_amount"),
+            "pending_collection": amount_by_status.get("pending", 0),
+            "approved_amount": amount_by_status.get("approved", 0),
+            "paid_amount": amount_by_status.get("paid", 0),
             "total_received": total_received,
-            "total_retention": total_retention,
+            "total_retention": _rollup_value(totals, "cvr.retention_held"),
             "collection_efficiency": collection_eff,
             "total_budget": total_budget,
             "total_spent": total_spent,
-            "total_contracted": total_contracted,
+            "total_contracted": _rollup_value(totals, "cvr.contracted_value"),
             "total_work_done": total_work_done,
             "cpi": cpi,
-            "total_bills": len(billings),
-            "total_cvrs": len(cvrs)
+            "total_bills": _rollup_value(totals, "billing.count"),
+            "total_cvrs": _rollup_value(totals, "cvr.count")
         },
-        "bills_by_status": bills_by_status,
-        "bills_by_type": bills_by_type,
+        "bills_by_status": {"pending": 0, "approved": 0, "paid": 0, **_rollup_value(totals, "billing.count_by_status", {})},
+        "bills_by_type": {"running": 0, "final": 0, "advance": 0, **_rollup_value(totals, "billing.count_by_type", {})},
         "project_breakdown": sorted(project_breakdown, key=lambda x: x['total_billed'], reverse=True)
     }
 
@@ -1425,17 +2220,18 @@ async def create_vendor(vendor_data: VendorCreate, current_user: User = Depends(
     vendor = Vendor(**vendor_data.model_dump())
     doc = vendor.model_dump()
     await db.vendors.insert_one(doc)
+    await bump_data_version("vendors")
     return vendor
 
 @api_router.get("/vendors", response_model=List[Vendor])
-async def get_vendors(category: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_vendors(category: Optional[str] = None, page: PageParams = Depends(), current_user: User = Depends(get_current_user)):
     query = {"is_active": True}
     if category:
         query["category"] = category
-    vendors = await db.vendors.find(query, {"_id": 0}).to_list(1000)
-    return vendors
+    return await paginate(db.vendors, query, INSERTION_ORDER, page)
 
 @api_router.get("/vendors/{vendor_id}", response_model=Vendor)
+@db_budget(3)
 async def get_vendor(vendor_id: str, current_user: User = Depends(get_current_user)):
     vendor = await db.vendors.find_one({"id": vendor_id}, {"_id": 0})
     if not vendor:
@@ -1444,18 +2240,30 @@ async def get_vendor(vendor_id: str, current_user: User = Depends(get_current_us
 
 @api_router.get("/vendors/{vendor_id}/detail")
 async def get_vendor_detail(vendor_id: str, current_user: User = Depends(get_current_user)):
-    vendor = await db.vendors.find_one({"id": vendor_id}, {"_id": 0})
+    vendor, pos = await asyncio.gather(
+        db.vendors.find_one({"id": vendor_id}, {"_id": 0}),
+        db.purchase_orders.find({"vendor_id": vendor_id}, {"_id": 0}).sort(INSERTION_ORDER).to_list(None)
+    )
     if not vendor:
         raise HTTPException(status_code=404, detail="Vendor not found")
-    pos = await db.purchase_orders.find({"vendor_id": vendor_id}, {"_id": 0}).to_list(1000)
-    grns = await db.grns.find({}, {"_id": 0}).to_list(1000)
-    po_ids = {po.get("id") for po in pos}
-    vendor_grns = [g for g in grns if g.get("po_id") in po_ids]
+    # Only this vendor's GRNs, through the po_id index
+    po_ids = [po.get("id") for po in pos]
+    vendor_grns = await db.grns.find({"po_id": {"$in": po_ids}}, {"_id": 0}).sort(INSERTION_ORDER).to_list(None) if po_ids else []
+    
     total_po_value = sum(po.get("total", 0) for po in pos)
     po_by_status = {}
     for po in pos:
         s = po.get("status", "pending")
         po_by_status[s] = po_by_status.get(s, 0) + 1
+    
+    # On-time delivery: a PO counts as on time when its first receipt is on or before delivery_date
+    first_receipt = {}
+    for grn in vendor_grns:
+        po_id, grn_date = grn.get("po_id"), grn.get("grn_date")
+        if grn_date and (po_id not in first_receipt or grn_date < first_receipt[po_id]):
+            first_receipt[po_id] = grn_date
+    received_pos = [po for po in pos if po.get("id") in first_receipt]
+    on_time = sum(1 for po in received_pos if po.get("delivery_date") and first_receipt[po["id"]] <= po["delivery_date"])
     return {
         "vendor": vendor,
         "purchase_orders": pos,
@@ -1465,7 +2273,10 @@ async def get_vendor_detail(vendor_id: str, current_user: User = Depends(get_cur
             "total_po_value": total_po_value,
             "total_grns": len(vendor_grns),
             "po_by_status": po_by_status,
-            "avg_po_value": round(total_po_value / len(pos)) if pos else 0
+            "avg_po_value": round(total_po_value / len(pos)) if pos else 0,
+            "received_pos": len(received_pos),
+            "on_time_pos": on_time,
+            "on_time_delivery_pct": round(on_time / len(received_pos) * 100, 2) if received_pos else 0
         }
     }
 
@@ -1473,6 +2284,7 @@ async def get_vendor_detail(vendor_id: str, current_user: User = Depends(get_cur
 async def update_vendor(vendor_id: str, vendor_data: VendorCreate, current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.PROCUREMENT]))):
     update_dict = vendor_data.model_dump()
     await db.vendors.update_one({"id": vendor_id}, {"$set": update_dict})
+    await bump_data_version("vendors")
     updated = await db.vendors.find_one({"id": vendor_id}, {"_id": 0})
     if not updated:
         raise HTTPException(status_code=404, detail="Vendor not found")
@@ -1487,6 +2299,7 @@ async def rate_vendor(vendor_id: str, data: VendorRating, current_user: User = D
     if not existing:
         raise HTTPException(status_code=404, detail="Vendor not found")
     await db.vendors.update_one({"id": vendor_id}, {"$set": {"rating": data.rating}})
+    await bump_data_version("vendors")
     updated = await db.vendors.find_one({"id": vendor_id}, {"_id": 0})
     return updated
 
@@ -1496,34 +2309,182 @@ async def deactivate_vendor(vendor_id: str, current_user: User = Depends(check_r
     if not existing:
         raise HTTPException(status_code=404, detail="Vendor not found")
     await db.vendors.update_one({"id": vendor_id}, {"$set": {"is_active": False}})
+    await bump_data_version("vendors")
     return {"message": "Vendor deactivated"}
 
+# ==================== DOCUMENT NUMBERS ====================
+# PO and GRN numbers come from a per-prefix, per-month counter document
+# ({"_id": "PO-202401", "seq": 17}) advanced with $inc, so numbering is atomic
+# and needs no count over the collection.
+
+DOCUMENT_SEQUENCES = {
+    "PO": ("purchase_orders", "po_number"),
+    "GRN": ("grns", "grn_number"),
+}
+
+async def _seed_sequence(key: str, prefix: str):
+    """Start a new month's counter after the highest number already issued for it"""
+    collection, field = DOCUMENT_SEQUENCES[prefix]
+    issued = await db[collection].find({field: {"$regex": f"^{key}-"}}, {"_id": 0, field: 1}).to_list(None)
+    suffixes = [doc[field].rsplit("-", 1)[-1] for doc in issued]
+    highest = max((int(s) for s in suffixes if s.isdigit()), default=0)
+    try:
+        await db.counters.update_one({"_id": key}, {"$max": {"seq": highest}}, upsert=True)
+    except DuplicateKeyError:
+        pass  # another request created it first
+
+async def reserve_document_numbers(prefix: str, count: int = 1) -> List[str]:
+    """Reserve count consecutive numbers for the current month in one round trip"""
+    key = f"{prefix}-{datetime.now().strftime('%Y%m')}"
+    update = {"$inc": {"seq": count}}
+    doc = await db.counters.find_one_and_update({"_id": key}, update, return_document=ReturnDocument.AFTER)
+    if doc is None:
+        await _seed_sequence(key, prefix)
+        doc = await db.counters.find_one_and_update({"_id": key}, update, upsert=True, return_document=ReturnDocument.AFTER)
+    last = doc["seq"]
+    return [f"{key}-{n:04d}" for n in range(last - count + 1, last + 1)]
+
+async def next_document_number(prefix: str) -> str:
+    return (await reserve_document_numbers(prefix))[0]
+
+# ==================== RECEIPT LEDGER ====================
+# Each PO carries received_quantities (one entry per PO item) and a receipt_open
+# flag. create_grn/delete_grn apply $inc deltas, so 3-way matching and the open
+# receipts listing never have to re-sum GRNs.
+
+def _receipt_open(items: List[dict], received: List[float]) -> bool:
+    return any((received[i] if i < len(received) else 0) < item.get("quantity", 0) for i, item in enumerate(items))
+
+def _grn_quantities(grn_items: List[dict], sign: int = 1) -> Dict[int, float]:
+    quantities: Dict[int, float] = {}
+    for item in grn_items:
+        idx = item.get("po_item_index", 0)
+        quantities[idx] = quantities.get(idx, 0) + sign * item.get("received_quantity", 0)
+    return quantities
+
+async def apply_receipt(po_id: str, grn_items: List[dict], sign: int = 1):
+    """Add (or with sign=-1 remove) a GRN's quantities to its PO's receipt ledger"""
+    po = await db.purchase_orders.find_one({"id": po_id}, {"_id": 0, "items": 1, "received_quantities": 1})
+    if not po or "received_quantities" not in po:
+        return
+    # Indices outside the PO's items never match anything, same as in 3-way matching
+    inc = {
+        f"received_quantities.{idx}": qty
+        for idx, qty in _grn_quantities(grn_items, sign).items()
+        if 0 <= idx < len(po.get("items", [])) and qty
+    }
+    if not inc:
+        return
+    updated = await db.purchase_orders.find_one_and_update(
+        {"id": po_id}, {"$inc": inc},
+        {"_id": 0, "items": 1, "received_quantities": 1, "receipt_open": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    is_open = _receipt_open(updated.get("items", []), updated["received_quantities"])
+    if is_open != updated.get("receipt_open"):
+        # Only while the quantities are still the ones the flag was computed from: a GRN
+        # applied in between saw our $inc in its own result and sets the flag itself
+        await db.purchase_orders.update_one(
+            {"id": po_id, "received_quantities": updated["received_quantities"]},
+            {"$set": {"receipt_open": is_open}}
+        )
+
+async def rebuild_receipt_ledger(po_ids: Optional[List[str]] = None) -> int:
+    """Recompute received_quantities/receipt_open from GRNs for the given POs (all when None)"""
+    po_query = {"id": {"$in": po_ids}} if po_ids is not None else {}
+    grn_match = {"po_id": {"$in": po_ids}} if po_ids is not None else {}
+    pos, rows = await asyncio.gather(
+        db.purchase_orders.find(po_query, {"_id": 0, "id": 1, "items": 1}).to_list(None),
+        db.grns.aggregate([
+            {"$match": grn_match},
+            {"$unwind": "$items"},
+            {"$group": {
+                "_id": {"po_id": "$po_id", "index": {"$ifNull": ["$items.po_item_index", 0]}},
+                "received": sum_of("items.received_quantity")
+            }}
+        ]).to_list(None)
+    )
+    received: Dict[tuple, float] = {(row["_id"]["po_id"], row["_id"]["index"]): row["received"] for row in rows}
+    ops = []
+    for po in pos:
+        items = po.get("items", [])
+        quantities = [received.get((po["id"], i), 0) for i in range(len(items))]
+        ops.append(UpdateOne({"id": po["id"]}, {"$set": {
+            "received_quantities": quantities, "receipt_open": _receipt_open(items, quantities)
+        }}))
+    if ops:
+        await db.purchase_orders.bulk_write(ops, ordered=False)
+    return len(ops)
+
+@api_router.post("/admin/receipts/rebuild")
+@db_budget(None)
+async def rebuild_receipts(current_user: User = Depends(require_admin())):
+    return {"purchase_orders": await rebuild_receipt_ledger()}
+
+@api_router.get("/purchase-orders/open-receipts")
+async def get_open_receipts(project_id: Optional[str] = None, vendor_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    """Pending quantities for every PO that is not fully received (closed POs excluded)"""
+    query = {"receipt_open": True, "status": {"$ne": "closed"}}
+    if project_id: query["project_id"] = project_id
+    if vendor_id: query["vendor_id"] = vendor_id
+    pos = await db.purchase_orders.find(query, {
+        "_id": 0, "id": 1, "po_number": 1, "project_id": 1, "vendor_id": 1,
+        "delivery_date": 1, "status": 1, "items": 1, "received_quantities": 1
+    }).sort(INSERTION_ORDER).to_list(None)
+    result = []
+    for po in pos:
+        received = po.get("received_quantities", [])
+        items = []
+        for i, item in enumerate(po.get("items", [])):
+            ordered = item.get("quantity", 0)
+            got = received[i] if i < len(received) else 0
+            if got < ordered:
+                items.append({
+                    "item_index": i,
+                    "description": item.get("description"),
+                    "unit": item.get("unit"),
+                    "ordered": ordered,
+                    "received": got,
+                    "pending": ordered - got
+                })
+        result.append({
+            "po_id": po["id"],
+            "po_number": po.get("po_number"),
+            "project_id": po.get("project_id"),
+            "vendor_id": po.get("vendor_id"),
+            "delivery_date": po.get("delivery_date"),
+            "status": po.get("status"),
+            "items": items
+        })
+    return result
+
 # ==================== PURCHASE ORDER ROUTES ====================
 
 @api_router.post("/purchase-orders", response_model=PurchaseOrder)
 async def create_purchase_order(po_data: PurchaseOrderCreate, current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.PROCUREMENT]))):
-    count = await db.purchase_orders.count_documents({})
-    po_number = f"PO-{datetime.now().strftime('%Y%m')}-{count + 1:04d}"
+    po_number = await next_document_number("PO")
     items = [item.model_dump() for item in po_data.items]
     subtotal = sum(item['quantity'] * item['rate'] for item in items)
     gst_amount = subtotal * 0.18
     po = PurchaseOrder(
         po_number=po_number, project_id=po_data.project_id, vendor_id=po_data.vendor_id,
         po_date=po_data.po_date, delivery_date=po_data.delivery_date, items=items,
-        terms=po_data.terms, subtotal=subtotal, gst_amount=gst_amount, total=subtotal + gst_amount
+        terms=po_data.terms, subtotal=subtotal, gst_amount=gst_amount, total=subtotal + gst_amount,
+        received_quantities=[0.0] * len(items), receipt_open=_receipt_open(items, [])
     )
     doc = po.model_dump()
     await db.purchase_orders.insert_one(doc)
+    await bump_data_version("purchase_orders")
+    await apply_rollup(po.project_id, po_rollup_delta(doc))
     return po
 
 @api_router.get("/purchase-orders")
-async def get_purchase_orders(project_id: Optional[str] = None, vendor_id: Optional[str] = None, status: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_purchase_orders(project_id: Optional[str] = None, vendor_id: Optional[str] = None, status: Optional[str] = None, page: PageParams = Depends(), current_user: User = Depends(get_current_user)):
     query = {}
     if project_id: query["project_id"] = project_id
     if vendor_id: query["vendor_id"] = vendor_id
     if status: query["status"] = status
-    pos = await db.purchase_orders.find(query, {"_id": 0}).to_list(1000)
-    return pos
+    return await paginate(db.purchase_orders, query, INSERTION_ORDER, page)
 
 @api_router.get("/purchase-orders/{po_id}")
 async def get_purchase_order(po_id: str, current_user: User = Depends(get_current_user)):
@@ -1533,17 +2494,12 @@ async def get_purchase_order(po_id: str, current_user: User = Depends(get_curren
     vendor = await db.vendors.find_one({"id": po.get("vendor_id")}, {"_id": 0})
     project = await db.projects.find_one({"id": po.get("project_id")}, {"_id": 0})
     grns = await db.grns.find({"po_id": po_id}, {"_id": 0}).to_list(100)
-    # 3-way matching
-    total_ordered = {i: item.get("quantity", 0) for i, item in enumerate(po.get("items", []))}
-    total_received = {}
-    for grn in grns:
-        for gi in grn.get("items", []):
-            idx = gi.get("po_item_index", 0)
-            total_received[idx] = total_received.get(idx, 0) + gi.get("received_quantity", 0)
+    # 3-way matching from the receipt ledger
+    total_received = po.get("received_quantities", [])
     matching = []
     for i, item in enumerate(po.get("items", [])):
         ordered = item.get("quantity", 0)
-        received = total_received.get(i, 0)
+        received = total_received[i] if i < len(total_received) else 0
         matching.append({
             "item_index": i,
             "description": item.get("description"),
@@ -1569,65 +2525,68 @@ async def patch_po_status(po_id: str, data: POStatusUpdate, current_user: User =
     if not existing:
         raise HTTPException(status_code=404, detail="PO not found")
     await db.purchase_orders.update_one({"id": po_id}, {"$set": {"status": data.status}})
+    await bump_data_version("purchase_orders")
     updated = await db.purchase_orders.find_one({"id": po_id}, {"_id": 0})
     return updated
 
 @api_router.delete("/purchase-orders/{po_id}")
 async def delete_po(po_id: str, current_user: User = Depends(check_role([UserRole.ADMIN]))):
-    result = await db.purchase_orders.delete_one({"id": po_id})
-    if result.deleted_count == 0:
+    po = await db.purchase_orders.find_one_and_delete({"id": po_id}, {"_id": 0})
+    await bump_data_version("purchase_orders")
+    if not po:
         raise HTTPException(status_code=404, detail="PO not found")
+    await apply_rollup(po.get("project_id"), po_rollup_delta(po, -1))
     return {"message": "PO deleted"}
 
 @api_router.get("/procurement/dashboard")
 async def get_procurement_dashboard(current_user: User = Depends(get_current_user)):
-    vendors = await db.vendors.find({"is_active": True}, {"_id": 0}).to_list(1000)
-    pos = await db.purchase_orders.find({}, {"_id": 0}).to_list(1000)
-    grns = await db.grns.find({}, {"_id": 0}).to_list(1000)
-    total_po_value = sum(po.get("total", 0) for po in pos)
-    pending_pos = len([p for p in pos if p.get("status") == "pending"])
-    approved_pos = len([p for p in pos if p.get("status") == "approved"])
-    by_category = {}
-    for v in vendors:
-        c = v.get("category", "other")
-        by_category[c] = by_category.get(c, 0) + 1
+    vendor_rows, po_facets, grn_count = await asyncio.gather(
+        db.vendors.aggregate([{"$match": {"is_active": True}}] + group_facet("category", "other")).to_list(None),
+        facet(db.purchase_orders, {
+            "totals": totals_facet(value=sum_of("total")),
+            "by_status": group_facet("status"),
+            "top_vendor": group_facet("vendor_id", value=sum_of("total")) + [{"$sort": {"value": -1}}, {"$limit": 1}],
+        }),
+        db.grns.count_documents({})
+    )
+    pos = first_row(po_facets["totals"], "value")
+    by_status = keyed(po_facets["by_status"])
     # Top vendor by PO value
-    vendor_po_map = {}
-    for po in pos:
-        vid = po.get("vendor_id")
-        vendor_po_map[vid] = vendor_po_map.get(vid, 0) + po.get("total", 0)
-    top_vendor_id = max(vendor_po_map, key=vendor_po_map.get) if vendor_po_map else None
-    top_vendor = next((v for v in vendors if v.get("id") == top_vendor_id), None) if top_vendor_id else None
+    top = po_facets["top_vendor"][0] if po_facets["top_vendor"] else None
+    top_vendor = await db.vendors.find_one({"id": top["_id"], "is_active": True}, {"_id": 0, "name": 1}) if top else None
     return {
-        "vendors": {"total": len(vendors), "by_category": by_category},
-        "purchase_orders": {"total": len(pos), "total_value": total_po_value, "pending": pending_pos, "approved": approved_pos, "delivered": len([p for p in pos if p.get("status") == "delivered"]), "closed": len([p for p in pos if p.get("status") == "closed"])},
-        "grns": {"total": len(grns)},
-        "top_vendor": {"name": top_vendor.get("name") if top_vendor else "-", "value": vendor_po_map.get(top_vendor_id, 0) if top_vendor_id else 0}
+        "vendors": {"total": sum(row["count"] for row in vendor_rows), "by_category": keyed(vendor_rows)},
+        "purchase_orders": {"total": pos["count"], "total_value": pos["value"], "pending": by_status.get("pending", 0), "approved": by_status.get("approved", 0), "delivered": by_status.get("delivered", 0), "closed": by_status.get("closed", 0)},
+        "grns": {"total": grn_count},
+        "top_vendor": {"name": top_vendor.get("name") if top_vendor else "-", "value": top["value"] if top else 0}
     }
 
 # ==================== GRN ROUTES ====================
 
 @api_router.post("/grn", response_model=GRN)
+@db_budget(5)
 async def create_grn(grn_data: GRNCreate, current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.PROCUREMENT, UserRole.SITE_ENGINEER]))):
-    count = await db.grns.count_documents({})
-    grn_number = f"GRN-{datetime.now().strftime('%Y%m')}-{count + 1:04d}"
+    grn_number = await next_document_number("GRN")
     items = [item.model_dump() for item in grn_data.items]
     grn = GRN(grn_number=grn_number, po_id=grn_data.po_id, grn_date=grn_data.grn_date, items=items, notes=grn_data.notes)
     doc = grn.model_dump()
     await db.grns.insert_one(doc)
+    await bump_data_version("grns")
+    await apply_receipt(grn.po_id, items)
     return grn
 
 @api_router.get("/grn")
-async def get_grns(po_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_grns(po_id: Optional[str] = None, page: PageParams = Depends(), current_user: User = Depends(get_current_user)):
     query = {"po_id": po_id} if po_id else {}
-    grns = await db.grns.find(query, {"_id": 0}).to_list(1000)
-    return grns
+    return await paginate(db.grns, query, INSERTION_ORDER, page)
 
 @api_router.delete("/grn/{grn_id}")
 async def delete_grn(grn_id: str, current_user: User = Depends(check_role([UserRole.ADMIN]))):
-    result = await db.grns.delete_one({"id": grn_id})
-    if result.deleted_count == 0:
+    grn = await db.grns.find_one_and_delete({"id": grn_id}, {"_id": 0})
+    await bump_data_version("grns")
+    if not grn:
         raise HTTPException(status_code=404, detail="GRN not found")
+    await apply_receipt(grn.get("po_id"), grn.get("items", []), -1)
     return {"message": "GRN deleted"}
 
 # ==================== EMPLOYEE ROUTES ====================
@@ -1654,7 +2613,7 @@ async def create_employee(employee_data: EmployeeCreate, current_user: User = De
                 phone=employee_data.phone,
                 department=employee_data.department
             )
-            user_doc = {**new_user.model_dump(), "password": get_password_hash(default_password)}
+            user_doc = {**new_user.model_dump(), "password": await get_password_hash(default_password)}
             await db.users.insert_one(user_doc)
             user_id = new_user.id
     
@@ -1663,15 +2622,15 @@ async def create_employee(employee_data: EmployeeCreate, current_user: User = De
     employee = Employee(**emp_dict)
     doc = employee.model_dump()
     await db.employees.insert_one(doc)
+    await bump_data_version("employees")
     return employee
 
 @api_router.get("/employees")
-async def get_employees(department: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_employees(department: Optional[str] = None, page: PageParams = Depends(), current_user: User = Depends(get_current_user)):
     query = {"is_active": True}
     if department:
         query["department"] = department
-    employees = await db.employees.find(query, {"_id": 0}).to_list(1000)
-    return employees
+    return await paginate(db.employees, query, INSERTION_ORDER, page)
 
 @api_router.get("/employees/{employee_id}")
 async def get_employee(employee_id: str, current_user: User = Depends(get_current_user)):
@@ -1709,6 +2668,7 @@ async def get_employee_detail(employee_id: str, current_user: User = Depends(get
 async def update_employee(employee_id: str, employee_data: EmployeeCreate, current_user: User = Depends(check_role([UserRole.ADMIN]))):
     update_dict = employee_data.model_dump()
     await db.employees.update_one({"id": employee_id}, {"$set": update_dict})
+    await bump_data_version("employees")
     updated = await db.employees.find_one({"id": employee_id}, {"_id": 0})
     if not updated:
         raise HTTPException(status_code=404, detail="Employee not found")
@@ -1720,6 +2680,7 @@ async def deactivate_employee(employee_id: str, current_user: User = Depends(che
     if not existing:
         raise HTTPException(status_code=404, detail="Employee not found")
     await db.employees.update_one({"id": employee_id}, {"$set": {"is_active": False}})
+    await bump_data_version("employees")
     return {"message": "Employee deactivated"}
 
 class LinkEmployeeUser(BaseModel):
@@ -1753,7 +2714,7 @@ async def link_employee_to_user(
                 phone=employee.get("phone"),
                 department=employee.get("department")
             )
-            user_doc = {**new_user.model_dump(), "password": get_password_hash(default_password)}
+            user_doc = {**new_user.model_dump(), "password": await get_password_hash(default_password)}
             await db.users.insert_one(user_doc)
             user_id = new_user.id
     else:
@@ -1763,6 +2724,7 @@ async def link_employee_to_user(
             raise HTTPException(status_code=404, detail="User not found")
     
     await db.employees.update_one({"id": employee_id}, {"$set": {"user_id": user_id}})
+    await bump_data_version("employees")
     return {"message": "Employee linked to user account", "user_id": user_id}
 
 @api_router.delete("/employees/{employee_id}/unlink-user")
@@ -1773,6 +2735,7 @@ async def unlink_employee_from_user(employee_id: str, current_user: User = Depen
         raise HTTPException(status_code=404, detail="Employee not found")
     
     await db.employees.update_one({"id": employee_id}, {"$unset": {"user_id": ""}})
+    await bump_data_version("employees")
     return {"message": "Employee unlinked from user account"}
 
 @api_router.get("/rbac/employees")
@@ -1819,24 +2782,137 @@ async def list_employees_with_user_info(current_user: User = Depends(require_adm
 async def create_attendance(attendance_data: AttendanceCreate, current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.SITE_ENGINEER]))):
     attendance = Attendance(**attendance_data.model_dump())
     doc = attendance.model_dump()
-    await db.attendance.insert_one(doc)
+    try:
+        await db.attendance.insert_one(doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Attendance already recorded for this employee on this date; use /attendance/bulk to update it")
+    await bump_data_version("attendance")
     doc.pop("_id", None)
+    await apply_rollup(attendance.project_id, attendance_rollup_delta(doc))
     return doc
 
+ATTENDANCE_STATUSES = {"present", "absent", "half_day", "leave"}
+
+async def write_muster(date: str, writes: List[tuple], now: str) -> List[tuple]:
+    """Upsert (row, fields) pairs with one $in read and one unordered bulk_write; returns
+    (row, fields, previous) for every row written, previous None where the row was inserted.
+    Each upsert is pinned to the row as it was read, so a row a concurrent muster inserted
+    or changed in between fails on the unique index and is re-read and retried once."""
+    written, pending = [], writes
+    for attempt in range(2):
+        existing = await db.attendance.find({"employee_id": {"$in": [fields["employee_id"] for _, fields in pending]}, "date": date}, {"_id": 0}).to_list(None)
+        existing_by_employee = {a["employee_id"]: a for a in existing}
+        ops, read = [], []
+        for row, fields in pending:
+            previous = existing_by_employee.get(fields["employee_id"])
+            pinned = {"id": previous["id"], "project_id": previous.get("project_id"), "status": previous.get("status")} if previous else {"id": str(uuid.uuid4())}
+            ops.append(UpdateOne({"employee_id": fields["employee_id"], "date": date, **pinned}, {"$set": fields, "$setOnInsert": {"created_at": now}}, upsert=True))
+            read.append((pinned["id"], previous))
+        try:
+            result = await db.attendance.bulk_write(ops, ordered=False)
+            upserted, errors = set(result.upserted_ids), {}
+        except BulkWriteError as e:
+            upserted = {u["index"] for u in e.details.get("upserted", [])}
+            errors = {err["index"]: err for err in e.details.get("writeErrors", [])}
+        retry = []
+        for index, ((row, fields), (row_id, previous)) in enumerate(zip(pending, read)):
+            error = errors.get(index)
+            if error is None:
+                inserted = index in upserted
+                row.update(id=row_id, result="inserted" if inserted else "updated")
+                written.append((row, fields, None if inserted else previous))
+            elif error.get("code") == 11000 and not attempt:
+                retry.append((row, fields))
+            else:
+                row.update(result="error", error=error.get("errmsg", "Write failed"))
+        pending = retry
+        if not pending:
+            break
+    return written
+
+@api_router.post("/attendance/bulk")
+@db_budget(6)
+async def create_attendance_bulk(muster: AttendanceMuster, current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.SITE_ENGINEER]))):
+    """Upsert a day's muster on (employee_id, date) with one unordered bulk write"""
+    try:
+        datetime.strptime(muster.date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
+    
+    employee_ids = list({entry.employee_id for entry in muster.entries})
+    employees = await db.employees.find({"id": {"$in": employee_ids}, "is_active": True}, {"_id": 0, "id": 1}).to_list(None)
+    active = {e["id"] for e in employees}
+    
+    # Validate every row up front; only valid rows are written
+    results = []
+    writes = []
+    seen = set()
+    now = datetime.now(timezone.utc).isoformat()
+    for index, entry in enumerate(muster.entries):
+        row = {"index": index, "employee_id": entry.employee_id}
+        if entry.employee_id in seen:
+            error = "Duplicate employee in muster"
+        elif entry.employee_id not in active:
+            error = "Employee not found or inactive"
+        elif entry.status not in ATTENDANCE_STATUSES:
+            error = f"Invalid status '{entry.status}'"
+        elif entry.overtime_hours < 0:
+            error = "overtime_hours cannot be negative"
+        else:
+            error = None
+        seen.add(entry.employee_id)
+        if error:
+            results.append({**row, "result": "error", "error": error})
+            continue
+        writes.append((row, {**entry.model_dump(), "project_id": muster.project_id, "date": muster.date}))
+        results.append(row)
+    
+    written = await write_muster(muster.date, writes, now) if writes else []
+    if written:
+        await bump_data_version("attendance")
+    
+    # Rollup deltas folded per project, taken from the document each upsert replaced
+    deltas: Dict[str, dict] = {}
+    def add_delta(project_id, delta):
+        target = deltas.setdefault(project_id, {})
+        for path, value in delta.items():
+            target[path] = target.get(path, 0) + value
+    for row, fields, previous in written:
+        if previous:
+            add_delta(previous.get("project_id"), attendance_rollup_delta(previous, -1))
+        add_delta(muster.project_id, attendance_rollup_delta(fields))
+    await asyncio.gather(*[
+        apply_rollup(pid, {path: value for path, value in delta.items() if value})
+        for pid, delta in deltas.items()
+    ])
+    
+    counts = {"inserted": 0, "updated": 0, "error": 0}
+    for row in results:
+        counts[row["result"]] += 1
+    return {
+        "project_id": muster.project_id,
+        "date": muster.date,
+        "inserted": counts["inserted"],
+        "updated": counts["updated"],
+        "failed": counts["error"],
+        "results": results
+    }
+
 @api_router.get("/attendance")
-async def get_attendance(employee_id: Optional[str] = None, project_id: Optional[str] = None, date: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_attendance(employee_id: Optional[str] = None, project_id: Optional[str] = None, date: Optional[str] = None, page: PageParams = Depends(), current_user: User = Depends(get_current_user)):
     query = {}
     if employee_id: query["employee_id"] = employee_id
     if project_id: query["project_id"] = project_id
     if date: query["date"] = date
-    attendance = await db.attendance.find(query, {"_id": 0}).sort("date", -1).to_list(1000)
-    return attendance
+    return await paginate(db.attendance, query, ATTENDANCE_ORDER, page)
 
 @api_router.delete("/attendance/{att_id}")
 async def delete_attendance(att_id: str, current_user: User = Depends(check_role([UserRole.ADMIN]))):
-    result = await db.attendance.delete_one({"id": att_id})
-    if result.deleted_count == 0:
+    att = await db.attendance.find_one_and_delete({"id": att_id}, {"_id": 0})
+    await bump_data_version("attendance")
+    if not att:
         raise HTTPException(status_code=404, detail="Attendance not found")
+    await apply_rollup(att.get("project_id"), attendance_rollup_delta(att, -1))
     return {"message": "Deleted"}
 
 # ==================== PAYROLL ROUTES ====================
@@ -1848,18 +2924,171 @@ async def create_payroll(payroll_data: PayrollCreate, current_user: User = Depen
     payroll.total_deductions = payroll.pf_deduction + payroll.esi_deduction + payroll.tds + payroll.other_deductions
     payroll.net_salary = payroll.gross_salary - payroll.total_deductions
     doc = payroll.model_dump()
-    await db.payrolls.insert_one(doc)
+    try:
+        await db.payrolls.insert_one(doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Payroll already exists for this employee and month")
+    await bump_data_version("payrolls")
     doc.pop("_id", None)
     return doc
 
+# Month-end payroll run: statutory rules applied to whole arrays of employees at once
+OVERTIME_RATE_MULTIPLIER = 2.0  # twice the ordinary hourly rate
+STANDARD_SHIFT_HOURS = 8
+PF_RATE = 0.12
+PF_WAGE_CEILING = 15000
+ESI_RATE = 0.0075
+ESI_WAGE_LIMIT = 21000
+TDS_STANDARD_DEDUCTION = 75000
+TDS_REBATE_LIMIT = 1200000  # no tax at or below this taxable income (sec 87A)
+TDS_CESS = 0.04
+TDS_SLABS = [
+    (0, 400000, 0.0), (400000, 800000, 0.05), (800000, 1200000, 0.10), (1200000, 1600000, 0.15),
+    (1600000, 2000000, 0.20), (2000000, 2400000, 0.25), (2400000, float("inf"), 0.30),
+]
+
+def compute_payroll_batch(basic, hra, present, half_days, leave, overtime_hours, days_in_month: int,
+                          other_allowances=0.0, other_deductions=0.0) -> Dict[str, np.ndarray]:
+    """Earnings and statutory deductions for arrays of employees (one element per employee)"""
+    paid_days = np.minimum(present + 0.5 * half_days + leave, days_in_month)
+    ratio = paid_days / days_in_month
+    earned_basic = basic * ratio
+    earned_hra = hra * ratio
+    hourly_rate = basic / (days_in_month * STANDARD_SHIFT_HOURS)
+    overtime_pay = overtime_hours * hourly_rate * OVERTIME_RATE_MULTIPLIER
+    gross = earned_basic + earned_hra + overtime_pay + other_allowances
+
+    pf = PF_RATE * np.minimum(earned_basic, PF_WAGE_CEILING)
+    esi = np.where(gross <= ESI_WAGE_LIMIT, ESI_RATE * gross, 0.0)
+
+    taxable = np.maximum(gross * 12 - TDS_STANDARD_DEDUCTION, 0)
+    annual_tax = np.zeros_like(taxable)
+    for lower, upper, rate in TDS_SLABS:
+        annual_tax += np.clip(taxable - lower, 0, upper - lower) * rate
+    annual_tax = np.where(taxable <= TDS_REBATE_LIMIT, 0.0, annual_tax * (1 + TDS_CESS))
+    tds = annual_tax / 12
+
+    deductions = pf + esi + tds + other_deductions
+    return {
+        "paid_days": paid_days, "basic_salary": earned_basic, "hra": earned_hra, "overtime_pay": overtime_pay,
+        "pf_deduction": pf, "esi_deduction": esi, "tds": tds,
+        "gross_salary": gross, "total_deductions": deductions, "net_salary": gross - deductions,
+    }
+
+# Serializes runs within this process; across processes the unique (employee_id, month)
+# index and the pending-only upsert filter keep concurrent runs from duplicating or
+# overwriting rows
+_payroll_run_locks: Dict[str, asyncio.Lock] = {}
+PAYROLL_RECOMPUTABLE = {"$in": ["pending", None]}
+
+async def write_payroll_run(ops: List[UpdateOne]) -> tuple:
+    """Apply the run's upserts; returns (created, updated, indexes of rows no longer pending)"""
+    created = updated = 0
+    pending = list(range(len(ops)))
+    for attempt in range(2):
+        try:
+            result = await db.payrolls.bulk_write([ops[i] for i in pending], ordered=False)
+            return created + result.upserted_count, updated + result.matched_count, []
+        except BulkWriteError as e:
+            created += e.details.get("nUpserted", 0)
+            updated += e.details.get("nMatched", 0)
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != 11000 for err in errors):
+                raise
+            # A duplicate key means the row exists but did not match the pending filter:
+            # another run inserted it meanwhile (the retry updates it) or it was approved
+            pending = [pending[err["index"]] for err in errors]
+    return created, updated, pending
+
+@api_router.post("/payroll/run")
+@db_budget(5)
+async def run_payroll(month: str = Query(..., description="YYYY-MM"), current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.FINANCE]))):
+    """Compute the month's payroll for every active employee from attendance; re-running recomputes pending rows"""
+    try:
+        period = datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="month must be YYYY-MM")
+    days_in_month = calendar.monthrange(period.year, period.month)[1]
+    date_range = {"$gte": f"{month}-01", "$lte": f"{month}-{days_in_month:02d}"}
+    
+    async with _payroll_run_locks.setdefault(month, asyncio.Lock()):
+        employees, attendance, existing = await asyncio.gather(
+            db.employees.find({"is_active": True}, {"_id": 0, "id": 1, "basic_salary": 1, "hra": 1}).to_list(None),
+            db.attendance.aggregate([{"$match": {"date": date_range}}] + group_facet(
+                "employee_id",
+                present=count_where("status", "present"), half_days=count_where("status", "half_day"),
+                leave=count_where("status", "leave"), overtime=sum_of("overtime_hours")
+            )).to_list(None),
+            db.payrolls.find({"month": month}, {"_id": 0, "id": 1, "employee_id": 1, "status": 1, "other_allowances": 1, "other_deductions": 1}).to_list(None)
+        )
+        existing_by_employee = {p["employee_id"]: p for p in existing}
+        # Approved or paid payrolls are final; only pending ones are recomputed
+        locked = [
+            {"employee_id": e["id"], "status": existing_by_employee[e["id"]]["status"]}
+            for e in employees
+            if existing_by_employee.get(e["id"], {}).get("status", "pending") != "pending"
+        ]
+        locked_ids = {row["employee_id"] for row in locked}
+        employees = [e for e in employees if e["id"] not in locked_ids]
+        
+        att_by_employee = {row["_id"]: row for row in attendance}
+        att_rows = [att_by_employee.get(e["id"], {}) for e in employees]
+        # Manually entered allowances and deductions on a pending row survive a re-run
+        previous_rows = [existing_by_employee.get(e["id"], {}) for e in employees]
+        def column(rows, field):
+            return np.array([row.get(field) or 0 for row in rows], dtype=float)
+        overtime = column(att_rows, "overtime")
+        pay = compute_payroll_batch(
+            column(employees, "basic_salary"), column(employees, "hra"),
+            column(att_rows, "present"), column(att_rows, "half_days"), column(att_rows, "leave"), overtime,
+            days_in_month, column(previous_rows, "other_allowances"), column(previous_rows, "other_deductions")
+        )
+        pay = {field: np.round(values, 2).tolist() for field, values in pay.items()}
+        
+        now = datetime.now(timezone.utc).isoformat()
+        ops = []
+        for i, employee in enumerate(employees):
+            fields = {field: values[i] for field, values in pay.items()}
+            fields["overtime_hours"] = float(overtime[i])
+            previous = existing_by_employee.get(employee["id"])
+            ops.append(UpdateOne(
+                {"employee_id": employee["id"], "month": month, "status": PAYROLL_RECOMPUTABLE},
+                {"$set": fields, "$setOnInsert": {
+                    "id": previous["id"] if previous else str(uuid.uuid4()),
+                    "status": "pending", "other_allowances": 0.0, "other_deductions": 0.0, "created_at": now
+                }},
+                upsert=True
+            ))
+        created, updated, finalized = 0, 0, []
+        if ops:
+            created, updated, finalized = await write_payroll_run(ops)
+            await bump_data_version("payrolls")
+            if finalized:
+                # rows approved or paid by someone else between the read and the write
+                finalized_ids = [employees[i]["id"] for i in finalized]
+                rows = await db.payrolls.find({"month": month, "employee_id": {"$in": finalized_ids}}, {"_id": 0, "employee_id": 1, "status": 1}).to_list(None)
+                locked += rows
+    written = sorted(set(range(len(employees))) - set(finalized))
+    
+    return {
+        "month": month,
+        "employees_processed": len(written),
+        "created": created,
+        "updated": updated,
+        "skipped": locked,
+        "totals": {
+            field: round(sum(pay[field][i] for i in written), 2)
+            for field in ["gross_salary", "total_deductions", "net_salary"]
+        }
+    }
+
 @api_router.get("/payroll")
-async def get_payrolls(employee_id: Optional[str] = None, month: Optional[str] = None, status: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_payrolls(employee_id: Optional[str] = None, month: Optional[str] = None, status: Optional[str] = None, page: PageParams = Depends(), current_user: User = Depends(get_current_user)):
     query = {}
     if employee_id: query["employee_id"] = employee_id
     if month: query["month"] = month
     if status: query["status"] = status
-    payrolls = await db.payrolls.find(query, {"_id": 0}).to_list(1000)
-    return payrolls
+    return await paginate(db.payrolls, query, INSERTION_ORDER, page)
 
 class PayrollStatusUpdate(BaseModel):
     status: str
@@ -1870,38 +3099,43 @@ async def update_payroll_status(payroll_id: str, data: PayrollStatusUpdate, curr
     if not existing:
         raise HTTPException(status_code=404, detail="Payroll not found")
     await db.payrolls.update_one({"id": payroll_id}, {"$set": {"status": data.status}})
+    await bump_data_version("payrolls")
     updated = await db.payrolls.find_one({"id": payroll_id}, {"_id": 0})
     return updated
 
 @api_router.delete("/payroll/{payroll_id}")
 async def delete_payroll(payroll_id: str, current_user: User = Depends(check_role([UserRole.ADMIN]))):
     result = await db.payrolls.delete_one({"id": payroll_id})
+    await bump_data_version("payrolls")
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Payroll not found")
     return {"message": "Deleted"}
 
 @api_router.get("/hrms/dashboard")
 async def get_hrms_dashboard(current_user: User = Depends(get_current_user)):
-    employees = await db.employees.find({"is_active": True}, {"_id": 0}).to_list(1000)
-    attendance = await db.attendance.find({}, {"_id": 0}).to_list(5000)
-    payrolls = await db.payrolls.find({}, {"_id": 0}).to_list(1000)
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    today_att = [a for a in attendance if a.get("date") == today]
-    present_today = len([a for a in today_att if a.get("status") == "present"])
-    by_dept = {}
-    for e in employees:
-        d = e.get("department", "Other")
-        by_dept[d] = by_dept.get(d, 0) + 1
-    total_salary = sum(e.get("basic_salary", 0) + e.get("hra", 0) for e in employees)
-    total_payroll = sum(p.get("net_salary", 0) for p in payrolls)
-    pending_payrolls = len([p for p in payrolls if p.get("status") == "pending"])
-    total_ot = sum(a.get("overtime_hours", 0) for a in attendance)
-    all_present = len([a for a in attendance if a.get("status") == "present"])
-    att_rate = round((all_present / len(attendance) * 100) if attendance else 0, 1)
+    emp_facets, att_facets, pay_facets = await asyncio.gather(
+        facet(db.employees, {
+            "totals": totals_facet(salary=sum_of("basic_salary", "hra")),
+            "by_department": group_facet("department", "Other"),
+        }, match={"is_active": True}),
+        facet(db.attendance, {
+            "totals": totals_facet(present=count_where("status", "present"), overtime=sum_of("overtime_hours")),
+            "today": [{"$match": {"date": today}}] + totals_facet(present=count_where("status", "present")),
+        }),
+        facet(db.payrolls, {
+            "totals": totals_facet(net=sum_of("net_salary"), pending=count_where("status", "pending")),
+        })
+    )
+    employees = first_row(emp_facets["totals"], "salary")
+    attendance = first_row(att_facets["totals"], "present", "overtime")
+    today_att = first_row(att_facets["today"], "present")
+    payrolls = first_row(pay_facets["totals"], "net", "pending")
+    att_rate = round((attendance["present"] / attendance["count"] * 100) if attendance["count"] else 0, 1)
     return {
-        "employees": {"total": len(employees), "by_department": by_dept, "monthly_salary_budget": total_salary},
-        "attendance": {"present_today": present_today, "total_today": len(today_att), "overall_rate": att_rate, "total_overtime": total_ot},
-        "payroll": {"total_disbursed": total_payroll, "pending": pending_payrolls, "total_processed": len(payrolls)}
+        "employees": {"total": employees["count"], "by_department": keyed(emp_facets["by_department"]), "monthly_salary_budget": employees["salary"]},
+        "attendance": {"present_today": today_att["present"], "total_today": today_att["count"], "overall_rate": att_rate, "total_overtime": attendance["overtime"]},
+        "payroll": {"total_disbursed": payrolls["net"], "pending": payrolls["pending"], "total_processed": payrolls["count"]}
     }
 
 # ==================== GST ROUTES ====================
@@ -1912,12 +3146,12 @@ async def create_gst_return(gst_data: GSTReturnCreate, current_user: User = Depe
     gst_return.tax_payable = gst_return.cgst + gst_return.sgst + gst_return.igst - gst_return.itc_claimed
     doc = gst_return.model_dump()
     await db.gst_returns.insert_one(doc)
+    await bump_data_version("gst_returns")
     return gst_return
 
 @api_router.get("/gst-returns", response_model=List[GSTReturn])
-async def get_gst_returns(current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.FINANCE]))):
-    gst_returns = await db.gst_returns.find({}, {"_id": 0}).to_list(1000)
-    return gst_returns
+async def get_gst_returns(page: PageParams = Depends(), current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.FINANCE]))):
+    return await paginate(db.gst_returns, {}, INSERTION_ORDER, page)
 
 # ==================== RERA ROUTES ====================
 
@@ -1926,12 +3160,12 @@ async def create_rera_project(rera_data: RERAProjectCreate, current_user: User =
     rera_project = RERAProject(**rera_data.model_dump())
     doc = rera_project.model_dump()
     await db.rera_projects.insert_one(doc)
+    await bump_data_version("rera_projects")
     return rera_project
 
 @api_router.get("/rera-projects", response_model=List[RERAProject])
-async def get_rera_projects(current_user: User = Depends(get_current_user)):
-    rera_projects = await db.rera_projects.find({}, {"_id": 0}).to_list(1000)
-    return rera_projects
+async def get_rera_projects(page: PageParams = Depends(), current_user: User = Depends(get_current_user)):
+    return await paginate(db.rera_projects, {}, INSERTION_ORDER, page)
 
 # ==================== GST SETTINGS API ====================
 
@@ -2294,13 +3528,13 @@ async def generate_einvoice(invoice_data: EInvoiceCreate, current_user: User = D
 @api_router.get("/einvoice")
 async def list_einvoices(
     status: Optional[str] = None,
+    page: PageParams = Depends(),
     current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.FINANCE]))
 ):
     query = {}
     if status:
         query["status"] = status
-    invoices = await db.e_invoices.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return invoices
+    return await paginate(db.e_invoices, query, NEWEST_FIRST, page)
 
 @api_router.get("/einvoice/{einvoice_id}")
 async def get_einvoice(einvoice_id: str, current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.FINANCE]))):
@@ -2357,24 +3591,20 @@ async def cancel_einvoice(einvoice_id: str, reason: str = "Data entry error", cu
 
 @api_router.get("/einvoice-stats")
 async def get_einvoice_stats(current_user: User = Depends(check_role([UserRole.ADMIN, UserRole.FINANCE]))):
-    total = await db.e_invoices.count_documents({})
-    irn_generated = await db.e_invoices.count_documents({"status": "irn_generated"})
-    cancelled = await db.e_invoices.count_documents({"status": "cancelled"})
-    failed = await db.e_invoices.count_documents({"status": {"$in": ["rejected", "auth_failed", "submission_failed"]}})
-    draft = await db.e_invoices.count_documents({"status": "draft"})
-    
-    invoices = await db.e_invoices.find({}, {"_id": 0, "total_invoice_value": 1}).to_list(1000)
-    total_value = sum(inv.get("total_invoice_value", 0) for inv in invoices)
-    
-    settings = await db.gst_settings.find_one({}, {"_id": 0})
+    invoice_facets, settings = await asyncio.gather(
+        facet(db.e_invoices, {"totals": totals_facet(value=sum_of("total_invoice_value")), "by_status": group_facet("status")}),
+        db.gst_settings.find_one({}, {"_id": 1})
+    )
+    totals = first_row(invoice_facets["totals"], "value")
+    by_status = keyed(invoice_facets["by_status"])
     
     return {
-        "total": total,
-        "irn_generated": irn_generated,
-        "cancelled": cancelled,
-        "failed": failed,
-        "draft": draft,
-        "total_value": total_value,
+        "total": totals["count"],
+        "irn_generated": by_status.get("irn_generated", 0),
+        "cancelled": by_status.get("cancelled", 0),
+        "failed": sum(by_status.get(status, 0) for status in ["rejected", "auth_failed", "submission_failed"]),
+        "draft": by_status.get("draft", 0),
+        "total_value": totals["value"],
         "credentials_configured": settings is not None
     }
 
@@ -2508,10 +3738,9 @@ async def upload_document(
     return doc
 
 @api_router.get("/documents")
-async def list_documents(project_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def list_documents(project_id: Optional[str] = None, page: PageParams = Depends(), current_user: User = Depends(get_current_user)):
     query = {"project_id": project_id} if project_id else {}
-    docs = await db.documents.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return docs
+    return await paginate(db.documents, query, NEWEST_FIRST, page)
 
 @api_router.get("/documents/{doc_id}")
 async def get_document(doc_id: str, current_user: User = Depends(get_current_user)):
@@ -2609,50 +3838,43 @@ class ReportFilters(BaseModel):
     status: Optional[str] = None
 
 @api_router.get("/reports/executive-summary")
+@db_budget(6)
+@cached_report("executive_summary", ["projects", "billings", "cvrs", "vendors", "purchase_orders", "employees", "attendance", "payrolls", "gst_returns"])
 async def get_executive_summary(current_user: User = Depends(get_current_user)):
     """Executive Summary Report - High-level KPIs and trends"""
-    # Projects summary
-    total_projects = await db.projects.count_documents({})
-    projects_by_status = {}
-    for status in ["planning", "in_progress", "on_hold", "completed"]:
-        projects_by_status[status] = await db.projects.count_documents({"status": status})
+    counters, bill_facets, cvr_facets, pay_facets, gst_facets = await asyncio.gather(
+        dashboard_counters(),
+        facet(db.billings, {"totals": totals_facet(billed=sum_of("total_amount"), pending=sum_where("status", "pending", "total_amount"))}),
+        facet(db.cvrs, {"totals": totals_facet(received=sum_of("received_value"), retention=sum_of("retention_held"))}),
+        facet(db.payrolls, {"totals": totals_facet(net=sum_of("net_salary"))}),
+        facet(db.gst_returns, {"totals": totals_facet(payable=sum_of("tax_payable"), itc=sum_of("itc_claimed"))})
+    )
     
-    projects = await db.projects.find({}, {"_id": 0}).to_list(1000)
-    total_budget = sum(p.get('budget', 0) for p in projects)
-    total_spent = sum(p.get('actual_cost', 0) for p in projects)
-    avg_progress = sum(p.get('progress_percentage', 0) for p in projects) / max(len(projects), 1)
+    # Projects summary
+    projects = counters["projects"]
+    total_budget = projects["budget"]
+    total_spent = projects["spent"]
+    avg_progress = projects["progress"] / max(projects["count"], 1)
     
     # Financial summary
-    billings = await db.billings.find({}, {"_id": 0}).to_list(1000)
-    total_billed = sum(b.get('total_amount', 0) for b in billings)
-    pending_amount = sum(b.get('total_amount', 0) for b in billings if b.get('status') == 'pending')
-    
-    cvrs = await db.cvrs.find({}, {"_id": 0}).to_list(1000)
-    total_received = sum(c.get('received_value', 0) for c in cvrs)
-    total_retention = sum(c.get('retention_held', 0) for c in cvrs)
-    
-    # Procurement summary
-    total_vendors = await db.vendors.count_documents({"is_active": True})
-    pos = await db.purchase_orders.find({}, {"_id": 0}).to_list(1000)
-    total_po_value = sum(po.get('total', 0) for po in pos)
-    pending_pos = await db.purchase_orders.count_documents({"status": "pending"})
-    
-    # HRMS summary
-    total_employees = await db.employees.count_documents({"is_active": True})
-    payrolls = await db.payrolls.find({}, {"_id": 0}).to_list(1000)
-    total_payroll = sum(p.get('net_salary', 0) for p in payrolls)
-    
-    # GST summary
-    gst_returns = await db.gst_returns.find({}, {"_id": 0}).to_list(1000)
-    total_gst_payable = sum(g.get('tax_payable', 0) for g in gst_returns)
-    total_itc = sum(g.get('itc_claimed', 0) for g in gst_returns)
+    billings = first_row(bill_facets["totals"], "billed", "pending")
+    total_billed = billings["billed"]
+    cvrs = first_row(cvr_facets["totals"], "received", "retention")
+    total_received = cvrs["received"]
+    
+    # Procurement, HRMS and GST summaries
+    pos = counters["purchase_orders"]
+    total_payroll = first_row(pay_facets["totals"], "net")["net"]
+    gst = first_row(gst_facets["totals"], "payable", "itc")
+    total_gst_payable = gst["payable"]
+    total_itc = gst["itc"]
     
     return {
         "report_type": "executive_summary",
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "projects": {
-            "total": total_projects,
-            "by_status": projects_by_status,
+            "total": projects["count"],
+            "by_status": projects["by_status"],
             "total_budget": total_budget,
             "total_spent": total_spent,
             "budget_utilization_pct": round((total_spent / total_budget * 100) if total_budget > 0 else 0, 2),
@@ -2660,18 +3882,18 @@ async def get_executive_summary(current_user: User = Depends(get_current_user)):
         },
         "financial": {
             "total_billed": total_billed,
-            "pending_collection": pending_amount,
+            "pending_collection": billings["pending"],
             "total_received": total_received,
-            "retention_held": total_retention,
+            "retention_held": cvrs["retention"],
             "collection_efficiency_pct": round((total_received / total_billed * 100) if total_billed > 0 else 0, 2)
         },
         "procurement": {
-            "active_vendors": total_vendors,
-            "total_po_value": total_po_value,
-            "pending_pos": pending_pos
+            "active_vendors": counters["active_vendors"],
+            "total_po_value": pos["value"],
+            "pending_pos": pos["pending"]
         },
         "hrms": {
-            "total_employees": total_employees,
+            "total_employees": counters["active_employees"],
             "total_payroll_cost": total_payroll
         },
         "compliance": {
@@ -2682,32 +3904,38 @@ async def get_executive_summary(current_user: User = Depends(get_current_user)):
     }
 
 @api_router.get("/reports/project-analysis")
+@db_budget(8)
+@cached_report("project_analysis", ["projects", "tasks", "dprs", "billings", "cvrs", "purchase_orders", "attendance"])
 async def get_project_analysis(project_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
     """Detailed Project Analysis Report with cost breakdown and timeline"""
     query = {"id": project_id} if project_id else {}
     projects = await db.projects.find(query, {"_id": 0}).to_list(1000)
     
+    # Related data: one grouped query per collection, keyed by project_id
+    scope = [project_id] if project_id else None
+    tasks, dprs, billings, cvrs, pos, attendance = await asyncio.gather(
+        group_by_project(db.tasks, scope, completed=count_where("status", "completed")),
+        group_by_project(db.dprs, scope),
+        group_by_project(db.billings, scope, billed=sum_of("total_amount")),
+        group_by_project(db.cvrs, scope, contracted=sum_of("contracted_value"), work_done=sum_of("work_done_value")),
+        group_by_project(db.purchase_orders, scope, value=sum_of("total")),
+        group_by_project(db.attendance, scope, present=count_where("status", "present"))
+    )
+    
     project_reports = []
     for project in projects:
         pid = project.get('id')
         
-        # Get related data
-        tasks = await db.tasks.find({"project_id": pid}, {"_id": 0}).to_list(1000)
-        dprs = await db.dprs.find({"project_id": pid}, {"_id": 0}).to_list(1000)
-        billings = await db.billings.find({"project_id": pid}, {"_id": 0}).to_list(1000)
-        cvrs = await db.cvrs.find({"project_id": pid}, {"_id": 0}).to_list(1000)
-        pos = await db.purchase_orders.find({"project_id": pid}, {"_id": 0}).to_list(1000)
-        attendance = await db.attendance.find({"project_id": pid}, {"_id": 0}).to_list(1000)
-        
         # Task analysis
-        total_tasks = len(tasks)
-        completed_tasks = len([t for t in tasks if t.get('status') == 'completed'])
+        p_tasks = tasks.get(pid, {})
+        total_tasks = p_tasks.get("count", 0)
+        completed_tasks = p_tasks.get("completed", 0)
         task_completion_pct = round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 2)
         
         # Cost analysis
-        total_billed = sum(b.get('total_amount', 0) for b in billings)
-        total_po_cost = sum(po.get('total', 0) for po in pos)
-        labor_days = len([a for a in attendance if a.get('status') == 'present'])
+        total_billed = billings.get(pid, {}).get("billed", 0)
+        total_po_cost = pos.get(pid, {}).get("value", 0)
+        labor_days = attendance.get(pid, {}).get("present", 0)
         
         # Timeline analysis
         start_date = project.get('start_date')
@@ -2731,8 +3959,9 @@ async def get_project_analysis(project_id: Optional[str] = None, current_user: U
             schedule_variance = 0
         
         # CVR analysis
-        total_contracted = sum(c.get('contracted_value', 0) for c in cvrs)
-        total_work_done = sum(c.get('work_done_value', 0) for c in cvrs)
+        p_cvrs = cvrs.get(pid, {})
+        total_contracted = p_cvrs.get("contracted", 0)
+        total_work_done = p_cvrs.get("work_done", 0)
         cost_variance = total_contracted - total_work_done
         
         project_reports.append({
@@ -2771,7 +4000,7 @@ async def get_project_analysis(project_id: Optional[str] = None, current_user: U
             },
             "workforce": {
                 "total_labor_days": labor_days,
-                "dpr_count": len(dprs)
+                "dpr_count": dprs.get(pid, {}).get("count", 0)
             }
         })
     
@@ -2783,6 +4012,8 @@ async def get_project_analysis(project_id: Optional[str] = None, current_user: U
     }
 
 @api_router.get("/reports/financial-summary")
+@db_budget(3)
+@cached_report("financial_summary", ["billings", "cvrs"])
 async def get_financial_summary(
     start_date: Optional[str] = None, 
     end_date: Optional[str] = None,
@@ -2796,30 +4027,31 @@ async def get_financial_summary(
     if end_date:
         billing_query.setdefault("bill_date", {})["$lte"] = end_date
     
-    billings = await db.billings.find(billing_query, {"_id": 0}).to_list(1000)
-    
-    billing_by_type = {"running": 0, "final": 0, "advance": 0}
-    billing_by_status = {"pending": 0, "approved": 0, "paid": 0}
-    gst_collected = 0
-    
-    for bill in billings:
-        bill_type = bill.get('bill_type', 'running')
-        billing_by_type[bill_type] = billing_by_type.get(bill_type, 0) + bill.get('total_amount', 0)
-        
-        status = bill.get('status', 'pending')
-        billing_by_status[status] = billing_by_status.get(status, 0) + bill.get('total_amount', 0)
-        
-        gst_collected += bill.get('gst_amount', 0)
+    bill_facets, cvr_facets = await asyncio.gather(
+        facet(db.billings, {
+            "totals": totals_facet(amount=sum_of("total_amount"), gst=sum_of("gst_amount")),
+            "by_type": group_facet("bill_type", "running", amount=sum_of("total_amount")),
+            "by_status": group_facet("status", "pending", amount=sum_of("total_amount")),
+        }, match=billing_query),
+        facet(db.cvrs, {
+            "totals": totals_facet(
+                contracted=sum_of("contracted_value"), work_done=sum_of("work_done_value"),
+                billed=sum_of("billed_value"), received=sum_of("received_value"), retention=sum_of("retention_held")
+            )
+        })
+    )
+    billings = first_row(bill_facets["totals"], "amount", "gst")
+    billing_by_type = keyed(bill_facets["by_type"], "amount", base={"running": 0, "final": 0, "advance": 0})
+    billing_by_status = keyed(bill_facets["by_status"], "amount", base={"pending": 0, "approved": 0, "paid": 0})
     
     # CVR analysis
-    cvrs = await db.cvrs.find({}, {"_id": 0}).to_list(1000)
-    
+    cvrs = first_row(cvr_facets["totals"], "contracted", "work_done", "billed", "received", "retention")
     cvr_summary = {
-        "total_contracted": sum(c.get('contracted_value', 0) for c in cvrs),
-        "total_work_done": sum(c.get('work_done_value', 0) for c in cvrs),
-        "total_billed": sum(c.get('billed_value', 0) for c in cvrs),
-        "total_received": sum(c.get('received_value', 0) for c in cvrs),
-        "total_retention": sum(c.get('retention_held', 0) for c in cvrs)
+        "total_contracted": cvrs["contracted"],
+        "total_work_done": cvrs["work_done"],
+        "total_billed": cvrs["billed"],
+        "total_received": cvrs["received"],
+        "total_retention": cvrs["retention"]
     }
     
     # Cash flow projection
@@ -2830,8 +4062,8 @@ async def get_financial_summary(
     for month in ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]:
         monthly_trend.append({
             "month": month,
-            "billed": len(billings) * 100000 + (hash(month) % 50000),
-            "received": len(billings) * 80000 + (hash(month) % 40000)
+            "billed": billings["count"] * 100000 + (hash(month) % 50000),
+            "received": billings["count"] * 80000 + (hash(month) % 40000)
         })
     
     return {
@@ -2842,11 +4074,11 @@ async def get_financial_summary(
             "end_date": end_date or "Present"
         },
         "billing": {
-            "total_bills": len(billings),
-            "total_amount": sum(b.get('total_amount', 0) for b in billings),
+            "total_bills": billings["count"],
+            "total_amount": billings["amount"],
             "by_type": billing_by_type,
             "by_status": billing_by_status,
-            "gst_collected": gst_collected
+            "gst_collected": billings["gst"]
         },
         "cvr_summary": cvr_summary,
         "cash_flow": {
@@ -2857,47 +4089,45 @@ async def get_financial_summary(
     }
 
 @api_router.get("/reports/procurement-analysis")
+@db_budget(5)
+@cached_report("procurement_analysis", ["vendors", "purchase_orders", "grns"])
 async def get_procurement_analysis(current_user: User = Depends(get_current_user)):
     """Procurement Analysis - Vendor performance, PO trends"""
-    vendors = await db.vendors.find({"is_active": True}, {"_id": 0}).to_list(1000)
-    pos = await db.purchase_orders.find({}, {"_id": 0}).to_list(1000)
-    grns = await db.grns.find({}, {"_id": 0}).to_list(1000)
+    vendor_rows, po_facets, grn_count = await asyncio.gather(
+        db.vendors.aggregate([{"$match": {"is_active": True}}] + group_facet("category", "other")).to_list(None),
+        facet(db.purchase_orders, {
+            "totals": totals_facet(value=sum_of("total")),
+            "by_status": group_facet("status", "pending"),
+            "top_vendors": group_facet("vendor_id", value=sum_of("total")) + [{"$sort": {"value": -1}}, {"$limit": 5}],
+        }),
+        db.grns.count_documents({})
+    )
     
     # Vendor analysis
-    vendor_by_category = {}
-    for v in vendors:
-        cat = v.get('category', 'other')
-        vendor_by_category[cat] = vendor_by_category.get(cat, 0) + 1
+    vendor_by_category = keyed(vendor_rows)
     
     # PO analysis
-    po_by_status = {"pending": 0, "approved": 0, "delivered": 0, "closed": 0}
-    po_by_vendor = {}
-    total_po_value = 0
+    pos = first_row(po_facets["totals"], "value")
+    po_by_status = keyed(po_facets["by_status"], base={"pending": 0, "approved": 0, "delivered": 0, "closed": 0})
+    total_po_value = pos["value"]
     
-    for po in pos:
-        status = po.get('status', 'pending')
-        po_by_status[status] = po_by_status.get(status, 0) + 1
-        
-        vendor_id = po.get('vendor_id')
-        po_by_vendor[vendor_id] = po_by_vendor.get(vendor_id, 0) + po.get('total', 0)
-        
-        total_po_value += po.get('total', 0)
-    
-    # Top vendors by PO value
+    # Top vendors by PO value (only vendors that are still active are listed)
+    top_ids = [row["_id"] for row in po_facets["top_vendors"]]
+    active = await db.vendors.find(
+        {"id": {"$in": top_ids}, "is_active": True}, {"_id": 0, "id": 1, "name": 1, "category": 1}
+    ).to_list(len(top_ids))
+    vendors_by_id = {v["id"]: v for v in active}
     top_vendors = []
-    for vendor_id, value in sorted(po_by_vendor.items(), key=lambda x: x[1], reverse=True)[:5]:
-        vendor = next((v for v in vendors if v.get('id') == vendor_id), None)
+    for row in po_facets["top_vendors"]:
+        vendor = vendors_by_id.get(row["_id"])
         if vendor:
             top_vendors.append({
                 "vendor_name": vendor.get('name'),
                 "category": vendor.get('category'),
-                "total_po_value": value,
-                "percentage": round((value / total_po_value * 100) if total_po_value > 0 else 0, 2)
+                "total_po_value": row["value"],
+                "percentage": round((row["value"] / total_po_value * 100) if total_po_value > 0 else 0, 2)
             })
     
-    # GRN analysis
-    grn_count = len(grns)
-    
     # Material category breakdown (from PO items)
     material_breakdown = {
         "steel": total_po_value * 0.35,
@@ -2911,14 +4141,14 @@ async def get_procurement_analysis(current_user: User = Depends(get_current_user
         "report_type": "procurement_analysis",
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "vendors": {
-            "total_active": len(vendors),
+            "total_active": sum(vendor_by_category.values()),
             "by_category": vendor_by_category
         },
         "purchase_orders": {
-            "total_count": len(pos),
+            "total_count": pos["count"],
             "total_value": total_po_value,
             "by_status": po_by_status,
-            "average_po_value": round(total_po_value / len(pos)) if pos else 0
+            "average_po_value": round(total_po_value / pos["count"]) if pos["count"] else 0
         },
         "grn": {
             "total_received": grn_count
@@ -2928,78 +4158,87 @@ async def get_procurement_analysis(current_user: User = Depends(get_current_user
     }
 
 @api_router.get("/reports/hrms-summary")
+@db_budget(4)
+@cached_report("hrms_summary", ["employees", "attendance", "payrolls"])
 async def get_hrms_summary(
     month: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
     """HRMS Summary - Attendance, Payroll, Workforce analysis"""
-    employees = await db.employees.find({"is_active": True}, {"_id": 0}).to_list(1000)
-    attendance = await db.attendance.find({}, {"_id": 0}).to_list(1000)
-    payrolls = await db.payrolls.find({}, {"_id": 0}).to_list(1000)
+    emp_facets, att_facets, pay_facets = await asyncio.gather(
+        facet(db.employees, {
+            "totals": totals_facet(salary=sum_of("basic_salary", "hra")),
+            "by_department": group_facet("department", "Other"),
+        }, match={"is_active": True}),
+        facet(db.attendance, {
+            "totals": totals_facet(overtime=sum_of("overtime_hours")),
+            "by_status": group_facet("status", "present"),
+        }),
+        facet(db.payrolls, {
+            "totals": totals_facet(
+                gross=sum_of("gross_salary"), deductions=sum_of("total_deductions"), net=sum_of("net_salary"),
+                basic_salary=sum_of("basic_salary"), hra=sum_of("hra"), overtime_pay=sum_of("overtime_pay"),
+                pf_deduction=sum_of("pf_deduction"), esi_deduction=sum_of("esi_deduction"), tds=sum_of("tds")
+            )
+        })
+    )
     
     # Employee analysis by department
-    by_department = {}
-    total_salary_budget = 0
-    for emp in employees:
-        dept = emp.get('department', 'Other')
-        by_department[dept] = by_department.get(dept, 0) + 1
-        total_salary_budget += emp.get('basic_salary', 0) + emp.get('hra', 0)
+    employees = first_row(emp_facets["totals"], "salary")
     
     # Attendance analysis
-    total_attendance = len(attendance)
-    attendance_by_status = {"present": 0, "absent": 0, "half_day": 0, "leave": 0}
-    total_overtime = 0
-    
-    for att in attendance:
-        status = att.get('status', 'present')
-        attendance_by_status[status] = attendance_by_status.get(status, 0) + 1
-        total_overtime += att.get('overtime_hours', 0)
-    
+    attendance = first_row(att_facets["totals"], "overtime")
+    total_attendance = attendance["count"]
+    attendance_by_status = keyed(att_facets["by_status"], base={"present": 0, "absent": 0, "half_day": 0, "leave": 0})
     attendance_rate = round((attendance_by_status['present'] / total_attendance * 100) if total_attendance > 0 else 0, 2)
     
     # Payroll analysis
-    total_gross = sum(p.get('gross_salary', 0) for p in payrolls)
-    total_deductions = sum(p.get('total_deductions', 0) for p in payrolls)
-    total_net = sum(p.get('net_salary', 0) for p in payrolls)
-    
-    payroll_breakdown = {
-        "basic_salary": sum(p.get('basic_salary', 0) for p in payrolls),
-        "hra": sum(p.get('hra', 0) for p in payrolls),
-        "overtime_pay": sum(p.get('overtime_pay', 0) for p in payrolls),
-        "pf_deduction": sum(p.get('pf_deduction', 0) for p in payrolls),
-        "esi_deduction": sum(p.get('esi_deduction', 0) for p in payrolls),
-        "tds": sum(p.get('tds', 0) for p in payrolls)
-    }
+    breakdown_fields = ("basic_salary", "hra", "overtime_pay", "pf_deduction", "esi_deduction", "tds")
+    payrolls = first_row(pay_facets["totals"], "gross", "deductions", "net", *breakdown_fields)
+    payroll_breakdown = {field: payrolls[field] for field in breakdown_fields}
     
     return {
         "report_type": "hrms_summary",
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "workforce": {
-            "total_employees": len(employees),
-            "by_department": by_department,
-            "monthly_salary_budget": total_salary_budget
+            "total_employees": employees["count"],
+            "by_department": keyed(emp_facets["by_department"]),
+            "monthly_salary_budget": employees["salary"]
         },
         "attendance": {
             "total_records": total_attendance,
             "by_status": attendance_by_status,
             "attendance_rate_pct": attendance_rate,
-            "total_overtime_hours": total_overtime
+            "total_overtime_hours": attendance["overtime"]
         },
         "payroll": {
-            "total_processed": len(payrolls),
-            "gross_salary": total_gross,
-            "total_deductions": total_deductions,
-            "net_disbursement": total_net,
+            "total_processed": payrolls["count"],
+            "gross_salary": payrolls["gross"],
+            "total_deductions": payrolls["deductions"],
+            "net_disbursement": payrolls["net"],
             "breakdown": payroll_breakdown
         }
     }
 
 @api_router.get("/reports/compliance-status")
+@db_budget(4)
+@cached_report("compliance_status", ["gst_returns", "rera_projects", "projects"])
 async def get_compliance_status(current_user: User = Depends(get_current_user)):
     """Compliance Status Report - GST, RERA, Statutory"""
-    gst_returns = await db.gst_returns.find({}, {"_id": 0}).to_list(1000)
-    rera_projects = await db.rera_projects.find({}, {"_id": 0}).to_list(1000)
-    projects = await db.projects.find({}, {"_id": 0}).to_list(1000)
+    gst_returns, rera_projects = await asyncio.gather(
+        db.gst_returns.find({}, {
+            "_id": 0, "return_type": 1, "period": 1, "status": 1,
+            "tax_payable": 1, "cgst": 1, "sgst": 1, "igst": 1, "itc_claimed": 1
+        }).to_list(1000),
+        db.rera_projects.find({}, {
+            "_id": 0, "project_id": 1, "rera_number": 1, "validity_date": 1,
+            "compliance_status": 1, "total_units": 1, "sold_units": 1
+        }).to_list(1000)
+    )
+    # Only the projects referenced by RERA registrations are needed, and only their names
+    project_ids = list({r.get('project_id') for r in rera_projects})
+    projects = await db.projects.find({"id": {"$in": project_ids}}, {"_id": 0, "id": 1, "name": 1}).to_list(len(project_ids))
+    project_names = {p["id"]: p.get("name") for p in projects}
     
     # GST analysis
     gst_by_type = {"GSTR-1": [], "GSTR-3B": []}
@@ -3025,9 +4264,8 @@ async def get_compliance_status(current_user: User = Depends(get_current_user)):
     
     rera_details = []
     for rera in rera_projects:
-        project = next((p for p in projects if p.get('id') == rera.get('project_id')), {})
         rera_details.append({
-            "project_name": project.get('name', 'Unknown'),
+            "project_name": project_names.get(rera.get('project_id'), 'Unknown'),
             "rera_number": rera.get('rera_number'),
             "validity_date": rera.get('validity_date'),
             "compliance_status": rera.get('compliance_status'),
@@ -3069,15 +4307,21 @@ async def get_compliance_status(current_user: User = Depends(get_current_user)):
     }
 
 @api_router.get("/reports/cost-variance")
+@db_budget(3)
+@cached_report("cost_variance", ["projects", "project_rollups"])
 async def get_cost_variance_report(current_user: User = Depends(get_current_user)):
     """Cost Variance Report - Budget vs Actual analysis"""
-    projects = await db.projects.find({}, {"_id": 0}).to_list(1000)
-    cvrs = await db.cvrs.find({}, {"_id": 0}).to_list(1000)
+    projects, rollups = await asyncio.gather(
+        db.projects.find({}, {
+            "_id": 0, "id": 1, "name": 1, "code": 1, "budget": 1, "actual_cost": 1, "progress_percentage": 1
+        }).to_list(1000),
+        get_project_rollups()
+    )
     
     variance_data = []
     for project in projects:
         pid = project.get('id')
-        project_cvrs = [c for c in cvrs if c.get('project_id') == pid]
+        rollup = rollups.get(pid)
         
         budget = project.get('budget', 0)
         actual = project.get('actual_cost', 0)
@@ -3085,8 +4329,8 @@ async def get_cost_variance_report(current_user: User = Depends(get_current_user
         variance_pct = round((variance / budget * 100) if budget > 0 else 0, 2)
         
         # CVR metrics
-        total_contracted = sum(c.get('contracted_value', 0) for c in project_cvrs)
-        total_work_done = sum(c.get('work_done_value', 0) for c in project_cvrs)
+        total_contracted = _rollup_value(rollup, "cvr.contracted_value")
+        total_work_done = _rollup_value(rollup, "cvr.work_done_value")
         
         # Cost Performance Index (CPI)
         cpi = round((total_work_done / actual) if actual > 0 else 0, 2)
@@ -3140,249 +4384,1026 @@ async def get_cost_variance_report(current_user: User = Depends(get_current_user
 # ==================== REPORT EXPORT ====================
 
 from openpyxl import Workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.utils import get_column_letter
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib import colors
 from reportlab.lib.units import mm
-from reportlab.platypus import SimpleDocTemplate, Table as RLTable, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, LongTable, TableStyle, Paragraph
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from starlette.responses import StreamingResponse
 
 EXPORT_DIR = ROOT_DIR / "exports"
 EXPORT_DIR.mkdir(parents=True, exist_ok=True)
 
-def style_excel_header(ws, row=1):
-    header_font = Font(bold=True, color="FFFFFF", size=10)
-    header_fill = PatternFill(start_color="1e293b", end_color="1e293b", fill_type="solid")
-    for cell in ws[row]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal="center", vertical="center")
+EXPORT_REPORT_TITLES = {
+    "executive-summary": "Executive Summary", "project-analysis": "Project Analysis", "financial-summary": "Financial Summary",
+    "procurement-analysis": "Procurement Analysis", "hrms-summary": "HRMS Summary", "compliance-status": "Compliance Status",
+    "cost-variance": "Cost Variance"
+}
+EXCEL_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+EXPORT_FORMATS = {"excel": ("xlsx", EXCEL_MEDIA_TYPE), "pdf": ("pdf", "application/pdf")}
+EXCEL_WIDTH_SAMPLE_ROWS = 500
+EXCEL_MAX_COLUMN_WIDTH = 40
+EXPORT_STREAM_CHUNK_SIZE = 64 * 1024
+EXPORT_STREAM_QUEUE_SIZE = 16
+EXPORT_STREAM_STALL_SECONDS = 60
+EXPORT_LOAD_BATCH_SIZE = 1000
+
+class ExportProgress:
+    """Share of its rows a renderer has written, kept in a small file so a renderer in the export
+    pool can report it; the file is rewritten once every `every` rows"""
+    def __init__(self, path: str):
+        self.path = path
+        self.start(0)
+
+    def start(self, total: int, every: int = EXPORT_LOAD_BATCH_SIZE):
+        self.total, self.every, self.done, self.reported = total, every, 0, 0
+
+    def advance(self, rows: int = 1):
+        self.done += rows
+        if self.done - self.reported >= self.every:
+            self.reported = self.done
+            with open(f"{self.path}.tmp", "w") as f:
+                f.write(str(min(1.0, self.done / self.total) if self.total else 0.0))
+            os.replace(f"{self.path}.tmp", self.path)
+
+    def fraction(self) -> float:
+        try:
+            with open(self.path) as f:
+                return float(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0.0
+
+class ExcelSheet:
+    """Write-only worksheet; column widths are taken from the first EXCEL_WIDTH_SAMPLE_ROWS rows, later rows stream straight through"""
+    HEADER_FONT = Font(bold=True, color="FFFFFF", size=10)
+    HEADER_FILL = PatternFill(start_color="1e293b", end_color="1e293b", fill_type="solid")
+    HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center")
+
+    def __init__(self, wb: Workbook, title: str, progress: Optional[ExportProgress] = None):
+        self.ws = wb.create_sheet(title)
+        self.widths: List[int] = []
+        self.sample: Optional[List[list]] = []
+        self.progress = progress
+
+    def header(self, values: list):
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(self.ws, value=value)
+            cell.font, cell.fill, cell.alignment = self.HEADER_FONT, self.HEADER_FILL, self.HEADER_ALIGNMENT
+            cells.append(cell)
+        self.append(cells)
+
+    def append(self, values: list):
+        if self.progress is not None:
+            self.progress.advance()
+        if self.sample is None:
+            self.ws.append(values)
+            return
+        for i, value in enumerate(values):
+            if isinstance(value, Cell):
+                value = value.value
+            if i == len(self.widths):
+                self.widths.append(0)
+            self.widths[i] = max(self.widths[i], len(str(value or "")))
+        self.sample.append(values)
+        if len(self.sample) >= EXCEL_WIDTH_SAMPLE_ROWS:
+            self.flush()
+
+    def flush(self):
+        """Fix the column widths (write-only sheets emit them before the first row) and write the sampled rows"""
+        if self.sample is None:
+            return
+        for i, width in enumerate(self.widths):
+            self.ws.column_dimensions[get_column_letter(i + 1)].width = min(width + 3, EXCEL_MAX_COLUMN_WIDTH)
+        for row in self.sample:
+            self.ws.append(row)
+        self.sample = None
+
+class ExportStreamAbandoned(Exception):
+    pass
+
+class _ExportSink:
+    """Unseekable file object handing bytes written by a renderer thread to the response in chunks, optionally teeing them into the export cache"""
+    def __init__(self, cache_path: Optional[Path] = None):
+        self.chunks = queue.Queue(maxsize=EXPORT_STREAM_QUEUE_SIZE)
+        self.buffer = bytearray()
+        self.abandoned = False
+        self.cache_path = cache_path
+        self.copy = None
+
+    def write(self, data) -> int:
+        if self.copy is not None:
+            self.copy.write(data)
+        self.buffer += data
+        if len(self.buffer) >= EXPORT_STREAM_CHUNK_SIZE:
+            self._put(bytes(self.buffer))
+            self.buffer.clear()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def _put(self, item):
+        deadline = time.monotonic() + EXPORT_STREAM_STALL_SECONDS
+        while not self.abandoned and time.monotonic() < deadline:
+            try:
+                self.chunks.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+        raise ExportStreamAbandoned("client went away" if self.abandoned else f"client stalled for {EXPORT_STREAM_STALL_SECONDS:g}s")
+
+    def run(self, render: Callable):
+        """Render into the sink; None is queued only after a complete render, anything else fails the producer"""
+        partial_path = export_partial_path(self.cache_path) if self.cache_path else None
+        try:
+            if partial_path:
+                self.copy = open(partial_path, "wb")
+            render(self)
+            if self.buffer:
+                self._put(bytes(self.buffer))
+            if partial_path:
+                self.copy.close()
+                os.replace(partial_path, self.cache_path)
+                enforce_export_quota()
+            self._put(None)
+        except ExportStreamAbandoned:
+            if self.abandoned:
+                return  # nobody left to tell
+            raise
+        finally:
+            if self.copy is not None:
+                self.copy.close()
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+
+def stream_export(render: Callable, filename: str, media_type: str, cache_path: Optional[Path] = None) -> StreamingResponse:
+    """Run render(fileobj) in a worker thread and stream what it writes; a complete render is also kept at cache_path"""
+    sink = _ExportSink(cache_path)
+
+    async def body():
+        loop = asyncio.get_running_loop()
+        producer = loop.run_in_executor(None, sink.run, render)
+        # Short blocking gets, so no executor thread outlives a disconnect by more than a second
+        get_chunk = partial(sink.chunks.get, timeout=1)
+        try:
+            while True:
+                try:
+                    chunk = await loop.run_in_executor(None, get_chunk)
+                except queue.Empty:
+                    if producer.done():
+                        # the renderer failed or stalled without queueing the end marker:
+                        # re-raise so the download is aborted rather than ending as a truncated 200
+                        await producer
+                        raise ExportStreamAbandoned("renderer stopped without finishing")
+                    continue
+                if chunk is None:
+                    break
+                yield chunk
+            await producer
+        finally:
+            sink.abandoned = True
+
+    return StreamingResponse(body(), media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+class ExportRows:
+    """One collection's export rows, spooled to disk in pickled batches as they come off the cursor.
+    Iterating reads them back a batch at a time (as often as the renderer likes); picklable, so a
+    renderer in the export pool streams them the same way."""
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self):
+        with open(self.path, "rb") as spool:
+            while True:
+                try:
+                    batch = pickle.load(spool)
+                except EOFError:
+                    return
+                yield from batch
+
+    def write(self, spool, batch: List[dict]):
+        pickle.dump(batch, spool, protocol=pickle.HIGHEST_PROTOCOL)
+        self.count += len(batch)
+
+def render_excel_report(report_type: str, data: Dict[str, ExportRows], out, progress: Optional[ExportProgress] = None):
+    """Write the report workbook to out with a write-only Workbook, so memory stays flat however many rows there are"""
+    wb = Workbook(write_only=True)
+    sheets: List[ExcelSheet] = []
+    if progress is not None:
+        progress.start(sum(len(rows) for rows in data.values()))
+
+    def sheet(title: str) -> ExcelSheet:
+        sheets.append(ExcelSheet(wb, title, progress))
+        return sheets[-1]
+
+    if report_type == "executive-summary":
+        projects, billings, cvrs, payrolls, gst_returns = data["projects"], data["billings"], data["cvrs"], data["payrolls"], data["gst_returns"]
+        ws = sheet("Executive Summary")
+        total_budget = sum(p.get("budget", 0) for p in projects)
+        total_spent = sum(p.get("actual_cost", 0) for p in projects)
+        total_billed = sum(b.get("total_amount", 0) for b in billings)
+        total_received = sum(c.get("received_value", 0) for c in cvrs)
+        total_payroll = sum(p.get("net_salary", 0) for p in payrolls)
+        total_gst = sum(g.get("tax_payable", 0) for g in gst_returns)
+
+        ws.append(["Civil Construction ERP - Executive Summary"])
+        ws.append([f"Generated: {datetime.now(timezone.utc).strftime('%d %b %Y %H:%M')}"])
+        ws.append([])
+        ws.header(["Metric", "Value"])
+        rows = [
+            ["Total Projects", len(projects)],
+            ["Active Projects", len([p for p in projects if p.get("status") == "in_progress"])],
+            ["Total Budget", total_budget],
+            ["Total Spent", total_spent],
+            ["Budget Utilization %", round((total_spent/total_budget*100) if total_budget else 0, 1)],
+            ["Total Billed", total_billed],
+            ["Total Received", total_received],
+            ["Collection Efficiency %", round((total_received/total_billed*100) if total_billed else 0, 1)],
+            ["Active Vendors", len(data["vendors"])],
+            ["Total PO Value", sum(po.get("total", 0) for po in data["purchase_orders"])],
+            ["Total Employees", len(data["employees"])],
+            ["Total Payroll", total_payroll],
+            ["GST Payable", total_gst],
+        ]
+        for row in rows:
+            ws.append(row)
+
+    elif report_type == "project-analysis":
+        ws = sheet("Project Analysis")
+        ws.header(["Project Code", "Project Name", "Client", "Location", "Status", "Budget", "Actual Cost", "Variance", "Progress %", "Start Date", "End Date"])
+        for p in data["projects"]:
+            ws.append([p.get("code"), p.get("name"), p.get("client_name"), p.get("location"), p.get("status"), p.get("budget", 0), p.get("actual_cost", 0), p.get("budget", 0) - p.get("actual_cost", 0), p.get("progress_percentage", 0), p.get("start_date"), p.get("expected_end_date")])
+
+    elif report_type == "financial-summary":
+        ws = sheet("Billing")
+        ws.header(["Bill No", "Date", "Project", "Description", "Type", "Amount", "GST", "Total", "Status"])
+        proj_map = {p.get("id"): p.get("name") for p in data["projects"]}
+        for b in data["billings"]:
+            ws.append([b.get("bill_number"), b.get("bill_date"), proj_map.get(b.get("project_id"), "-"), b.get("description"), b.get("bill_type"), b.get("amount", 0), b.get("gst_amount", 0), b.get("total_amount", 0), b.get("status")])
+        ws2 = sheet("CVR")
+        ws2.header(["Project", "Period Start", "Period End", "Contracted", "Work Done", "Billed", "Received", "Retention", "Variance"])
+        for c in data["cvrs"]:
+            ws2.append([proj_map.get(c.get("project_id"), "-"), c.get("period_start"), c.get("period_end"), c.get("contracted_value", 0), c.get("work_done_value", 0), c.get("billed_value", 0), c.get("received_value", 0), c.get("retention_held", 0), c.get("variance", 0)])
+
+    elif report_type == "procurement-analysis":
+        ws = sheet("Vendors")
+        ws.header(["Name", "Category", "GSTIN", "City", "State", "Contact", "Phone", "Email", "Rating"])
+        for v in data["vendors"]:
+            ws.append([v.get("name"), v.get("category"), v.get("gstin"), v.get("city"), v.get("state"), v.get("contact_person"), v.get("phone"), v.get("email"), v.get("rating", 0)])
+        ws2 = sheet("Purchase Orders")
+        ws2.header(["PO Number", "Date", "Vendor", "Delivery Date", "Subtotal", "GST", "Total", "Status"])
+        vendor_map = {v.get("id"): v.get("name") for v in data["vendors"]}
+        for po in data["purchase_orders"]:
+            ws2.append([po.get("po_number"), po.get("po_date"), vendor_map.get(po.get("vendor_id"), "-"), po.get("delivery_date"), po.get("subtotal", 0), po.get("gst_amount", 0), po.get("total", 0), po.get("status")])
+
+    elif report_type == "hrms-summary":
+        ws = sheet("Employees")
+        ws.header(["Code", "Name", "Designation", "Department", "Phone", "Email", "Joined", "Basic Salary", "HRA", "PF No", "ESI No"])
+        for e in data["employees"]:
+            ws.append([e.get("employee_code"), e.get("name"), e.get("designation"), e.get("department"), e.get("phone"), e.get("email"), e.get("date_of_joining"), e.get("basic_salary", 0), e.get("hra", 0), e.get("pf_number"), e.get("esi_number")])
+        ws2 = sheet("Payroll")
+        ws2.header(["Employee", "Month", "Basic", "HRA", "OT Pay", "Gross", "PF", "ESI", "TDS", "Total Deductions", "Net Salary", "Status"])
+        emp_map = {e.get("id"): e.get("name") for e in data["employees"]}
+        for p in data["payrolls"]:
+            ws2.append([emp_map.get(p.get("employee_id"), "-"), p.get("month"), p.get("basic_salary", 0), p.get("hra", 0), p.get("overtime_pay", 0), p.get("gross_salary", 0), p.get("pf_deduction", 0), p.get("esi_deduction", 0), p.get("tds", 0), p.get("total_deductions", 0), p.get("net_salary", 0), p.get("status")])
+
+    elif report_type == "compliance-status":
+        ws = sheet("GST Returns")
+        ws.header(["Type", "Period", "Outward Supplies", "Inward Supplies", "CGST", "SGST", "IGST", "ITC Claimed", "Tax Payable", "Status"])
+        for g in data["gst_returns"]:
+            ws.append([g.get("return_type"), g.get("period"), g.get("total_outward_supplies", 0), g.get("total_inward_supplies", 0), g.get("cgst", 0), g.get("sgst", 0), g.get("igst", 0), g.get("itc_claimed", 0), g.get("tax_payable", 0), g.get("status")])
+
+    elif report_type == "cost-variance":
+        ws = sheet("Cost Variance")
+        ws.header(["Project Code", "Project Name", "Budget", "Actual Cost", "Variance", "Variance %", "Status", "CPI"])
+        for p in data["projects"]:
+            budget = p.get("budget", 0)
+            actual = p.get("actual_cost", 0)
+            variance = budget - actual
+            ws.append([p.get("code"), p.get("name"), budget, actual, variance, round((variance/budget*100) if budget else 0, 1), "Under Budget" if variance >= 0 else "Over Budget", round((budget/actual) if actual else 0, 2)])
+
+    else:
+        raise ValueError(f"Unknown report type: {report_type}")
+
+    for ws in sheets:
+        ws.flush()
+    wb.save(out)
+
+PDF_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1e293b")),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, 0), 8),
+    ("FONTSIZE", (0, 1), (-1, -1), 7),
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f8fafc")]),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("TOPPADDING", (0, 0), (-1, -1), 4),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+])
+PDF_HEADER_ROW_HEIGHT = 18
+PDF_ROW_HEIGHT = 16
+PDF_CELL_PADDING = 6  # ReportLab's default left/right cell padding
+PDF_FRAME_PADDING = 6  # SimpleDocTemplate's frame padding on each side
+PDF_WIDTH_SAMPLE_ROWS = 200
+PDF_MAX_GLYPH_EM = 1.015  # widest Helvetica glyph ("@") as a fraction of the font size
+
+def pdf_column_widths(header: list, rows: List[list], max_width: float) -> List[float]:
+    """Size columns from the header and the first PDF_WIDTH_SAMPLE_ROWS rows, scaled down to fit the page"""
+    widths = [stringWidth(str(h), "Helvetica-Bold", 8) for h in header]
+    for row in rows[:PDF_WIDTH_SAMPLE_ROWS]:
+        for i, cell in enumerate(row):
+            widths[i] = max(widths[i], stringWidth(str(cell), "Helvetica", 7))
+    widths = [w + 2 * PDF_CELL_PADDING for w in widths]
+    scale = min(1.0, max_width / sum(widths))
+    return [w * scale for w in widths]
+
+def _pdf_fit(cell, width: float) -> str:
+    """Trim text that would spill out of its fixed-width cell; short cells skip the measurement"""
+    text = str(cell)
+    room = width - 2 * PDF_CELL_PADDING
+    if len(text) * 7 * PDF_MAX_GLYPH_EM <= room or stringWidth(text, "Helvetica", 7) <= room:
+        return text
+    while len(text) > 1 and stringWidth(text + "...", "Helvetica", 7) > room:
+        text = text[:-1]
+    return text + "..."
+
+def pdf_table_pages(header: list, rows: List[list], col_widths: List[float], first_height: float, page_height: float) -> list:
+    """One LongTable per page, each sized to fill its page, so ReportLab never splits a table or re-measures rows"""
+    tables = []
+    available, start = first_height, 0
+    while True:
+        count = max(1, int((available - PDF_HEADER_ROW_HEIGHT) // PDF_ROW_HEIGHT))
+        chunk = [[_pdf_fit(cell, col_widths[i]) for i, cell in enumerate(row)] for row in rows[start:start + count]]
+        table = LongTable([header] + chunk, colWidths=col_widths, rowHeights=[PDF_HEADER_ROW_HEIGHT] + [PDF_ROW_HEIGHT] * len(chunk))
+        table.setStyle(PDF_TABLE_STYLE)
+        tables.append(table)
+        start += count
+        if start >= len(rows):
+            return tables
+        available = page_height
+
+def render_pdf_report(report_type: str, data: Dict[str, ExportRows], out, progress: Optional[ExportProgress] = None):
+    """Write the report PDF to out (a path or binary file object) in time linear in the number of rows"""
+    doc = SimpleDocTemplate(out, pagesize=landscape(A4), leftMargin=15*mm, rightMargin=15*mm, topMargin=15*mm, bottomMargin=15*mm)
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle("ReportTitle", parent=styles["Heading1"], fontSize=16, spaceAfter=6)
+    subtitle_style = ParagraphStyle("ReportSubtitle", parent=styles["Normal"], fontSize=9, textColor=colors.grey, spaceAfter=12)
+    elements = []
+
+    elements.append(Paragraph(f"Civil ERP - {EXPORT_REPORT_TITLES[report_type]}", title_style))
+    elements.append(Paragraph(f"Generated: {datetime.now(timezone.utc).strftime('%d %b %Y %H:%M UTC')}", subtitle_style))
+
+    col_widths = None
+    if report_type == "executive-summary":
+        total_budget = sum(p.get("budget", 0) for p in data["projects"])
+        total_spent = sum(p.get("actual_cost", 0) for p in data["projects"])
+        total_billed = sum(b.get("total_amount", 0) for b in data["billings"])
+        header = ["Metric", "Value"]
+        rows = [
+            ["Total Projects", str(len(data["projects"]))], ["Total Budget", f"INR {total_budget:,.0f}"],
+            ["Total Spent", f"INR {total_spent:,.0f}"], ["Total Billed", f"INR {total_billed:,.0f}"],
+            ["Active Vendors", str(len(data["vendors"]))], ["Total Employees", str(len(data["employees"]))],
+            ["Total Payroll", f"INR {sum(p.get('net_salary',0) for p in data['payrolls']):,.0f}"]]
+        col_widths = [120*mm, 120*mm]
+
+    elif report_type == "project-analysis":
+        header = ["Code", "Name", "Client", "Status", "Budget", "Actual", "Variance", "Progress"]
+        rows = [[p.get("code",""), p.get("name","")[:25], p.get("client_name","")[:20], p.get("status",""), f"{p.get('budget',0):,.0f}", f"{p.get('actual_cost',0):,.0f}", f"{p.get('budget',0)-p.get('actual_cost',0):,.0f}", f"{p.get('progress_percentage',0)}%"] for p in data["projects"]]
+
+    elif report_type == "financial-summary":
+        proj_map = {p.get("id"): p.get("name","")[:20] for p in data["projects"]}
+        header = ["Bill No", "Date", "Project", "Amount", "GST", "Total", "Status"]
+        rows = [[b.get("bill_number",""), b.get("bill_date",""), proj_map.get(b.get("project_id"),"-"), f"{b.get('amount',0):,.0f}", f"{b.get('gst_amount',0):,.0f}", f"{b.get('total_amount',0):,.0f}", b.get("status","")] for b in data["billings"]]
+
+    elif report_type == "hrms-summary":
+        header = ["Code", "Name", "Designation", "Department", "Basic Salary", "HRA", "Joined"]
+        rows = [[e.get("employee_code",""), e.get("name",""), e.get("designation","")[:20], e.get("department",""), f"{e.get('basic_salary',0):,.0f}", f"{e.get('hra',0):,.0f}", e.get("date_of_joining","")] for e in data["employees"]]
+
+    elif report_type == "procurement-analysis":
+        header = ["Name", "Category", "GSTIN", "City", "Phone", "Rating"]
+        rows = [[v.get("name",""), v.get("category",""), v.get("gstin",""), v.get("city",""), v.get("phone",""), str(v.get("rating",0))] for v in data["vendors"]]
+
+    elif report_type == "cost-variance":
+        header = ["Code", "Name", "Budget", "Actual", "Variance", "Var %", "Status"]
+        rows = []
+        for p in data["projects"]:
+            b = p.get("budget", 0); a = p.get("actual_cost", 0); v = b - a
+            rows.append([p.get("code",""), p.get("name","")[:25], f"{b:,.0f}", f"{a:,.0f}", f"{v:,.0f}", f"{(v/b*100) if b else 0:.1f}%", "Under" if v >= 0 else "Over"])
+
+    elif report_type == "compliance-status":
+        header = ["Type", "Period", "CGST", "SGST", "IGST", "ITC", "Tax Payable", "Status"]
+        rows = [[g.get("return_type",""), g.get("period",""), f"{g.get('cgst',0):,.0f}", f"{g.get('sgst',0):,.0f}", f"{g.get('igst',0):,.0f}", f"{g.get('itc_claimed',0):,.0f}", f"{g.get('tax_payable',0):,.0f}", g.get("status","")] for g in data["gst_returns"]]
 
-def auto_column_width(ws):
-    for col in ws.columns:
-        max_len = max((len(str(cell.value or "")) for cell in col), default=0)
-        ws.column_dimensions[col[0].column_letter].width = min(max_len + 3, 40)
+    else:
+        raise ValueError(f"Unknown report type: {report_type}")
+
+    frame_width = doc.width - 2 * PDF_FRAME_PADDING
+    frame_height = doc.height - 2 * PDF_FRAME_PADDING
+    if col_widths is None:
+        col_widths = pdf_column_widths(header, rows, frame_width)
+    title_height = sum(p.wrap(frame_width, frame_height)[1] + p.getSpaceAfter() for p in elements)
+    elements.extend(pdf_table_pages(header, rows, col_widths, frame_height - title_height, frame_height))
+    if progress is not None:
+        # one table per page: report each page's rows once it is laid out
+        progress.start(len(rows), every=1)
+        doc.afterFlowable = lambda flowable: progress.advance(len(flowable._cellvalues) - 1) if isinstance(flowable, LongTable) else None
+    doc.build(elements)
+
+def check_export_request(report_type: str, format: str):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Format must be 'excel' or 'pdf'")
+    if report_type not in EXPORT_REPORT_TITLES:
+        raise HTTPException(status_code=400, detail=f"Unknown report type: {report_type}")
+
+# Which collections, and which fields of them, each export renders. load_export_data
+# fetches exactly these, concurrently; the export cache keys on the same collections.
+EXPORT_LOADERS: Dict[str, Dict[str, List[str]]] = {
+    "executive-summary": {
+        "projects": ["budget", "actual_cost", "status"],
+        "billings": ["total_amount"],
+        "cvrs": ["received_value"],
+        "vendors": ["id"],
+        "purchase_orders": ["total"],
+        "employees": ["id"],
+        "payrolls": ["net_salary"],
+        "gst_returns": ["tax_payable"],
+    },
+    "project-analysis": {
+        "projects": ["code", "name", "client_name", "location", "status", "budget", "actual_cost", "progress_percentage", "start_date", "expected_end_date"],
+    },
+    "financial-summary": {
+        "projects": ["id", "name"],
+        "billings": ["bill_number", "bill_date", "project_id", "description", "bill_type", "amount", "gst_amount", "total_amount", "status"],
+        "cvrs": ["project_id", "period_start", "period_end", "contracted_value", "work_done_value", "billed_value", "received_value", "retention_held", "variance"],
+    },
+    "procurement-analysis": {
+        "vendors": ["id", "name", "category", "gstin", "city", "state", "contact_person", "phone", "email", "rating"],
+        "purchase_orders": ["po_number", "po_date", "vendor_id", "delivery_date", "subtotal", "gst_amount", "total", "status"],
+    },
+    "hrms-summary": {
+        "employees": ["id", "employee_code", "name", "designation", "department", "phone", "email", "date_of_joining", "basic_salary", "hra", "pf_number", "esi_number"],
+        "payrolls": ["employee_id", "month", "basic_salary", "hra", "overtime_pay", "gross_salary", "pf_deduction", "esi_deduction", "tds", "total_deductions", "net_salary", "status"],
+    },
+    "compliance-status": {
+        "gst_returns": ["return_type", "period", "total_outward_supplies", "total_inward_supplies", "cgst", "sgst", "igst", "itc_claimed", "tax_payable", "status"],
+    },
+    "cost-variance": {
+        "projects": ["code", "name", "budget", "actual_cost"],
+    },
+}
+
+# Row filter per collection, the same for every report that reads it
+EXPORT_COLLECTION_SCOPES: Dict[str, dict] = {
+    "projects": {},
+    "billings": {},
+    "cvrs": {},
+    "vendors": {"is_active": True},
+    "purchase_orders": {},
+    "employees": {"is_active": True},
+    "payrolls": {},
+    "gst_returns": {},
+}
+def new_export_spool() -> str:
+    """Scratch directory for one render's spooled rows; enforce_export_quota sweeps ones left behind"""
+    return tempfile.mkdtemp(prefix="spool-", dir=EXPORT_DIR)
+
+async def load_export_data(report_type: str, spool_dir: str) -> Dict[str, ExportRows]:
+    """Stream the collections report_type renders, projected to the fields it uses, into spool_dir.
+    Memory holds one cursor batch per collection, however many rows there are."""
+    loaders = EXPORT_LOADERS[report_type]
+    loop = asyncio.get_running_loop()
+
+    async def load(collection: str, fields: List[str]) -> ExportRows:
+        rows = ExportRows(os.path.join(spool_dir, collection))
+        cursor = db[collection].find(EXPORT_COLLECTION_SCOPES[collection], {"_id": 0, **{field: 1 for field in fields}}, batch_size=EXPORT_LOAD_BATCH_SIZE)
+        with open(rows.path, "wb") as spool:
+            batch = []
+            async for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= EXPORT_LOAD_BATCH_SIZE:
+                    await loop.run_in_executor(None, rows.write, spool, batch)
+                    batch = []
+            if batch:
+                await loop.run_in_executor(None, rows.write, spool, batch)
+        return rows
+
+    rows = await asyncio.gather(*[load(collection, fields) for collection, fields in loaders.items()])
+    return dict(zip(loaders, rows))
+
+def render_spooled(render: Callable, spool_dir: str, out):
+    try:
+        render(out)
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
 
 @api_router.get("/reports/export/{report_type}")
 async def export_report(report_type: str, format: str = "excel", current_user: User = Depends(get_current_user)):
-    # Gather data
-    projects = await db.projects.find({}, {"_id": 0}).to_list(1000)
-    billings = await db.billings.find({}, {"_id": 0}).to_list(1000)
-    cvrs = await db.cvrs.find({}, {"_id": 0}).to_list(1000)
-    employees = await db.employees.find({"is_active": True}, {"_id": 0}).to_list(1000)
-    payrolls = await db.payrolls.find({}, {"_id": 0}).to_list(1000)
-    vendors = await db.vendors.find({"is_active": True}, {"_id": 0}).to_list(1000)
-    pos = await db.purchase_orders.find({}, {"_id": 0}).to_list(1000)
-    gst_returns = await db.gst_returns.find({}, {"_id": 0}).to_list(1000)
-    attendance = await db.attendance.find({}, {"_id": 0}).to_list(5000)
-
+    check_export_request(report_type, format)
     timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    extension, media_type = EXPORT_FORMATS[format]
+    filename = f"{report_type}_{timestamp}.{extension}"
 
-    if format == "excel":
-        wb = Workbook()
-        ws = wb.active
-
-        if report_type == "executive-summary":
-            ws.title = "Executive Summary"
-            total_budget = sum(p.get("budget", 0) for p in projects)
-            total_spent = sum(p.get("actual_cost", 0) for p in projects)
-            total_billed = sum(b.get("total_amount", 0) for b in billings)
-            total_received = sum(c.get("received_value", 0) for c in cvrs)
-            total_payroll = sum(p.get("net_salary", 0) for p in payrolls)
-            total_gst = sum(g.get("tax_payable", 0) for g in gst_returns)
-
-            ws.append(["Civil Construction ERP - Executive Summary"])
-            ws.append([f"Generated: {datetime.now(timezone.utc).strftime('%d %b %Y %H:%M')}"])
-            ws.append([])
-            ws.append(["Metric", "Value"])
-            style_excel_header(ws, 4)
-            data = [
-                ["Total Projects", len(projects)],
-                ["Active Projects", len([p for p in projects if p.get("status") == "in_progress"])],
-                ["Total Budget", total_budget],
-                ["Total Spent", total_spent],
-                ["Budget Utilization %", round((total_spent/total_budget*100) if total_budget else 0, 1)],
-                ["Total Billed", total_billed],
-                ["Total Received", total_received],
-                ["Collection Efficiency %", round((total_received/total_billed*100) if total_billed else 0, 1)],
-                ["Active Vendors", len(vendors)],
-                ["Total PO Value", sum(po.get("total", 0) for po in pos)],
-                ["Total Employees", len(employees)],
-                ["Total Payroll", total_payroll],
-                ["GST Payable", total_gst],
-            ]
-            for row in data:
-                ws.append(row)
-
-        elif report_type == "project-analysis":
-            ws.title = "Project Analysis"
-            ws.append(["Project Code", "Project Name", "Client", "Location", "Status", "Budget", "Actual Cost", "Variance", "Progress %", "Start Date", "End Date"])
-            style_excel_header(ws)
-            for p in projects:
-                ws.append([p.get("code"), p.get("name"), p.get("client_name"), p.get("location"), p.get("status"), p.get("budget", 0), p.get("actual_cost", 0), p.get("budget", 0) - p.get("actual_cost", 0), p.get("progress_percentage", 0), p.get("start_date"), p.get("expected_end_date")])
-
-        elif report_type == "financial-summary":
-            ws.title = "Billing"
-            ws.append(["Bill No", "Date", "Project", "Description", "Type", "Amount", "GST", "Total", "Status"])
-            style_excel_header(ws)
-            proj_map = {p.get("id"): p.get("name") for p in projects}
-            for b in billings:
-                ws.append([b.get("bill_number"), b.get("bill_date"), proj_map.get(b.get("project_id"), "-"), b.get("description"), b.get("bill_type"), b.get("amount", 0), b.get("gst_amount", 0), b.get("total_amount", 0), b.get("status")])
-            # CVR sheet
-            ws2 = wb.create_sheet("CVR")
-            ws2.append(["Project", "Period Start", "Period End", "Contracted", "Work Done", "Billed", "Received", "Retention", "Variance"])
-            style_excel_header(ws2)
-            for c in cvrs:
-                ws2.append([proj_map.get(c.get("project_id"), "-"), c.get("period_start"), c.get("period_end"), c.get("contracted_value", 0), c.get("work_done_value", 0), c.get("billed_value", 0), c.get("received_value", 0), c.get("retention_held", 0), c.get("variance", 0)])
-
-        elif report_type == "procurement-analysis":
-            ws.title = "Vendors"
-            ws.append(["Name", "Category", "GSTIN", "City", "State", "Contact", "Phone", "Email", "Rating"])
-            style_excel_header(ws)
-            for v in vendors:
-                ws.append([v.get("name"), v.get("category"), v.get("gstin"), v.get("city"), v.get("state"), v.get("contact_person"), v.get("phone"), v.get("email"), v.get("rating", 0)])
-            ws2 = wb.create_sheet("Purchase Orders")
-            ws2.append(["PO Number", "Date", "Vendor", "Delivery Date", "Subtotal", "GST", "Total", "Status"])
-            style_excel_header(ws2)
-            vendor_map = {v.get("id"): v.get("name") for v in vendors}
-            for po in pos:
-                ws2.append([po.get("po_number"), po.get("po_date"), vendor_map.get(po.get("vendor_id"), "-"), po.get("delivery_date"), po.get("subtotal", 0), po.get("gst_amount", 0), po.get("total", 0), po.get("status")])
-
-        elif report_type == "hrms-summary":
-            ws.title = "Employees"
-            ws.append(["Code", "Name", "Designation", "Department", "Phone", "Email", "Joined", "Basic Salary", "HRA", "PF No", "ESI No"])
-            style_excel_header(ws)
-            for e in employees:
-                ws.append([e.get("employee_code"), e.get("name"), e.get("designation"), e.get("department"), e.get("phone"), e.get("email"), e.get("date_of_joining"), e.get("basic_salary", 0), e.get("hra", 0), e.get("pf_number"), e.get("esi_number")])
-            ws2 = wb.create_sheet("Payroll")
-            ws2.append(["Employee", "Month", "Basic", "HRA", "OT Pay", "Gross", "PF", "ESI", "TDS", "Total Deductions", "Net Salary", "Status"])
-            style_excel_header(ws2)
-            emp_map = {e.get("id"): e.get("name") for e in employees}
-            for p in payrolls:
-                ws2.append([emp_map.get(p.get("employee_id"), "-"), p.get("month"), p.get("basic_salary", 0), p.get("hra", 0), p.get("overtime_pay", 0), p.get("gross_salary", 0), p.get("pf_deduction", 0), p.get("esi_deduction", 0), p.get("tds", 0), p.get("total_deductions", 0), p.get("net_salary", 0), p.get("status")])
-
-        elif report_type == "compliance-status":
-            ws.title = "GST Returns"
-            ws.append(["Type", "Period", "Outward Supplies", "Inward Supplies", "CGST", "SGST", "IGST", "ITC Claimed", "Tax Payable", "Status"])
-            style_excel_header(ws)
-            for g in gst_returns:
-                ws.append([g.get("return_type"), g.get("period"), g.get("total_outward_supplies", 0), g.get("total_inward_supplies", 0), g.get("cgst", 0), g.get("sgst", 0), g.get("igst", 0), g.get("itc_claimed", 0), g.get("tax_payable", 0), g.get("status")])
-
-        elif report_type == "cost-variance":
-            ws.title = "Cost Variance"
-            ws.append(["Project Code", "Project Name", "Budget", "Actual Cost", "Variance", "Variance %", "Status", "CPI"])
-            style_excel_header(ws)
-            for p in projects:
-                budget = p.get("budget", 0)
-                actual = p.get("actual_cost", 0)
-                variance = budget - actual
-                ws.append([p.get("code"), p.get("name"), budget, actual, variance, round((variance/budget*100) if budget else 0, 1), "Under Budget" if variance >= 0 else "Over Budget", round((budget/actual) if actual else 0, 2)])
+    cache_path = await export_cache_path(report_type, format)
+    if format == "excel" and not touch_cached_export(cache_path):
+        _export_cache_stats["misses"] += 1
+        spool_dir = new_export_spool()
+        try:
+            data = await load_export_data(report_type, spool_dir)
+        except BaseException:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+            raise
+        render = partial(render_spooled, partial(render_excel_report, report_type, data), spool_dir)
+        return stream_export(render, filename, media_type, cache_path=cache_path)
+
+    # PDF layout is CPU-bound; render in the export pool so the event loop keeps serving
+    await cached_export(report_type, format, cache_path)
+    return FileResponse(str(cache_path), filename=filename, media_type=media_type)
+
+# ==================== EXPORT JOBS ====================
+# Large exports run as jobs: rows are streamed from Mongo into a spool on disk, rendering
+# happens in a process pool reading the spool back and the artifact lands in EXPORT_DIR. A job is an asyncio task owned by
+# the app, not the request, so it finishes even if the client goes away.
+# Each job records the instance running it, which refreshes heartbeat_at on its open
+# jobs; jobs whose heartbeat goes stale lost their instance and are marked failed.
+
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', '2'))
+EXPORT_MAX_ACTIVE_JOBS = int(os.environ.get('EXPORT_MAX_ACTIVE_JOBS', '8'))
+EXPORT_JOB_HEARTBEAT_SECONDS = int(os.environ.get('EXPORT_JOB_HEARTBEAT_SECONDS', '15'))
+EXPORT_JOB_STALE_SECONDS = EXPORT_JOB_HEARTBEAT_SECONDS * 4
+EXPORT_INSTANCE_ID = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+EXPORT_ACTIVE_STATUSES = ["queued", "loading", "rendering"]
+EXPORT_JOB_PROGRESS_SECONDS = 1
+_export_pool: Optional[ProcessPoolExecutor] = None
+_export_tasks: set = set()
+
+def export_pool() -> ProcessPoolExecutor:
+    global _export_pool
+    if _export_pool is None:
+        # spawn rather than fork: the parent has Motor's monitor threads and a running loop
+        _export_pool = ProcessPoolExecutor(max_workers=EXPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _export_pool
+
+def render_export(report_type: str, format: str, data: Dict[str, ExportRows], path: str, progress: Optional[ExportProgress] = None) -> int:
+    """Process-pool entry point: render one export to path and return its size; the file appears only when complete"""
+    render = render_excel_report if format == "excel" else render_pdf_report
+    partial_path = export_partial_path(path)
+    try:
+        with open(partial_path, "wb") as out:
+            render(report_type, data, out, progress)
+        os.replace(partial_path, path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return os.path.getsize(path)
+
+async def run_export(report_type: str, format: str, data: Dict[str, ExportRows], path: Path, progress: Optional[ExportProgress] = None) -> int:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(export_pool(), render_export, report_type, format, data, str(path), progress)
+
+async def _set_export_job(job_id: str, **fields):
+    await db.export_jobs.update_one({"id": job_id}, {"$set": fields})
+
+def export_job_progress(render: Optional[dict]) -> tuple:
+    """(status, progress) of a job waiting on a render: loading is 5%, rendering 10-95% by rows written"""
+    if render is None or render["status"] == "loading":
+        return "loading", 5
+    return "rendering", 10 + int(85 * render["progress"].fraction())
+
+async def run_export_job(job: ExportJob):
+    try:
+        await _set_export_job(job.id, status="loading", progress=5, started_at=datetime.now(timezone.utc).isoformat())
+        path = await export_cache_path(job.report_type, job.format)
+        export = asyncio.ensure_future(cached_export(job.report_type, job.format, path))
+        reported = ("loading", 5)
+        while not export.done():
+            await asyncio.wait({export}, timeout=EXPORT_JOB_PROGRESS_SECONDS)
+            state = export_job_progress(_export_render_states.get(path))
+            if not export.done() and state != reported:
+                await _set_export_job(job.id, status=state[0], progress=state[1])
+                reported = state
+        await export
+        await _set_export_job(
+            job.id, status="completed", progress=100, filename=path.name, size=path.stat().st_size,
+            completed_at=datetime.now(timezone.utc).isoformat()
+        )
+    except Exception as e:
+        logger.exception(f"Export job {job.id} failed")
+        await _set_export_job(job.id, status="failed", error=str(e) or type(e).__name__, completed_at=datetime.now(timezone.utc).isoformat())
+
+async def beat_export_jobs() -> int:
+    """Refresh this instance's open jobs, then fail open jobs whose instance stopped beating"""
+    now = datetime.now(timezone.utc)
+    active = {"$in": EXPORT_ACTIVE_STATUSES}
+    if _export_tasks:
+        await db.export_jobs.update_many({"instance_id": EXPORT_INSTANCE_ID, "status": active}, {"$set": {"heartbeat_at": now.isoformat()}})
+    stale_before = (now - timedelta(seconds=EXPORT_JOB_STALE_SECONDS)).isoformat()
+    result = await db.export_jobs.update_many(
+        {
+            "status": active,
+            "instance_id": {"$ne": EXPORT_INSTANCE_ID},
+            "$or": [{"heartbeat_at": {"$lt": stale_before}}, {"heartbeat_at": None}]
+        },
+        {"$set": {"status": "failed", "error": "Interrupted: the server running it stopped", "completed_at": now.isoformat()}}
+    )
+    return result.modified_count
 
-        else:
-            raise HTTPException(status_code=400, detail=f"Unknown report type: {report_type}")
-
-        auto_column_width(ws)
-        filepath = EXPORT_DIR / f"{report_type}_{timestamp}.xlsx"
-        wb.save(str(filepath))
-        return FileResponse(str(filepath), filename=f"{report_type}_{timestamp}.xlsx", media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
-    elif format == "pdf":
-        filepath = EXPORT_DIR / f"{report_type}_{timestamp}.pdf"
-        doc = SimpleDocTemplate(str(filepath), pagesize=landscape(A4), leftMargin=15*mm, rightMargin=15*mm, topMargin=15*mm, bottomMargin=15*mm)
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle("ReportTitle", parent=styles["Heading1"], fontSize=16, spaceAfter=6)
-        subtitle_style = ParagraphStyle("ReportSubtitle", parent=styles["Normal"], fontSize=9, textColor=colors.grey, spaceAfter=12)
-        elements = []
-        report_titles = {"executive-summary": "Executive Summary", "project-analysis": "Project Analysis", "financial-summary": "Financial Summary", "procurement-analysis": "Procurement Analysis", "hrms-summary": "HRMS Summary", "compliance-status": "Compliance Status", "cost-variance": "Cost Variance"}
-
-        elements.append(Paragraph(f"Civil ERP - {report_titles.get(report_type, report_type)}", title_style))
-        elements.append(Paragraph(f"Generated: {datetime.now(timezone.utc).strftime('%d %b %Y %H:%M UTC')}", subtitle_style))
-
-        header_style = TableStyle([
-            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1e293b")),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("FONTSIZE", (0, 0), (-1, 0), 8),
-            ("FONTSIZE", (0, 1), (-1, -1), 7),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f8fafc")]),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("TOPPADDING", (0, 0), (-1, -1), 4),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-        ])
-
-        if report_type == "executive-summary":
-            total_budget = sum(p.get("budget", 0) for p in projects)
-            total_spent = sum(p.get("actual_cost", 0) for p in projects)
-            total_billed = sum(b.get("total_amount", 0) for b in billings)
-            data = [["Metric", "Value"],
-                ["Total Projects", str(len(projects))], ["Total Budget", f"INR {total_budget:,.0f}"],
-                ["Total Spent", f"INR {total_spent:,.0f}"], ["Total Billed", f"INR {total_billed:,.0f}"],
-                ["Active Vendors", str(len(vendors))], ["Total Employees", str(len(employees))],
-                ["Total Payroll", f"INR {sum(p.get('net_salary',0) for p in payrolls):,.0f}"]]
-            t = RLTable(data, colWidths=[120*mm, 120*mm])
-            t.setStyle(header_style)
-            elements.append(t)
-
-        elif report_type == "project-analysis":
-            data = [["Code", "Name", "Client", "Status", "Budget", "Actual", "Variance", "Progress"]]
-            for p in projects:
-                data.append([p.get("code",""), p.get("name","")[:25], p.get("client_name","")[:20], p.get("status",""), f"{p.get('budget',0):,.0f}", f"{p.get('actual_cost',0):,.0f}", f"{p.get('budget',0)-p.get('actual_cost',0):,.0f}", f"{p.get('progress_percentage',0)}%"])
-            t = RLTable(data)
-            t.setStyle(header_style)
-            elements.append(t)
-
-        elif report_type == "financial-summary":
-            proj_map = {p.get("id"): p.get("name","")[:20] for p in projects}
-            data = [["Bill No", "Date", "Project", "Amount", "GST", "Total", "Status"]]
-            for b in billings:
-                data.append([b.get("bill_number",""), b.get("bill_date",""), proj_map.get(b.get("project_id"),"-"), f"{b.get('amount',0):,.0f}", f"{b.get('gst_amount',0):,.0f}", f"{b.get('total_amount',0):,.0f}", b.get("status","")])
-            t = RLTable(data)
-            t.setStyle(header_style)
-            elements.append(t)
-
-        elif report_type == "hrms-summary":
-            data = [["Code", "Name", "Designation", "Department", "Basic Salary", "HRA", "Joined"]]
-            for e in employees:
-                data.append([e.get("employee_code",""), e.get("name",""), e.get("designation","")[:20], e.get("department",""), f"{e.get('basic_salary',0):,.0f}", f"{e.get('hra',0):,.0f}", e.get("date_of_joining","")])
-            t = RLTable(data)
-            t.setStyle(header_style)
-            elements.append(t)
-
-        elif report_type == "procurement-analysis":
-            data = [["Name", "Category", "GSTIN", "City", "Phone", "Rating"]]
-            for v in vendors:
-                data.append([v.get("name",""), v.get("category",""), v.get("gstin",""), v.get("city",""), v.get("phone",""), str(v.get("rating",0))])
-            t = RLTable(data)
-            t.setStyle(header_style)
-            elements.append(t)
-
-        elif report_type == "cost-variance":
-            data = [["Code", "Name", "Budget", "Actual", "Variance", "Var %", "Status"]]
-            for p in projects:
-                b = p.get("budget", 0); a = p.get("actual_cost", 0); v = b - a
-                data.append([p.get("code",""), p.get("name","")[:25], f"{b:,.0f}", f"{a:,.0f}", f"{v:,.0f}", f"{(v/b*100) if b else 0:.1f}%", "Under" if v >= 0 else "Over"])
-            t = RLTable(data)
-            t.setStyle(header_style)
-            elements.append(t)
-
-        elif report_type == "compliance-status":
-            data = [["Type", "Period", "CGST", "SGST", "IGST", "ITC", "Tax Payable", "Status"]]
-            for g in gst_returns:
-                data.append([g.get("return_type",""), g.get("period",""), f"{g.get('cgst',0):,.0f}", f"{g.get('sgst',0):,.0f}", f"{g.get('igst',0):,.0f}", f"{g.get('itc_claimed',0):,.0f}", f"{g.get('tax_payable',0):,.0f}", g.get("status","")])
-            t = RLTable(data)
-            t.setStyle(header_style)
-            elements.append(t)
+async def _export_job_heartbeat():
+    while True:
+        try:
+            failed = await beat_export_jobs()
+            if failed:
+                logger.info(f"Marked {failed} interrupted export job(s) as failed")
+        except Exception as e:
+            logger.error(f"Export job heartbeat failed: {e}")
+        await asyncio.sleep(EXPORT_JOB_HEARTBEAT_SECONDS)
+
+async def get_export_job_for(job_id: str, current_user: User) -> dict:
+    job = await db.export_jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job or (job["requested_by"] != current_user.id and current_user.role != "admin"):
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+@api_router.post("/reports/export-jobs", response_model=ExportJob, status_code=202)
+async def create_export_job(job_data: ExportJobCreate, current_user: User = Depends(get_current_user)):
+    check_export_request(job_data.report_type, job_data.format)
+    if len(_export_tasks) >= EXPORT_MAX_ACTIVE_JOBS:
+        raise HTTPException(status_code=429, detail="Too many export jobs in progress, please retry", headers={"Retry-After": "10"})
+    job = ExportJob(
+        **job_data.model_dump(), requested_by=current_user.id,
+        instance_id=EXPORT_INSTANCE_ID, heartbeat_at=datetime.now(timezone.utc).isoformat()
+    )
+    await db.export_jobs.insert_one(job.model_dump())
+    task = asyncio.create_task(run_export_job(job))
+    _export_tasks.add(task)
+    task.add_done_callback(_export_tasks.discard)
+    return job
+
+@api_router.get("/reports/export-jobs", response_model=List[ExportJob])
+async def list_export_jobs(current_user: User = Depends(get_current_user)):
+    query = {} if current_user.role == "admin" else {"requested_by": current_user.id}
+    return await db.export_jobs.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
+
+@api_router.get("/reports/export-jobs/{job_id}", response_model=ExportJob)
+async def get_export_job(job_id: str, current_user: User = Depends(get_current_user)):
+    return await get_export_job_for(job_id, current_user)
+
+@api_router.get("/reports/export-jobs/{job_id}/download")
+async def download_export_job(job_id: str, current_user: User = Depends(get_current_user)):
+    job = await get_export_job_for(job_id, current_user)
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Export job is {job['status']}")
+    filepath = EXPORT_DIR / job["filename"]
+    if not touch_cached_export(filepath):
+        raise HTTPException(status_code=410, detail="Export file has been evicted; start a new export job")
+    return FileResponse(str(filepath), filename=job["filename"], media_type=EXPORT_FORMATS[job["format"]][1])
+
+# ==================== EXPORT CACHE ====================
+# Export artifacts are content-addressed: the file name is a hash of the report type,
+# format, the UTC date and the shared data versions of the collections it reads, so an
+# unchanged report is served from disk by any worker, and a write on any worker moves
+# every later export to a new key.
+# EXPORT_DIR is kept under a size and age quota by evicting least recently used files.
+
+EXPORT_CACHE_MAX_BYTES = int(float(os.environ.get('EXPORT_CACHE_MAX_MB', '512')) * 1024 * 1024)
+EXPORT_CACHE_MAX_AGE_SECONDS = float(os.environ.get('EXPORT_CACHE_MAX_AGE_HOURS', '168')) * 3600
+EXPORT_PARTIAL_MAX_AGE_SECONDS = 3600
+
+_export_renders: Dict[Path, asyncio.Future] = {}
+_export_render_states: Dict[Path, dict] = {}  # phase and ExportProgress of each render in flight
+_export_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+async def export_cache_path(report_type: str, format: str) -> Path:
+    collections = list(EXPORT_LOADERS[report_type])
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    key = json.dumps([report_type, format, today, collections, await data_versions(collections)])
+    return EXPORT_DIR / f"{report_type}_{hashlib.sha256(key.encode()).hexdigest()[:20]}.{EXPORT_FORMATS[format][0]}"
+
+def export_partial_path(path) -> str:
+    # unique per writer so concurrent renders of one key never share a file
+    return f"{path}.{uuid.uuid4().hex[:8]}.part"
 
+def touch_cached_export(path: Path) -> bool:
+    """Mark a cached artifact as recently used; False if it is not (or no longer) on disk"""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+def enforce_export_quota() -> int:
+    """Delete artifacts past the age limit, then the least recently used until the directory fits the quota"""
+    now = time.time()
+    files, removed = [], 0
+    for entry in os.scandir(EXPORT_DIR):
+        if entry.is_dir() and entry.name.startswith("spool-"):
+            # rows of a render still loading or writing; only leftovers are removed
+            if now - entry.stat().st_mtime > EXPORT_PARTIAL_MAX_AGE_SECONDS:
+                shutil.rmtree(entry.path, ignore_errors=True)
+            continue
+        if not entry.is_file():
+            continue
+        stat = entry.stat()
+        age = now - stat.st_mtime
+        if entry.name.endswith(".part"):
+            # a render still writing; only leftovers of a crashed one are removed
+            if age > EXPORT_PARTIAL_MAX_AGE_SECONDS:
+                removed += _evict_export(entry.path)
+        elif age > EXPORT_CACHE_MAX_AGE_SECONDS:
+            removed += _evict_export(entry.path)
         else:
-            raise HTTPException(status_code=400, detail=f"Unknown report type: {report_type}")
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= EXPORT_CACHE_MAX_BYTES:
+            break
+        removed += _evict_export(path)
+        total -= size
+    _export_cache_stats["evictions"] += removed
+    return removed
+
+def _evict_export(path: str) -> int:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return 0
+    return 1
+
+async def _render_cached_export(report_type: str, format: str, path: Path):
+    spool_dir = new_export_spool()
+    state = _export_render_states[path] = {"status": "loading", "progress": ExportProgress(os.path.join(spool_dir, "progress"))}
+    try:
+        data = await load_export_data(report_type, spool_dir)
+        state["status"] = "rendering"
+        await run_export(report_type, format, data, path, state["progress"])
+    finally:
+        _export_render_states.pop(path, None)
+        await asyncio.get_running_loop().run_in_executor(None, partial(shutil.rmtree, spool_dir, ignore_errors=True))
+    await asyncio.get_running_loop().run_in_executor(None, enforce_export_quota)
+
+async def cached_export(report_type: str, format: str, path: Optional[Path] = None) -> Path:
+    """Path of an up-to-date artifact, rendering it once however many callers ask at the same time"""
+    path = path or await export_cache_path(report_type, format)
+    if touch_cached_export(path):
+        _export_cache_stats["hits"] += 1
+        return path
+    _export_cache_stats["misses"] += 1
+    render = _export_renders.get(path)
+    if render is None:
+        render = asyncio.ensure_future(_render_cached_export(report_type, format, path))
+        _export_renders[path] = render
+        render.add_done_callback(lambda _: _export_renders.pop(path, None))
+    await asyncio.shield(render)
+    return path
+
+def export_cache_metrics() -> dict:
+    sizes = [entry.stat().st_size for entry in os.scandir(EXPORT_DIR) if entry.is_file()]
+    return {
+        **_export_cache_stats,
+        "files": len(sizes),
+        "bytes": sum(sizes),
+        "max_bytes": EXPORT_CACHE_MAX_BYTES,
+        "max_age_hours": EXPORT_CACHE_MAX_AGE_SECONDS / 3600,
+        "rendering": len(_export_renders)
+    }
+
+@api_router.get("/admin/export-cache")
+async def get_export_cache_metrics(current_user: User = Depends(require_admin())):
+    return await asyncio.get_running_loop().run_in_executor(None, export_cache_metrics)
+
+@api_router.delete("/admin/export-cache")
+async def clear_export_cache(current_user: User = Depends(require_admin())):
+    removed = 0
+    for entry in os.scandir(EXPORT_DIR):
+        if entry.is_file() and not entry.name.endswith(".part"):
+            removed += _evict_export(entry.path)
+    return {"message": f"Removed {removed} cached export(s)"}
+
+# ==================== DATABASE INDEXES ====================
+
+# Every index the API relies on, per collection: (keys, options). ensure_indexes()
+# runs at startup and is idempotent; /admin/indexes reports drift against this list.
+# Keys ending in _id back the keyset sorts used by paginate().
+INDEX_SPECS: Dict[str, List[tuple]] = {
+    "users": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("email", ASCENDING)], {"unique": True}),
+        ([("role_id", ASCENDING)], {}),
+    ],
+    "roles": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("name", ASCENDING)], {}),
+    ],
+    "projects": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("status", ASCENDING)], {}),
+    ],
+    "tasks": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("project_id", ASCENDING), ("status", ASCENDING)], {}),
+        ([("project_id", ASCENDING), ("_id", ASCENDING)], {}),
+    ],
+    "dprs": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("project_id", ASCENDING), ("date", DESCENDING)], {}),
+        ([("project_id", ASCENDING), ("_id", ASCENDING)], {}),
+    ],
+    "cvrs": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("project_id", ASCENDING), ("_id", ASCENDING)], {}),
+    ],
+    "billings": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("project_id", ASCENDING), ("bill_date", DESCENDING)], {}),
+        ([("project_id", ASCENDING), ("_id", ASCENDING)], {}),
+        ([("bill_date", DESCENDING)], {}),
+        ([("status", ASCENDING)], {}),
+    ],
+    "vendors": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("is_active", ASCENDING), ("category", ASCENDING), ("_id", ASCENDING)], {}),
+    ],
+    "purchase_orders": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("project_id", ASCENDING), ("_id", ASCENDING)], {}),
+        ([("vendor_id", ASCENDING), ("_id", ASCENDING)], {}),
+        ([("status", ASCENDING)], {}),
+        ([("po_number", ASCENDING)], {}),
+        ([("receipt_open", ASCENDING), ("_id", ASCENDING)], {}),
+    ],
+    "project_rollups": [
+        ([("project_id", ASCENDING)], {"unique": True}),
+    ],
+    "grns": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("po_id", ASCENDING), ("_id", ASCENDING)], {}),
+        ([("grn_number", ASCENDING)], {}),
+    ],
+    "employees": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("is_active", ASCENDING), ("department", ASCENDING), ("_id", ASCENDING)], {}),
+        ([("email", ASCENDING)], {}),
+        ([("user_id", ASCENDING)], {}),
+    ],
+    "attendance": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("employee_id", ASCENDING), ("date", ASCENDING)], {"unique": True}),
+        ([("employee_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("project_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("date", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("date", DESCENDING), ("status", ASCENDING)], {}),
+    ],
+    "payrolls": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("employee_id", ASCENDING), ("month", ASCENDING)], {"unique": True}),
+        ([("month", DESCENDING)], {}),
+        ([("status", ASCENDING)], {}),
+    ],
+    "gst_returns": [
+        ([("id", ASCENDING)], {"unique": True}),
+    ],
+    "rera_projects": [
+        ([("id", ASCENDING)], {"unique": True}),
+    ],
+    "e_invoices": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+    ],
+    "export_jobs": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("requested_by", ASCENDING), ("created_at", DESCENDING)], {}),
+        ([("created_at", DESCENDING)], {}),
+        ([("status", ASCENDING), ("heartbeat_at", ASCENDING)], {}),
+    ],
+    "documents": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("project_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+    ],
+}
+
+def _index_key(keys) -> tuple:
+    return tuple((field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in keys)
+
+async def ensure_indexes() -> List[str]:
+    """Create any declared index that is missing; returns the ones that failed"""
+    async def create(collection: str, keys, options: dict):
+        try:
+            await db[collection].create_index(keys, **options)
+        except Exception as e:
+            # e.g. duplicate ids in legacy data block a unique index; keep serving
+            logger.error(f"Index {collection}.{keys} could not be created: {e}")
+            return f"{collection}.{'_'.join(f'{k}_{d}' for k, d in keys)}"
+        return None
+    
+    results = await asyncio.gather(*[
+        create(collection, keys, options)
+        for collection, specs in INDEX_SPECS.items()
+        for keys, options in specs
+    ])
+    return [r for r in results if r]
+
+async def index_report() -> Dict[str, Any]:
+    """Compare live indexes with INDEX_SPECS and report missing, undeclared and unused ones"""
+    async def inspect(collection: str, specs: List[tuple]) -> Dict[str, Any]:
+        existing = await db[collection].index_information()
+        existing_keys = {_index_key(info["key"]): name for name, info in existing.items()}
+        declared_keys = [_index_key(keys) for keys, _ in specs]
+        try:
+            stats = await db[collection].aggregate([{"$indexStats": {}}]).to_list(None)
+            usage = {s["name"]: s.get("accesses", {}).get("ops", 0) for s in stats}
+        except Exception:
+            usage = None  # $indexStats needs a real mongod and the indexStats privilege
+        return {
+            "missing": [[list(k) for k in key] for key in declared_keys if key not in existing_keys],
+            "undeclared": [name for key, name in existing_keys.items() if key not in declared_keys and name != "_id_"],
+            "unused": [name for name, ops in usage.items() if ops == 0 and name != "_id_"] if usage is not None else None,
+            "usage": usage
+        }
+    
+    collections = list(INDEX_SPECS.items())
+    reports = await asyncio.gather(*[inspect(name, specs) for name, specs in collections])
+    return {name: report for (name, _), report in zip(collections, reports)}
+
+@api_router.get("/admin/indexes")
+@db_budget(None)
+async def get_index_report(current_user: User = Depends(require_admin())):
+    report = await index_report()
+    return {
+        "collections": report,
+        "total_missing": sum(len(r["missing"]) for r in report.values()),
+        "total_unused": sum(len(r["unused"] or []) for r in report.values())
+    }
+
+@api_router.post("/admin/indexes/ensure")
+@db_budget(None)
+async def ensure_indexes_now(current_user: User = Depends(require_admin())):
+    failed = await ensure_indexes()
+    return {"message": "Indexes ensured", "failed": failed}
+
+# ==================== QUERY MONITORING ROUTES ====================
+
+class DbStatsMiddleware:
+    """Opens a RequestDbStats per HTTP request and folds it into the per-route totals"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestDbStats()
+        stats_token = _request_db_stats.set(stats)
+        route_token = _request_route.set(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            record_route_db_stats(f"{scope['method']} {getattr(route, 'path', 'unmatched')}", stats)
+            _request_route.reset(route_token)
+            _request_db_stats.reset(stats_token)
+
+@api_router.get("/admin/db-stats")
+async def get_db_stats(current_user: User = Depends(require_admin())):
+    budgets = {
+        f"{method} {route.path}": route_db_budget(route.endpoint)
+        for route in app.routes if isinstance(route, APIRoute) for method in route.methods
+    }
+    routes = []
+    for route, totals in _route_db_stats.items():
+        requests = totals["requests"] or 1
+        commands, documents = budgets.get(route, (None, None))
+        routes.append({
+            "route": route,
+            **totals,
+            "budget": {"round_trips": commands, "documents": documents},
+            "duration_ms": round(totals["duration_ms"], 2),
+            "avg_round_trips": round(totals["round_trips"] / requests, 2),
+            "avg_duration_ms": round(totals["duration_ms"] / requests, 2),
+            "avg_documents": round(totals["documents"] / requests, 2)
+        })
+    routes.sort(key=lambda r: r["duration_ms"], reverse=True)
+    return {"slow_query_ms": SLOW_QUERY_MS, "routes": routes}
 
-        doc.build(elements)
-        return FileResponse(str(filepath), filename=f"{report_type}_{timestamp}.pdf", media_type="application/pdf")
+@api_router.get("/admin/db-stats/slow-queries")
+async def get_slow_queries(limit: int = Query(50, ge=1, le=SLOW_QUERY_LOG_SIZE), current_user: User = Depends(require_admin())):
+    return list(_slow_queries)[-limit:][::-1]
 
-    raise HTTPException(status_code=400, detail="Format must be 'excel' or 'pdf'")
+@api_router.delete("/admin/db-stats")
+async def reset_db_stats(current_user: User = Depends(require_admin())):
+    _route_db_stats.clear()
+    _slow_queries.clear()
+    return {"message": "DB stats reset"}
 
 # ==================== ROOT ROUTES ====================
 
@@ -3403,8 +5424,55 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Has-More", "X-Next-Cursor"],
 )
+app.add_middleware(DbStatsMiddleware)
+
+@app.on_event("startup")
+async def ensure_indexes_on_startup():
+    failed = await ensure_indexes()
+    if failed:
+        logger.warning(f"{len(failed)} index(es) could not be created: {', '.join(failed)}")
+
+@app.on_event("startup")
+async def backfill_roles_on_startup():
+    converted = await backfill_role_permission_masks()
+    if converted:
+        logger.info(f"Backfilled permission_mask on {converted} role(s)")
+
+@app.on_event("startup")
+async def build_rollups_on_startup():
+    # First deploy (or a wiped collection): seed rollups so dashboards don't read zeros
+    if not await db.project_rollups.find_one({}, {"_id": 1}):
+        result = await rebuild_project_rollups()
+        if result["projects"]:
+            logger.info(f"Built project rollups for {result['projects']} project(s)")
+
+@app.on_event("startup")
+async def backfill_receipt_ledger_on_startup():
+    missing = await db.purchase_orders.distinct("id", {"received_quantities": {"$exists": False}})
+    if missing:
+        await rebuild_receipt_ledger(missing)
+        logger.info(f"Built receipt ledger for {len(missing)} purchase order(s)")
+
+@app.on_event("startup")
+async def start_export_job_heartbeat():
+    app.state.export_heartbeat_task = asyncio.create_task(_export_job_heartbeat())
+
+@app.on_event("startup")
+async def trim_export_cache_on_startup():
+    removed = await asyncio.get_running_loop().run_in_executor(None, enforce_export_quota)
+    if removed:
+        logger.info(f"Evicted {removed} export file(s) outside the cache quota")
+
+@app.on_event("startup")
+async def start_token_version_refresher():
+    app.state.token_version_task = asyncio.create_task(_token_version_refresher())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.token_version_task.cancel()
+    app.state.export_heartbeat_task.cancel()
+    if _export_pool is not None:
+        _export_pool.shutdown(wait=False, cancel_futures=True)
     client.close()
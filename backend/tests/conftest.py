@@ -0,0 +1,197 @@
+"""
+Shared fixtures - the API runs against an in-memory mongomock-motor database, or
+against a throwaway database on a real mongod when MONGO_TEST_URL is set
+Run: cd backend && python -m pytest tests
+"""
+import itertools
+import os
+import sys
+import time
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "civil_erp_test")
+
+import server  # noqa: E402
+import mongomock  # noqa: E402
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+from pymongo import MongoClient, InsertOne, DeleteOne, DeleteMany  # noqa: E402
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL")
+
+
+# ---------- command events for mongomock ----------
+# mongomock never talks to a server, so it emits no pymongo monitoring events. These
+# wrappers report one started/succeeded pair per command a real driver would send to
+# server.command_monitor, so request stats are counted exactly as in production.
+
+_request_ids = itertools.count(1)
+
+
+class _CommandEvent:
+    """The fields of pymongo's CommandStartedEvent/CommandSucceededEvent the monitor reads"""
+    connection_id = ("mongomock", 27017)
+
+    def __init__(self, command_name, collection, request_id, reply=None, duration_micros=0):
+        self.command_name = command_name
+        self.command = {command_name: collection}
+        self.request_id = request_id
+        self.reply = reply or {}
+        self.duration_micros = duration_micros
+
+
+async def _monitored(command_name, collection, call, reply=lambda result: {}):
+    request_id = next(_request_ids)
+    server.command_monitor.started(_CommandEvent(command_name, collection, request_id))
+    start = time.perf_counter()
+    result = await call()
+    duration = int((time.perf_counter() - start) * 1e6)
+    server.command_monitor.succeeded(_CommandEvent(command_name, collection, request_id, reply(result), duration))
+    return result
+
+
+def _batch(docs):
+    return {"cursor": {"firstBatch": docs}}
+
+
+class _MonitoredCursor:
+    """find()/aggregate() cursor; the command is sent when results are first requested"""
+
+    def __init__(self, command_name, collection, cursor):
+        self._command_name = command_name
+        self._collection = collection
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        method = getattr(self._cursor, name)
+
+        def chained(*args, **kwargs):
+            method(*args, **kwargs)
+            return self
+        return chained
+
+    async def to_list(self, length=None):
+        return await _monitored(self._command_name, self._collection, lambda: self._cursor.to_list(length), _batch)
+
+    async def __aiter__(self):
+        for doc in await self.to_list(None):
+            yield doc
+
+
+_COMMANDS = {
+    "find_one": "find", "count_documents": "aggregate", "estimated_document_count": "count", "distinct": "distinct",
+    "insert_one": "insert", "insert_many": "insert", "update_one": "update", "update_many": "update",
+    "replace_one": "update", "delete_one": "delete", "delete_many": "delete",
+    "find_one_and_update": "findAndModify", "find_one_and_delete": "findAndModify", "find_one_and_replace": "findAndModify",
+    "create_index": "createIndexes", "index_information": "listIndexes", "drop": "drop",
+}
+_REPLIES = {
+    "find": lambda doc: _batch([doc] if doc else []),
+    "findAndModify": lambda doc: {"value": doc},
+    "distinct": lambda values: {"values": values},
+}
+
+
+class MonitoredCollection:
+    def __init__(self, collection):
+        self._collection = collection
+        self._name = collection.name
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        command_name = _COMMANDS.get(name)
+        if command_name is None:
+            return attr
+
+        async def call(*args, **kwargs):
+            return await _monitored(command_name, self._name, lambda: attr(*args, **kwargs), _REPLIES.get(command_name, lambda _: {}))
+        return call
+
+    def find(self, *args, **kwargs):
+        return _MonitoredCursor("find", self._name, self._collection.find(*args, **kwargs))
+
+    def aggregate(self, pipeline, **kwargs):
+        if any("$unionWith" in stage for stage in pipeline):
+            return _MonitoredCursor("aggregate", self._name, _UnionCursor(self._collection, pipeline, kwargs))
+        return _MonitoredCursor("aggregate", self._name, self._collection.aggregate(pipeline, **kwargs))
+
+    async def bulk_write(self, requests, **kwargs):
+        # the driver sends one command per kind of write in an unordered batch
+        kinds = {"insert" if isinstance(r, InsertOne) else "delete" if isinstance(r, (DeleteOne, DeleteMany)) else "update" for r in requests}
+        result = await self._collection.bulk_write(requests, **kwargs)
+        for kind in sorted(kinds):
+            await _monitored(kind, self._name, _noop)
+        return result
+
+
+class _UnionCursor:
+    """mongomock has no $unionWith: the stages between unions run on the collection (or on
+    the rows gathered so far), each union appends its own sub-pipeline's rows - the server
+    still sees one aggregate command"""
+
+    def __init__(self, collection, pipeline, kwargs):
+        self._collection = collection
+        self._pipeline = pipeline
+        self._kwargs = kwargs
+
+    async def _run(self, stages, rows):
+        if rows is None:
+            return await self._collection.aggregate(stages, **self._kwargs).to_list(None)
+        if not stages:
+            return rows
+        scratch = mongomock.MongoClient().db.rows
+        if rows:
+            scratch.insert_many([dict(row) for row in rows])
+        return list(scratch.aggregate(stages))
+
+    async def to_list(self, length=None):
+        rows, stages = None, []
+        for stage in self._pipeline:
+            if "$unionWith" not in stage:
+                stages.append(stage)
+                continue
+            rows, stages = await self._run(stages, rows), []
+            union = stage["$unionWith"]
+            rows += await self._collection.database[union["coll"]].aggregate(union.get("pipeline", [])).to_list(None)
+        return await self._run(stages, rows)
+
+
+async def _noop():
+    return None
+
+
+class MonitoredDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name):
+        return MonitoredCollection(self._database[name])
+
+    def __getattr__(self, name):
+        return MonitoredCollection(self._database[name])
+
+
+# ---------- fixtures ----------
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def db():
+    """A fresh database per test, with every in-process cache emptied"""
+    name = f"civil_erp_test_{uuid.uuid4().hex[:8]}"
+    if MONGO_TEST_URL:
+        server.db = AsyncIOMotorClient(MONGO_TEST_URL, event_listeners=[server.command_monitor])[name]
+    else:
+        server.db = MonitoredDatabase(AsyncMongoMockClient()[name])
+    server._report_cache.clear()
+    server._route_db_stats.clear()
+    yield server.db
+    if MONGO_TEST_URL:
+        MongoClient(MONGO_TEST_URL).drop_database(name)
@@ -0,0 +1,339 @@
+"""
+Mongo round-trip budgets for every route on api_router.
+Each route is called against a small seeded dataset while server.command_monitor
+counts the commands it sends. Routes declare their budget with @db_budget; the
+rest get DEFAULT_ROUND_TRIPS. Rows are seeded several to a collection, so a handler
+that slips back into a per-row query loop goes over budget.
+"""
+import pytest
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+import server
+
+DEFAULT_ROUND_TRIPS = 6
+ROWS = 4
+MONTH = "2025-01"
+DAY = "2025-01-15"
+
+
+def create(client, headers, path, body):
+    response = client.post(f"/api{path}", headers=headers, json=body)
+    assert response.status_code in (200, 201), f"seeding {path}: {response.text}"
+    return response.json()
+
+
+def seed(client, headers, admin_id):
+    """A few rows in every collection, created through the API so they are well formed"""
+    ids = {"user_id": admin_id}
+    projects = [create(client, headers, "/projects", {
+        "name": f"Project {i}", "code": f"PRJ-{i}", "client_name": "Client", "location": "Chennai",
+        "start_date": "2024-01-01", "expected_end_date": "2026-12-31", "budget": 1000000 + i
+    }) for i in range(ROWS)]
+    ids["project_id"] = project_id = projects[0]["id"]
+    for project in projects:
+        for i in range(ROWS):
+            create(client, headers, "/tasks", {"project_id": project["id"], "name": f"Task {i}", "start_date": "2024-01-01", "end_date": "2024-06-30"})
+            create(client, headers, "/dpr", {"project_id": project["id"], "date": f"2025-01-{i + 1:02d}", "work_done": "Slab"})
+            create(client, headers, "/cvr", {
+                "project_id": project["id"], "period_start": "2025-01-01", "period_end": "2025-01-31",
+                "contracted_value": 100, "work_done_value": 80, "billed_value": 60, "received_value": 50
+            })
+            bill = create(client, headers, "/billing", {"project_id": project["id"], "bill_number": f"B-{i}", "bill_date": DAY, "description": "RA bill", "amount": 1000})
+    ids["task_id"] = client.get("/api/tasks", headers=headers).json()[0]["id"]
+    ids["billing_id"] = bill["id"]
+    ids["cvr_id"] = client.get("/api/cvr", headers=headers).json()[0]["id"]
+
+    vendors = [create(client, headers, "/vendors", {
+        "name": f"Vendor {i}", "address": "Road", "city": "Chennai", "pincode": "600001",
+        "contact_person": "Ravi", "phone": "9000000000", "email": f"vendor{i}@example.com", "category": "steel"
+    }) for i in range(ROWS)]
+    ids["vendor_id"] = vendors[0]["id"]
+    for vendor in vendors:
+        for i in range(ROWS):
+            po = create(client, headers, "/purchase-orders", {
+                "project_id": project_id, "vendor_id": vendor["id"], "po_date": DAY, "delivery_date": "2025-02-15",
+                "items": [{"description": f"TMT bar {j}", "unit": "MT", "quantity": 10, "rate": 50000} for j in range(ROWS)]
+            })
+            create(client, headers, "/grn", {"po_id": po["id"], "grn_date": DAY, "items": [{"po_item_index": j, "received_quantity": 2} for j in range(ROWS)]})
+    ids["po_id"] = po["id"]
+    ids["grn_id"] = client.get("/api/grn", headers=headers).json()[0]["id"]
+
+    employees = [create(client, headers, "/employees", {
+        "name": f"Employee {i}", "employee_code": f"EMP-{i}", "designation": "Mason", "department": "Civil",
+        "phone": "9000000000", "email": f"employee{i}@example.com", "date_of_joining": "2024-01-01", "basic_salary": 20000
+    }) for i in range(ROWS)]
+    ids["employee_id"] = employees[0]["id"]
+    ids.update({f"employee_{i}": employee["id"] for i, employee in enumerate(employees)})
+    for day in range(1, ROWS + 1):
+        create(client, headers, "/attendance/bulk", {
+            "project_id": project_id, "date": f"{MONTH}-{day:02d}",
+            "entries": [{"employee_id": e["id"], "status": "present"} for e in employees]
+        })
+    ids["att_id"] = client.get("/api/attendance", headers=headers).json()[0]["id"]
+    create(client, headers, f"/payroll/run?month={MONTH}", None)
+    ids["payroll_id"] = client.get("/api/payroll", headers=headers).json()[0]["id"]
+
+    for i in range(ROWS):
+        create(client, headers, "/gst-returns", {"return_type": "GSTR-3B", "period": f"2024-{i + 1:02d}", "cgst": 10, "sgst": 10})
+        create(client, headers, "/rera-projects", {
+            "project_id": projects[i]["id"], "rera_number": f"RERA-{i}", "registration_date": "2024-01-01",
+            "validity_date": "2027-01-01", "escrow_bank": "SBI", "escrow_account": "1", "total_units": 10
+        })
+    role = create(client, headers, "/rbac/roles", {"name": "Surveyor"})
+    ids["role_id"] = role["id"]
+
+    upload = client.post("/api/documents/upload", headers=headers, data={"project_id": project_id}, files={"file": ("plan.pdf", b"%PDF-1.4", "application/pdf")})
+    assert upload.status_code == 200, upload.text
+    ids["doc_id"] = upload.json()["id"]
+    ids["filename"] = client.get(f"/api/documents/{ids['doc_id']}", headers=headers).json().get("filename", "missing.pdf")
+    job = client.post("/api/reports/export-jobs", headers=headers, json={"report_type": "hrms-summary", "format": "excel"})
+    ids["job_id"] = job.json()["id"]
+    ids["einvoice_id"] = "missing"
+    return ids
+
+
+# One request per route: (path with {placeholders} filled from the seeded ids, request kwargs)
+ROUTE_CASES = {
+    "POST /api/auth/register": ("/api/auth/register", {"json": {"email": "new@example.com", "name": "New", "password": "secret"}}),
+    "POST /api/auth/login": ("/api/auth/login", {"json": {"email": "admin@example.com", "password": "secret"}}),
+    "GET /api/auth/me": ("/api/auth/me", {}),
+    "GET /api/rbac/modules": ("/api/rbac/modules", {}),
+    "POST /api/rbac/roles": ("/api/rbac/roles", {"json": {"name": "Auditor"}}),
+    "GET /api/rbac/roles": ("/api/rbac/roles", {}),
+    "GET /api/rbac/roles/{role_id}": ("/api/rbac/roles/{role_id}", {}),
+    "PUT /api/rbac/roles/{role_id}": ("/api/rbac/roles/{role_id}", {"json": {"description": "Site surveys"}}),
+    "DELETE /api/rbac/roles/{role_id}": ("/api/rbac/roles/{role_id}", {}),
+    "POST /api/rbac/assign-role": ("/api/rbac/assign-role", {"json": {"user_id": "{user_id}", "role_id": "{role_id}"}}),
+    "DELETE /api/rbac/users/{user_id}/role": ("/api/rbac/users/{user_id}/role", {}),
+    "POST /api/rbac/users/{user_id}/revoke-sessions": ("/api/rbac/users/{user_id}/revoke-sessions", {}),
+    "GET /api/rbac/users": ("/api/rbac/users", {}),
+    "GET /api/rbac/stats": ("/api/rbac/stats", {}),
+    "POST /api/rbac/init": ("/api/rbac/init", {}),
+    "GET /api/admin/report-cache": ("/api/admin/report-cache", {}),
+    "DELETE /api/admin/report-cache": ("/api/admin/report-cache", {}),
+    "POST /api/admin/rollups/rebuild": ("/api/admin/rollups/rebuild", {}),
+    "GET /api/dashboard/stats": ("/api/dashboard/stats", {}),
+    "GET /api/dashboard/chart-data": ("/api/dashboard/chart-data", {}),
+    "POST /api/projects": ("/api/projects", {"json": {
+        "name": "Tower", "code": "PRJ-NEW", "client_name": "Client", "location": "Madurai",
+        "start_date": "2025-01-01", "expected_end_date": "2026-01-01", "budget": 500000
+    }}),
+    "GET /api/projects": ("/api/projects", {}),
+    "GET /api/projects/{project_id}": ("/api/projects/{project_id}", {}),
+    "PUT /api/projects/{project_id}": ("/api/projects/{project_id}", {"json": {
+        "name": "Project 0", "code": "PRJ-0", "client_name": "Client", "location": "Chennai",
+        "start_date": "2024-01-01", "expected_end_date": "2026-12-31", "budget": 2000000
+    }}),
+    "DELETE /api/projects/{project_id}": ("/api/projects/{project_id}", {}),
+    "PATCH /api/projects/{project_id}/status": ("/api/projects/{project_id}/status", {"json": {"status": "on_hold"}}),
+    "PATCH /api/projects/{project_id}/progress": ("/api/projects/{project_id}/progress", {"json": {"progress_percentage": 40}}),
+    "GET /api/projects/{project_id}/summary": ("/api/projects/{project_id}/summary", {}),
+    "POST /api/tasks": ("/api/tasks", {"json": {"project_id": "{project_id}", "name": "Plaster", "start_date": "2025-01-01", "end_date": "2025-02-01"}}),
+    "GET /api/tasks": ("/api/tasks", {}),
+    "PUT /api/tasks/{task_id}": ("/api/tasks/{task_id}", {"json": {"project_id": "{project_id}", "name": "Plaster", "start_date": "2025-01-01", "end_date": "2025-02-01"}}),
+    "PATCH /api/tasks/{task_id}/status": ("/api/tasks/{task_id}/status", {"json": {"status": "completed"}}),
+    "DELETE /api/tasks/{task_id}": ("/api/tasks/{task_id}", {}),
+    "POST /api/dpr": ("/api/dpr", {"json": {"project_id": "{project_id}", "date": DAY, "work_done": "Columns"}}),
+    "GET /api/dpr": ("/api/dpr", {}),
+    "POST /api/cvr": ("/api/cvr", {"json": {
+        "project_id": "{project_id}", "period_start": "2025-02-01", "period_end": "2025-02-28",
+        "contracted_value": 100, "work_done_value": 90, "billed_value": 70, "received_value": 60
+    }}),
+    "GET /api/cvr": ("/api/cvr", {}),
+    "POST /api/billing": ("/api/billing", {"json": {"project_id": "{project_id}", "bill_number": "B-NEW", "bill_date": DAY, "description": "Final bill", "amount": 5000}}),
+    "GET /api/billing": ("/api/billing", {}),
+    "PUT /api/billing/{billing_id}/status": ("/api/billing/{billing_id}/status", {"params": {"status": "approved"}}),
+    "GET /api/billing/{billing_id}": ("/api/billing/{billing_id}", {}),
+    "DELETE /api/billing/{billing_id}": ("/api/billing/{billing_id}", {}),
+    "PATCH /api/billing/{billing_id}/status": ("/api/billing/{billing_id}/status", {"json": {"status": "paid"}}),
+    "DELETE /api/cvr/{cvr_id}": ("/api/cvr/{cvr_id}", {}),
+    "GET /api/financial/dashboard": ("/api/financial/dashboard", {}),
+    "POST /api/vendors": ("/api/vendors", {"json": {
+        "name": "Vendor New", "address": "Road", "city": "Salem", "pincode": "636001",
+        "contact_person": "Anu", "phone": "9000000001", "email": "new-vendor@example.com", "category": "cement"
+    }}),
+    "GET /api/vendors": ("/api/vendors", {}),
+    "GET /api/vendors/{vendor_id}": ("/api/vendors/{vendor_id}", {}),
+    "GET /api/vendors/{vendor_id}/detail": ("/api/vendors/{vendor_id}/detail", {}),
+    "PUT /api/vendors/{vendor_id}": ("/api/vendors/{vendor_id}", {"json": {
+        "name": "Vendor 0", "address": "Road", "city": "Chennai", "pincode": "600001",
+        "contact_person": "Ravi", "phone": "9000000000", "email": "vendor0@example.com", "category": "steel"
+    }}),
+    "PATCH /api/vendors/{vendor_id}/rating": ("/api/vendors/{vendor_id}/rating", {"json": {"rating": 4.5}}),
+    "PATCH /api/vendors/{vendor_id}/deactivate": ("/api/vendors/{vendor_id}/deactivate", {}),
+    "POST /api/admin/receipts/rebuild": ("/api/admin/receipts/rebuild", {}),
+    "GET /api/purchase-orders/open-receipts": ("/api/purchase-orders/open-receipts", {}),
+    "POST /api/purchase-orders": ("/api/purchase-orders", {"json": {
+        "project_id": "{project_id}", "vendor_id": "{vendor_id}", "po_date": DAY, "delivery_date": "2025-03-01",
+        "items": [{"description": f"Cement {i}", "unit": "bag", "quantity": 100, "rate": 400} for i in range(ROWS)]
+    }}),
+    "GET /api/purchase-orders": ("/api/purchase-orders", {}),
+    "GET /api/purchase-orders/{po_id}": ("/api/purchase-orders/{po_id}", {}),
+    "PATCH /api/purchase-orders/{po_id}/status": ("/api/purchase-orders/{po_id}/status", {"json": {"status": "approved"}}),
+    "DELETE /api/purchase-orders/{po_id}": ("/api/purchase-orders/{po_id}", {}),
+    "GET /api/procurement/dashboard": ("/api/procurement/dashboard", {}),
+    "POST /api/grn": ("/api/grn", {"json": {"po_id": "{po_id}", "grn_date": DAY, "items": [{"po_item_index": i, "received_quantity": 1} for i in range(ROWS)]}}),
+    "GET /api/grn": ("/api/grn", {}),
+    "DELETE /api/grn/{grn_id}": ("/api/grn/{grn_id}", {}),
+    "POST /api/employees": ("/api/employees", {"json": {
+        "name": "Employee New", "employee_code": "EMP-NEW", "designation": "Fitter", "department": "Civil",
+        "phone": "9000000002", "email": "employee-new@example.com", "date_of_joining": "2025-01-01", "basic_salary": 18000
+    }}),
+    "GET /api/employees": ("/api/employees", {}),
+    "GET /api/employees/{employee_id}": ("/api/employees/{employee_id}", {}),
+    "GET /api/employees/{employee_id}/detail": ("/api/employees/{employee_id}/detail", {}),
+    "PUT /api/employees/{employee_id}": ("/api/employees/{employee_id}", {"json": {
+        "name": "Employee 0", "employee_code": "EMP-0", "designation": "Mason", "department": "Civil",
+        "phone": "9000000000", "email": "employee0@example.com", "date_of_joining": "2024-01-01", "basic_salary": 21000
+    }}),
+    "PATCH /api/employees/{employee_id}/deactivate": ("/api/employees/{employee_id}/deactivate", {}),
+    "POST /api/employees/{employee_id}/link-user": ("/api/employees/{employee_id}/link-user", {"json": {"employee_id": "{employee_id}"}}),
+    "DELETE /api/employees/{employee_id}/unlink-user": ("/api/employees/{employee_id}/unlink-user", {}),
+    "GET /api/rbac/employees": ("/api/rbac/employees", {}),
+    "POST /api/attendance": ("/api/attendance", {"json": {"employee_id": "{employee_id}", "project_id": "{project_id}", "date": "2025-02-01"}}),
+    "POST /api/attendance/bulk": ("/api/attendance/bulk", {"json": {
+        "project_id": "{project_id}", "date": f"{MONTH}-01",
+        "entries": [{"employee_id": f"{{employee_{i}}}", "status": "absent"} for i in range(ROWS)] + [{"employee_id": "missing", "status": "present"}]
+    }}),
+    "GET /api/attendance": ("/api/attendance", {}),
+    "DELETE /api/attendance/{att_id}": ("/api/attendance/{att_id}", {}),
+    "POST /api/payroll": ("/api/payroll", {"json": {"employee_id": "{employee_id}", "month": "2025-02", "basic_salary": 20000}}),
+    "POST /api/payroll/run": ("/api/payroll/run", {"params": {"month": MONTH}}),
+    "GET /api/payroll": ("/api/payroll", {}),
+    "PATCH /api/payroll/{payroll_id}/status": ("/api/payroll/{payroll_id}/status", {"json": {"status": "approved"}}),
+    "DELETE /api/payroll/{payroll_id}": ("/api/payroll/{payroll_id}", {}),
+    "GET /api/hrms/dashboard": ("/api/hrms/dashboard", {}),
+    "POST /api/gst-returns": ("/api/gst-returns", {"json": {"return_type": "GSTR-1", "period": "2025-01"}}),
+    "GET /api/gst-returns": ("/api/gst-returns", {}),
+    "POST /api/rera-projects": ("/api/rera-projects", {"json": {
+        "project_id": "{project_id}", "rera_number": "RERA-NEW", "registration_date": "2025-01-01",
+        "validity_date": "2028-01-01", "escrow_bank": "SBI", "escrow_account": "2", "total_units": 20
+    }}),
+    "GET /api/rera-projects": ("/api/rera-projects", {}),
+    "POST /api/settings/gst-credentials": ("/api/settings/gst-credentials", {"json": {
+        "gstin": "33AAAAA0000A1Z5", "username": "user", "password": "pass", "client_id": "id", "client_secret": "secret"
+    }}),
+    "GET /api/settings/gst-credentials": ("/api/settings/gst-credentials", {}),
+    "DELETE /api/settings/gst-credentials": ("/api/settings/gst-credentials", {}),
+    "POST /api/settings/gst-credentials/test": ("/api/settings/gst-credentials/test", {}),
+    "POST /api/einvoice/generate": ("/api/einvoice/generate", {"json": {
+        "document_number": "INV-1", "document_date": "15/01/2025", "seller_gstin": "33AAAAA0000A1Z5", "seller_legal_name": "Seller",
+        "seller_address": "Road", "seller_location": "Chennai", "seller_pincode": "600001", "buyer_gstin": "33BBBBB0000B1Z5",
+        "buyer_legal_name": "Buyer", "buyer_address": "Street", "buyer_location": "Chennai", "buyer_pincode": "600002",
+        "items": [{"sl_no": 1, "item_description": "Steel", "hsn_code": "7214", "quantity": 1, "unit_price": 100, "taxable_value": 100}],
+        "total_taxable_value": 100, "total_invoice_value": 118
+    }}),
+    "GET /api/einvoice": ("/api/einvoice", {}),
+    "GET /api/einvoice/{einvoice_id}": ("/api/einvoice/{einvoice_id}", {}),
+    "POST /api/einvoice/{einvoice_id}/cancel": ("/api/einvoice/{einvoice_id}/cancel", {}),
+    "GET /api/einvoice-stats": ("/api/einvoice-stats", {}),
+    "POST /api/settings/cloudinary": ("/api/settings/cloudinary", {"json": {"cloud_name": "demo", "api_key": "key", "api_secret": "secret"}}),
+    "GET /api/settings/cloudinary": ("/api/settings/cloudinary", {}),
+    "DELETE /api/settings/cloudinary": ("/api/settings/cloudinary", {}),
+    "POST /api/documents/upload": ("/api/documents/upload", {"data": {"project_id": "{project_id}"}, "files": {"file": ("boq.pdf", b"%PDF-1.4", "application/pdf")}}),
+    "GET /api/documents": ("/api/documents", {}),
+    "GET /api/documents/{doc_id}": ("/api/documents/{doc_id}", {}),
+    "GET /api/documents/file/{filename}": ("/api/documents/file/{filename}", {}),
+    "DELETE /api/documents/{doc_id}": ("/api/documents/{doc_id}", {}),
+    "POST /api/ai/predict": ("/api/ai/predict", {"json": {"query": "Forecast steel cost"}}),
+    "GET /api/reports/executive-summary": ("/api/reports/executive-summary", {}),
+    "GET /api/reports/project-analysis": ("/api/reports/project-analysis", {}),
+    "GET /api/reports/financial-summary": ("/api/reports/financial-summary", {}),
+    "GET /api/reports/procurement-analysis": ("/api/reports/procurement-analysis", {}),
+    "GET /api/reports/hrms-summary": ("/api/reports/hrms-summary", {}),
+    "GET /api/reports/compliance-status": ("/api/reports/compliance-status", {}),
+    "GET /api/reports/cost-variance": ("/api/reports/cost-variance", {}),
+    "GET /api/reports/export/{report_type}": ("/api/reports/export/project-analysis", {"params": {"format": "excel"}}),
+    "POST /api/reports/export-jobs": ("/api/reports/export-jobs", {"json": {"report_type": "cost-variance", "format": "excel"}}),
+    "GET /api/reports/export-jobs": ("/api/reports/export-jobs", {}),
+    "GET /api/reports/export-jobs/{job_id}": ("/api/reports/export-jobs/{job_id}", {}),
+    "GET /api/reports/export-jobs/{job_id}/download": ("/api/reports/export-jobs/{job_id}/download", {}),
+    "GET /api/admin/export-cache": ("/api/admin/export-cache", {}),
+    "DELETE /api/admin/export-cache": ("/api/admin/export-cache", {}),
+    "GET /api/admin/indexes": ("/api/admin/indexes", {}),
+    "POST /api/admin/indexes/ensure": ("/api/admin/indexes/ensure", {}),
+    "GET /api/admin/db-stats": ("/api/admin/db-stats", {}),
+    "GET /api/admin/db-stats/slow-queries": ("/api/admin/db-stats/slow-queries", {}),
+    "DELETE /api/admin/db-stats": ("/api/admin/db-stats", {}),
+    "GET /api/": ("/api/", {}),
+    "GET /api/health": ("/api/health", {}),
+}
+
+
+def api_routes():
+    return [
+        (f"{method} {route.path}", route)
+        for route in server.api_router.routes if isinstance(route, APIRoute)
+        for method in sorted(route.methods)
+    ]
+
+
+def fill(value, ids):
+    if isinstance(value, str):
+        return value.format(**ids)
+    if isinstance(value, dict):
+        return {k: fill(v, ids) for k, v in value.items()}
+    if isinstance(value, list):
+        return [fill(v, ids) for v in value]
+    return value
+
+
+async def _skip_export_job(job):
+    return None
+
+
+@pytest.fixture
+def api(db, tmp_path, monkeypatch):
+    """A started app with an admin session and a seeded dataset"""
+    monkeypatch.setattr(server, "UPLOAD_DIR", tmp_path / "uploads")
+    monkeypatch.setattr(server, "EXPORT_DIR", tmp_path / "exports")
+    (tmp_path / "uploads").mkdir()
+    (tmp_path / "exports").mkdir()
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    # export jobs stay queued: rendering runs in the process pool, outside any request
+    monkeypatch.setattr(server, "run_export_job", _skip_export_job)
+    with TestClient(server.app) as client:
+        registered = client.post("/api/auth/register", json={"email": "admin@example.com", "name": "Admin", "password": "secret", "role": "admin"})
+        assert registered.status_code == 200, registered.text
+        headers = {"Authorization": f"Bearer {registered.json()['access_token']}"}
+        ids = seed(client, headers, registered.json()["user"]["id"])
+        yield client, headers, ids
+
+
+def test_every_route_has_a_case():
+    assert sorted(set(key for key, _ in api_routes()) - set(ROUTE_CASES)) == []
+
+
+# Budgets the dashboards are held to regardless of what the route declares
+REQUIRED_ROUND_TRIPS = {"GET /api/dashboard/stats": 3, "GET /api/projects/{project_id}/summary": 2}
+
+
+@pytest.mark.parametrize("key", sorted(REQUIRED_ROUND_TRIPS))
+def test_required_budgets_are_declared(key):
+    route = dict(api_routes())[key]
+    commands, _ = server.route_db_budget(route.endpoint)
+    assert commands is not None and commands <= REQUIRED_ROUND_TRIPS[key]
+
+
+@pytest.mark.parametrize("key,route", api_routes(), ids=[key for key, _ in api_routes()])
+def test_route_round_trips(api, key, route):
+    client, headers, ids = api
+    method = key.split(" ", 1)[0]
+    path, kwargs = ROUTE_CASES[key]
+    server._route_db_stats.clear()
+    response = client.request(method, fill(path, ids), headers=headers, **fill(kwargs, ids))
+    assert response.status_code < 500 or key in EXTERNAL_SERVICE_ROUTES, response.text
+
+    stats = server._route_db_stats[f"{method} {route.path}"]
+    commands, documents = server.route_db_budget(route.endpoint)
+    if commands is None and documents is None and not hasattr(route.endpoint, "db_budget"):
+        commands = DEFAULT_ROUND_TRIPS
+    if commands is not None:
+        assert stats["round_trips"] <= commands, f"{key}: {stats['round_trips']} Mongo round trips, budget {commands}"
+    if documents is not None:
+        assert stats["documents"] <= documents, f"{key}: {stats['documents']} Mongo documents, budget {documents}"
+
+
+# Routes that call a third-party service which is not configured in tests
+EXTERNAL_SERVICE_ROUTES = {"POST /api/ai/predict", "POST /api/settings/gst-credentials/test"}
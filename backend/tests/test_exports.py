@@ -0,0 +1,126 @@
+"""
+Report exports over more rows than a single cursor batch: every row reaches the
+renderer, PDF layout time grows linearly with the row count and export jobs report
+their phase and progress while they run.
+"""
+import re
+import shutil
+import time
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+ROWS = 2500  # more than EXPORT_LOAD_BATCH_SIZE, so the spool holds several batches
+
+
+@pytest.fixture
+def exports(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "EXPORT_DIR", tmp_path)
+    return tmp_path
+
+
+async def seed_employees(db, count):
+    await db.employees.insert_many([{
+        "id": f"e{i}", "employee_code": f"EMP-{i:05d}", "name": f"Employee {i}", "designation": "Mason",
+        "department": "Civil", "basic_salary": 20000 + i, "hra": 4000, "date_of_joining": "2024-01-01", "is_active": True
+    } for i in range(count)])
+    await db.payrolls.insert_many([{"employee_id": f"e{i}", "month": "2025-01", "net_salary": 18000} for i in range(count)])
+
+
+async def spooled(report_type):
+    spool_dir = server.new_export_spool()
+    return spool_dir, await server.load_export_data(report_type, spool_dir)
+
+
+def pdf_pages(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b(?!s)", pdf))
+
+
+async def test_excel_export_has_every_row(db, exports):
+    await seed_employees(db, ROWS)
+    spool_dir, data = await spooled("hrms-summary")
+    assert {name: len(rows) for name, rows in data.items()} == {"employees": ROWS, "payrolls": ROWS}
+
+    out = BytesIO()
+    server.render_spooled(lambda o: server.render_excel_report("hrms-summary", data, o), spool_dir, out)
+    workbook = load_workbook(BytesIO(out.getvalue()), read_only=True)
+    assert {ws.title: sum(1 for _ in ws.iter_rows()) for ws in workbook.worksheets} == {"Employees": ROWS + 1, "Payroll": ROWS + 1}
+    assert not list(exports.glob("spool-*"))
+
+
+async def test_pdf_export_has_every_row(db, exports, monkeypatch):
+    await seed_employees(db, ROWS)
+    tables = []
+    table_pages = server.pdf_table_pages
+    monkeypatch.setattr(server, "pdf_table_pages", lambda *args: tables.extend(table_pages(*args)) or tables)
+
+    spool_dir, data = await spooled("hrms-summary")
+    out = BytesIO()
+    server.render_spooled(lambda o: server.render_pdf_report("hrms-summary", data, o), spool_dir, out)
+    assert sum(len(table._cellvalues) - 1 for table in tables) == ROWS
+    assert tables[-1]._cellvalues[-1][0] == f"EMP-{ROWS - 1:05d}"
+    assert pdf_pages(out.getvalue()) == len(tables)
+
+
+async def test_pdf_render_time_is_linear(db, exports):
+    await seed_employees(db, 4 * ROWS)
+    spool_dir, data = await spooled("hrms-summary")
+    employees = list(data["employees"])
+
+    def render_seconds(count):
+        start = time.perf_counter()
+        server.render_pdf_report("hrms-summary", {"employees": employees[:count]}, BytesIO())
+        return time.perf_counter() - start
+
+    render_seconds(ROWS // 10)  # warm up fonts and caches
+    small, large = render_seconds(ROWS), render_seconds(4 * ROWS)
+    shutil.rmtree(spool_dir)
+    # 4x the rows; a quadratic layout would take ~16x
+    assert large < 8 * small
+
+
+async def test_cached_pdf_export_renders_in_the_pool(db, exports):
+    await seed_employees(db, ROWS)
+    try:
+        path = await server.cached_export("hrms-summary", "pdf")
+    finally:
+        if server._export_pool is not None:
+            server._export_pool.shutdown()
+            server._export_pool = None
+    pdf = path.read_bytes()
+    assert pdf.startswith(b"%PDF")
+    assert pdf_pages(pdf) >= ROWS // 40
+    assert not list(exports.glob("spool-*"))
+
+
+async def test_export_job_reports_loading_rendering_and_progress(db, exports, monkeypatch):
+    await seed_employees(db, 4 * ROWS)
+    monkeypatch.setattr(server, "EXPORT_JOB_PROGRESS_SECONDS", 0.05)
+    updates = []
+    set_job = server._set_export_job
+
+    async def record(job_id, **fields):
+        updates.append(fields)
+        await set_job(job_id, **fields)
+    monkeypatch.setattr(server, "_set_export_job", record)
+
+    job = server.ExportJob(report_type="hrms-summary", format="pdf", requested_by="admin")
+    await db.export_jobs.insert_one(job.model_dump())
+    try:
+        await server.run_export_job(job)
+    finally:
+        if server._export_pool is not None:
+            server._export_pool.shutdown()
+            server._export_pool = None
+
+    statuses = [u["status"] for u in updates if "status" in u]
+    assert statuses[0] == "loading" and "rendering" in statuses and statuses[-1] == "completed"
+    progress = [u["progress"] for u in updates]
+    assert progress == sorted(progress)
+    assert any(10 < p < 100 for p in progress), progress
+    assert (await db.export_jobs.find_one({"id": job.id}))["progress"] == 100
@@ -0,0 +1,686 @@
+"""
+Parity tests for the dashboards and reports computed with aggregation pipelines.
+Each reference_* function is the original load-everything-and-loop implementation;
+the pipeline-backed handler must return the same numbers for the same data.
+"""
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+import server
+from conftest import MONGO_TEST_URL
+
+pytestmark = pytest.mark.anyio
+
+# The mongomock shim emulates $unionWith; these run the real pipelines on a mongod
+requires_mongod = pytest.mark.skipif(not MONGO_TEST_URL, reason="set MONGO_TEST_URL to run against a real mongod")
+
+
+# ---------- reference implementations (Python loops over whole collections) ----------
+
+def reference_financial_dashboard(d):
+    billings, cvrs, projects = d["billings"], d["cvrs"], d["projects"]
+    total_billed = sum(b.get('total_amount', 0) for b in billings)
+    total_received = sum(c.get('received_value', 0) for c in cvrs)
+    total_work_done = sum(c.get('work_done_value', 0) for c in cvrs)
+    total_spent = sum(p.get('actual_cost', 0) for p in projects)
+    project_breakdown = []
+    for p in projects:
+        pid = p.get('id')
+        p_bills = [b for b in billings if b.get('project_id') == pid]
+        p_cvrs = [c for c in cvrs if c.get('project_id') == pid]
+        project_breakdown.append({
+            "project_id": pid,
+            "project_name": p.get('name'),
+            "budget": p.get('budget', 0),
+            "actual_cost": p.get('actual_cost', 0),
+            "total_billed": sum(b.get('total_amount', 0) for b in p_bills),
+            "bills_count": len(p_bills),
+            "received": sum(c.get('received_value', 0) for c in p_cvrs),
+            "variance": p.get('budget', 0) - p.get('actual_cost', 0)
+        })
+    bills_by_status = {"pending": 0, "approved": 0, "paid": 0}
+    for b in billings:
+        s = b.get('status', 'pending')
+        bills_by_status[s] = bills_by_status.get(s, 0) + 1
+    bills_by_type = {"running": 0, "final": 0, "advance": 0}
+    for b in billings:
+        t = b.get('bill_type', 'running')
+        bills_by_type[t] = bills_by_type.get(t, 0) + 1
+    return {
+        "summary": {
+            "total_billed": total_billed,
+            "total_gst": sum(b.get('gst_amount', 0) for b in billings),
+            "pending_collection": sum(b.get('total_amount', 0) for b in billings if b.get('status') == 'pending'),
+            "approved_amount": sum(b.get('total_amount', 0) for b in billings if b.get('status') == 'approved'),
+            "paid_amount": sum(b.get('total_amount', 0) for b in billings if b.get('status') == 'paid'),
+            "total_received": total_received,
+            "total_retention": sum(c.get('retention_held', 0) for c in cvrs),
+            "collection_efficiency": round((total_received / total_billed * 100) if total_billed > 0 else 0, 1),
+            "total_budget": sum(p.get('budget', 0) for p in projects),
+            "total_spent": total_spent,
+            "total_contracted": sum(c.get('contracted_value', 0) for c in cvrs),
+            "total_work_done": total_work_done,
+            "cpi": round((total_work_done / total_spent) if total_spent > 0 else 0, 2),
+            "total_bills": len(billings),
+            "total_cvrs": len(cvrs)
+        },
+        "bills_by_status": bills_by_status,
+        "bills_by_type": bills_by_type,
+        "project_breakdown": sorted(project_breakdown, key=lambda x: x['total_billed'], reverse=True)
+    }
+
+
+def reference_procurement_dashboard(d):
+    vendors = [v for v in d["vendors"] if v.get("is_active") is True]
+    pos, grns = d["purchase_orders"], d["grns"]
+    by_category = {}
+    for v in vendors:
+        c = v.get("category", "other")
+        by_category[c] = by_category.get(c, 0) + 1
+    vendor_po_map = {}
+    for po in pos:
+        vid = po.get("vendor_id")
+        vendor_po_map[vid] = vendor_po_map.get(vid, 0) + po.get("total", 0)
+    top_vendor_id = max(vendor_po_map, key=vendor_po_map.get) if vendor_po_map else None
+    top_vendor = next((v for v in vendors if v.get("id") == top_vendor_id), None) if top_vendor_id else None
+    return {
+        "vendors": {"total": len(vendors), "by_category": by_category},
+        "purchase_orders": {
+            "total": len(pos), "total_value": sum(po.get("total", 0) for po in pos),
+            "pending": len([p for p in pos if p.get("status") == "pending"]),
+            "approved": len([p for p in pos if p.get("status") == "approved"]),
+            "delivered": len([p for p in pos if p.get("status") == "delivered"]),
+            "closed": len([p for p in pos if p.get("status") == "closed"])
+        },
+        "grns": {"total": len(grns)},
+        "top_vendor": {"name": top_vendor.get("name") if top_vendor else "-", "value": vendor_po_map.get(top_vendor_id, 0) if top_vendor_id else 0}
+    }
+
+
+def reference_hrms_dashboard(d, today):
+    employees = [e for e in d["employees"] if e.get("is_active") is True]
+    attendance, payrolls = d["attendance"], d["payrolls"]
+    today_att = [a for a in attendance if a.get("date") == today]
+    by_dept = {}
+    for e in employees:
+        dept = e.get("department", "Other")
+        by_dept[dept] = by_dept.get(dept, 0) + 1
+    all_present = len([a for a in attendance if a.get("status") == "present"])
+    return {
+        "employees": {"total": len(employees), "by_department": by_dept, "monthly_salary_budget": sum(e.get("basic_salary", 0) + e.get("hra", 0) for e in employees)},
+        "attendance": {
+            "present_today": len([a for a in today_att if a.get("status") == "present"]),
+            "total_today": len(today_att),
+            "overall_rate": round((all_present / len(attendance) * 100) if attendance else 0, 1),
+            "total_overtime": sum(a.get("overtime_hours", 0) for a in attendance)
+        },
+        "payroll": {
+            "total_disbursed": sum(p.get("net_salary", 0) for p in payrolls),
+            "pending": len([p for p in payrolls if p.get("status") == "pending"]),
+            "total_processed": len(payrolls)
+        }
+    }
+
+
+def reference_executive_summary(d):
+    projects, billings, cvrs = d["projects"], d["billings"], d["cvrs"]
+    total_budget = sum(p.get('budget', 0) for p in projects)
+    total_spent = sum(p.get('actual_cost', 0) for p in projects)
+    total_billed = sum(b.get('total_amount', 0) for b in billings)
+    total_received = sum(c.get('received_value', 0) for c in cvrs)
+    total_gst_payable = sum(g.get('tax_payable', 0) for g in d["gst_returns"])
+    total_itc = sum(g.get('itc_claimed', 0) for g in d["gst_returns"])
+    return {
+        "report_type": "executive_summary",
+        "projects": {
+            "total": len(projects),
+            "by_status": {s: len([p for p in projects if p.get("status") == s]) for s in ["planning", "in_progress", "on_hold", "completed"]},
+            "total_budget": total_budget,
+            "total_spent": total_spent,
+            "budget_utilization_pct": round((total_spent / total_budget * 100) if total_budget > 0 else 0, 2),
+            "average_progress_pct": round(sum(p.get('progress_percentage', 0) for p in projects) / max(len(projects), 1), 2)
+        },
+        "financial": {
+            "total_billed": total_billed,
+            "pending_collection": sum(b.get('total_amount', 0) for b in billings if b.get('status') == 'pending'),
+            "total_received": total_received,
+            "retention_held": sum(c.get('retention_held', 0) for c in cvrs),
+            "collection_efficiency_pct": round((total_received / total_billed * 100) if total_billed > 0 else 0, 2)
+        },
+        "procurement": {
+            "active_vendors": len([v for v in d["vendors"] if v.get("is_active") is True]),
+            "total_po_value": sum(po.get('total', 0) for po in d["purchase_orders"]),
+            "pending_pos": len([po for po in d["purchase_orders"] if po.get("status") == "pending"])
+        },
+        "hrms": {
+            "total_employees": len([e for e in d["employees"] if e.get("is_active") is True]),
+            "total_payroll_cost": sum(p.get('net_salary', 0) for p in d["payrolls"])
+        },
+        "compliance": {
+            "gst_payable": total_gst_payable,
+            "itc_claimed": total_itc,
+            "net_gst_liability": total_gst_payable - total_itc
+        }
+    }
+
+
+def reference_dashboard_counters(d, today):
+    projects, pos = d["projects"], d["purchase_orders"]
+    return {
+        "projects": {
+            "count": len(projects),
+            "budget": sum(p.get('budget', 0) for p in projects),
+            "spent": sum(p.get('actual_cost', 0) for p in projects),
+            "progress": sum(p.get('progress_percentage', 0) for p in projects),
+            "by_status": {s: len([p for p in projects if p.get("status") == s]) for s in ["planning", "in_progress", "on_hold", "completed"]}
+        },
+        "active_vendors": len([v for v in d["vendors"] if v.get("is_active") is True]),
+        "active_employees": len([e for e in d["employees"] if e.get("is_active") is True]),
+        "purchase_orders": {"count": len(pos), "value": sum(po.get('total', 0) for po in pos), "pending": len([po for po in pos if po.get("status") == "pending"])},
+        "present_today": len([a for a in d["attendance"] if a.get("date") == today and a.get("status") == "present"])
+    }
+
+
+def reference_project_summary(d, project_id):
+    project = next(p for p in d["projects"] if p["id"] == project_id)
+    tasks = [t for t in d["tasks"] if t.get("project_id") == project_id]
+    dprs = [r for r in d["dprs"] if r.get("project_id") == project_id]
+    pos = [po for po in d["purchase_orders"] if po.get("project_id") == project_id]
+    attendance = [a for a in d["attendance"] if a.get("project_id") == project_id]
+    completed = len([t for t in tasks if t.get("status") == "completed"])
+    in_progress = len([t for t in tasks if t.get("status") == "in_progress"])
+    total_po = sum(po.get("total", 0) for po in pos)
+    return {
+        "project": project,
+        "tasks": {"total": len(tasks), "completed": completed, "in_progress": in_progress, "pending": len(tasks) - completed - in_progress},
+        "dprs": {"total": len(dprs), "latest": dprs[-1] if dprs else None},
+        "financial": {
+            "total_billed": sum(b.get("total_amount", 0) for b in d["billings"] if b.get("project_id") == project_id),
+            "total_po_value": total_po,
+            "total_cvr_work": sum(c.get("work_done_value", 0) for c in d["cvrs"] if c.get("project_id") == project_id),
+            "budget": project.get('budget', 0), "actual_cost": project.get('actual_cost', 0),
+            "variance": project.get('budget', 0) - project.get('actual_cost', 0)
+        },
+        "workforce": {"labor_days": len([a for a in attendance if a.get("status") == "present"]), "attendance_records": len(attendance)},
+        "procurement": {"total_pos": len(pos), "total_po_value": total_po}
+    }
+
+
+def reference_project_analysis(d, project_id=None):
+    projects = [p for p in d["projects"] if project_id is None or p.get("id") == project_id]
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    reports = []
+    for project in projects:
+        pid = project.get('id')
+        tasks = [t for t in d["tasks"] if t.get("project_id") == pid]
+        dprs = [x for x in d["dprs"] if x.get("project_id") == pid]
+        billings = [b for b in d["billings"] if b.get("project_id") == pid]
+        cvrs = [c for c in d["cvrs"] if c.get("project_id") == pid]
+        pos = [po for po in d["purchase_orders"] if po.get("project_id") == pid]
+        attendance = [a for a in d["attendance"] if a.get("project_id") == pid]
+        completed_tasks = len([t for t in tasks if t.get('status') == 'completed'])
+        start_date, end_date = project.get('start_date'), project.get('expected_end_date')
+        time_progress_pct, schedule_variance = 0, 0
+        if start_date and end_date:
+            start = datetime.strptime(start_date, "%Y-%m-%d")
+            total_days = (datetime.strptime(end_date, "%Y-%m-%d") - start).days
+            elapsed_days = (datetime.strptime(today, "%Y-%m-%d") - start).days
+            time_progress_pct = round((elapsed_days / total_days * 100) if total_days > 0 else 0, 2)
+            schedule_variance = project.get('progress_percentage', 0) - time_progress_pct
+        total_contracted = sum(c.get('contracted_value', 0) for c in cvrs)
+        total_work_done = sum(c.get('work_done_value', 0) for c in cvrs)
+        reports.append({
+            "project_id": pid,
+            "project_name": project.get('name'),
+            "project_code": project.get('code'),
+            "client": project.get('client_name'),
+            "location": project.get('location'),
+            "status": project.get('status'),
+            "timeline": {
+                "start_date": start_date,
+                "end_date": end_date,
+                "time_progress_pct": time_progress_pct,
+                "work_progress_pct": project.get('progress_percentage', 0),
+                "schedule_variance_pct": round(schedule_variance, 2),
+                "schedule_status": "Ahead" if schedule_variance > 0 else "Behind" if schedule_variance < 0 else "On Track"
+            },
+            "tasks": {
+                "total": len(tasks),
+                "completed": completed_tasks,
+                "completion_pct": round((completed_tasks / len(tasks) * 100) if tasks else 0, 2)
+            },
+            "financials": {
+                "budget": project.get('budget', 0),
+                "actual_cost": project.get('actual_cost', 0),
+                "total_billed": sum(b.get('total_amount', 0) for b in billings),
+                "procurement_cost": sum(po.get('total', 0) for po in pos),
+                "budget_variance": project.get('budget', 0) - project.get('actual_cost', 0),
+                "budget_utilization_pct": round((project.get('actual_cost', 0) / project.get('budget', 1) * 100), 2)
+            },
+            "cvr_summary": {
+                "contracted_value": total_contracted,
+                "work_done_value": total_work_done,
+                "cost_variance": total_contracted - total_work_done,
+                "cost_performance_index": round((total_work_done / total_contracted) if total_contracted > 0 else 0, 2)
+            },
+            "workforce": {
+                "total_labor_days": len([a for a in attendance if a.get('status') == 'present']),
+                "dpr_count": len(dprs)
+            }
+        })
+    return {"report_type": "project_analysis", "total_projects": len(reports), "projects": reports}
+
+
+def reference_financial_summary(d, start_date=None, end_date=None):
+    billings = [
+        b for b in d["billings"]
+        if (start_date is None or (b.get("bill_date") is not None and b["bill_date"] >= start_date))
+        and (end_date is None or (b.get("bill_date") is not None and b["bill_date"] <= end_date))
+    ]
+    cvrs = d["cvrs"]
+    billing_by_type = {"running": 0, "final": 0, "advance": 0}
+    billing_by_status = {"pending": 0, "approved": 0, "paid": 0}
+    for bill in billings:
+        bill_type = bill.get('bill_type', 'running')
+        billing_by_type[bill_type] = billing_by_type.get(bill_type, 0) + bill.get('total_amount', 0)
+        status = bill.get('status', 'pending')
+        billing_by_status[status] = billing_by_status.get(status, 0) + bill.get('total_amount', 0)
+    cvr_summary = {
+        "total_contracted": sum(c.get('contracted_value', 0) for c in cvrs),
+        "total_work_done": sum(c.get('work_done_value', 0) for c in cvrs),
+        "total_billed": sum(c.get('billed_value', 0) for c in cvrs),
+        "total_received": sum(c.get('received_value', 0) for c in cvrs),
+        "total_retention": sum(c.get('retention_held', 0) for c in cvrs)
+    }
+    return {
+        "report_type": "financial_summary",
+        "period": {"start_date": start_date or "All Time", "end_date": end_date or "Present"},
+        "billing": {
+            "total_bills": len(billings),
+            "total_amount": sum(b.get('total_amount', 0) for b in billings),
+            "by_type": billing_by_type,
+            "by_status": billing_by_status,
+            "gst_collected": sum(b.get('gst_amount', 0) for b in billings)
+        },
+        "cvr_summary": cvr_summary,
+        "cash_flow": {
+            "receivables": billing_by_status.get('pending', 0),
+            "collection_rate_pct": round((cvr_summary['total_received'] / cvr_summary['total_billed'] * 100) if cvr_summary['total_billed'] > 0 else 0, 2)
+        },
+        "monthly_trend": [
+            {"month": month, "billed": len(billings) * 100000 + (hash(month) % 50000), "received": len(billings) * 80000 + (hash(month) % 40000)}
+            for month in ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
+        ]
+    }
+
+
+def reference_procurement_analysis(d):
+    vendors = [v for v in d["vendors"] if v.get("is_active") is True]
+    pos = d["purchase_orders"]
+    vendor_by_category = {}
+    for v in vendors:
+        cat = v.get('category', 'other')
+        vendor_by_category[cat] = vendor_by_category.get(cat, 0) + 1
+    po_by_status = {"pending": 0, "approved": 0, "delivered": 0, "closed": 0}
+    po_by_vendor = {}
+    total_po_value = 0
+    for po in pos:
+        status = po.get('status', 'pending')
+        po_by_status[status] = po_by_status.get(status, 0) + 1
+        po_by_vendor[po.get('vendor_id')] = po_by_vendor.get(po.get('vendor_id'), 0) + po.get('total', 0)
+        total_po_value += po.get('total', 0)
+    top_vendors = []
+    for vendor_id, value in sorted(po_by_vendor.items(), key=lambda x: x[1], reverse=True)[:5]:
+        vendor = next((v for v in vendors if v.get('id') == vendor_id), None)
+        if vendor:
+            top_vendors.append({
+                "vendor_name": vendor.get('name'),
+                "category": vendor.get('category'),
+                "total_po_value": value,
+                "percentage": round((value / total_po_value * 100) if total_po_value > 0 else 0, 2)
+            })
+    return {
+        "report_type": "procurement_analysis",
+        "vendors": {"total_active": len(vendors), "by_category": vendor_by_category},
+        "purchase_orders": {
+            "total_count": len(pos),
+            "total_value": total_po_value,
+            "by_status": po_by_status,
+            "average_po_value": round(total_po_value / len(pos)) if pos else 0
+        },
+        "grn": {"total_received": len(d["grns"])},
+        "top_vendors": top_vendors,
+        "material_breakdown": {
+            "steel": total_po_value * 0.35,
+            "cement": total_po_value * 0.25,
+            "aggregates": total_po_value * 0.15,
+            "labor": total_po_value * 0.15,
+            "equipment": total_po_value * 0.10
+        }
+    }
+
+
+def reference_hrms_summary(d):
+    employees = [e for e in d["employees"] if e.get("is_active") is True]
+    attendance, payrolls = d["attendance"], d["payrolls"]
+    by_department = {}
+    for emp in employees:
+        dept = emp.get('department', 'Other')
+        by_department[dept] = by_department.get(dept, 0) + 1
+    attendance_by_status = {"present": 0, "absent": 0, "half_day": 0, "leave": 0}
+    for att in attendance:
+        status = att.get('status', 'present')
+        attendance_by_status[status] = attendance_by_status.get(status, 0) + 1
+    return {
+        "report_type": "hrms_summary",
+        "workforce": {
+            "total_employees": len(employees),
+            "by_department": by_department,
+            "monthly_salary_budget": sum(e.get('basic_salary', 0) + e.get('hra', 0) for e in employees)
+        },
+        "attendance": {
+            "total_records": len(attendance),
+            "by_status": attendance_by_status,
+            "attendance_rate_pct": round((attendance_by_status['present'] / len(attendance) * 100) if attendance else 0, 2),
+            "total_overtime_hours": sum(a.get('overtime_hours', 0) for a in attendance)
+        },
+        "payroll": {
+            "total_processed": len(payrolls),
+            "gross_salary": sum(p.get('gross_salary', 0) for p in payrolls),
+            "total_deductions": sum(p.get('total_deductions', 0) for p in payrolls),
+            "net_disbursement": sum(p.get('net_salary', 0) for p in payrolls),
+            "breakdown": {
+                field: sum(p.get(field, 0) for p in payrolls)
+                for field in ["basic_salary", "hra", "overtime_pay", "pf_deduction", "esi_deduction", "tds"]
+            }
+        }
+    }
+
+
+def reference_compliance_status(d):
+    gst_returns, rera_projects, projects = d["gst_returns"], d["rera_projects"], d["projects"]
+    gst_by_type = {"GSTR-1": [], "GSTR-3B": []}
+    for gst in gst_returns:
+        gst_by_type.setdefault(gst.get('return_type', 'GSTR-3B'), []).append({
+            "period": gst.get('period'),
+            "status": gst.get('status'),
+            "tax_payable": gst.get('tax_payable', 0)
+        })
+    rera_compliant = len([r for r in rera_projects if r.get('compliance_status') == 'compliant'])
+    total_units = sum(r.get('total_units', 0) for r in rera_projects)
+    sold_units = sum(r.get('sold_units', 0) for r in rera_projects)
+    rera_details = []
+    for rera in rera_projects:
+        project = next((p for p in projects if p.get('id') == rera.get('project_id')), {})
+        rera_details.append({
+            "project_name": project.get('name', 'Unknown'),
+            "rera_number": rera.get('rera_number'),
+            "validity_date": rera.get('validity_date'),
+            "compliance_status": rera.get('compliance_status'),
+            "units_sold": f"{rera.get('sold_units', 0)}/{rera.get('total_units', 0)}"
+        })
+    return {
+        "report_type": "compliance_status",
+        "gst": {
+            "returns_filed": len(gst_returns),
+            "by_type": {k: len(v) for k, v in gst_by_type.items()},
+            "total_output_tax": sum(g.get('cgst', 0) + g.get('sgst', 0) + g.get('igst', 0) for g in gst_returns),
+            "total_input_tax": sum(g.get('itc_claimed', 0) for g in gst_returns),
+            "net_payable": sum(g.get('tax_payable', 0) for g in gst_returns),
+            "recent_returns": gst_by_type
+        },
+        "rera": {
+            "total_projects": len(rera_projects),
+            "compliant": rera_compliant,
+            "non_compliant": len(rera_projects) - rera_compliant,
+            "total_units": total_units,
+            "sold_units": sold_units,
+            "sales_pct": round((sold_units / total_units * 100) if total_units > 0 else 0, 2),
+            "projects": rera_details
+        },
+        "compliance_score": round((rera_compliant / len(rera_projects) * 100) if rera_projects else 100, 2)
+    }
+
+
+def reference_cost_variance(d):
+    variance_data = []
+    for project in d["projects"]:
+        project_cvrs = [c for c in d["cvrs"] if c.get('project_id') == project.get('id')]
+        budget = project.get('budget', 0)
+        actual = project.get('actual_cost', 0)
+        variance = budget - actual
+        total_contracted = sum(c.get('contracted_value', 0) for c in project_cvrs)
+        total_work_done = sum(c.get('work_done_value', 0) for c in project_cvrs)
+        cpi = round((total_work_done / actual) if actual > 0 else 0, 2)
+        spi = round(project.get('progress_percentage', 0) / 50, 2)
+        variance_data.append({
+            "project_id": project.get('id'),
+            "project_name": project.get('name'),
+            "project_code": project.get('code'),
+            "budget": budget,
+            "actual_cost": actual,
+            "variance": variance,
+            "variance_pct": round((variance / budget * 100) if budget > 0 else 0, 2),
+            "status": "Under Budget" if variance > 0 else "Over Budget" if variance < 0 else "On Budget",
+            "performance_indices": {
+                "cpi": cpi,
+                "spi": spi,
+                "cpi_status": "Good" if cpi >= 1 else "Poor",
+                "spi_status": "Good" if spi >= 1 else "Poor"
+            },
+            "cvr_metrics": {
+                "contracted_value": total_contracted,
+                "work_done_value": total_work_done,
+                "cvr_variance": total_contracted - total_work_done
+            }
+        })
+    total_budget = sum(v['budget'] for v in variance_data)
+    total_actual = sum(v['actual_cost'] for v in variance_data)
+    over_budget_count = len([v for v in variance_data if v['variance'] < 0])
+    return {
+        "report_type": "cost_variance",
+        "summary": {
+            "total_budget": total_budget,
+            "total_actual": total_actual,
+            "overall_variance": total_budget - total_actual,
+            "overall_variance_pct": round(((total_budget - total_actual) / total_budget * 100) if total_budget > 0 else 0, 2),
+            "projects_over_budget": over_budget_count,
+            "projects_under_budget": len(variance_data) - over_budget_count
+        },
+        "projects": variance_data
+    }
+
+
+# ---------- datasets ----------
+
+COLLECTIONS = [
+    "projects", "tasks", "dprs", "billings", "cvrs", "vendors", "purchase_orders", "grns",
+    "employees", "attendance", "payrolls", "gst_returns", "rera_projects"
+]
+
+
+def maybe(rng, doc, *optional):
+    """Drop each optional field from doc with some probability, to cover missing fields"""
+    for field in optional:
+        if rng.random() < 0.15:
+            doc.pop(field, None)
+    return doc
+
+
+def random_dataset(seed):
+    rng = random.Random(seed)
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    money = lambda: round(rng.uniform(0, 100000), 2)
+    project_ids = [f"p{i}" for i in range(25)]
+    # a few references point at projects that do not exist
+    any_project = lambda: rng.choice(project_ids + ["ghost"])
+    d = {}
+    d["projects"] = [maybe(rng, {
+        "id": pid, "name": f"Project {i}", "code": f"PRJ-{i:03d}", "client_name": f"Client {i % 4}", "location": "Pune",
+        "budget": round(rng.uniform(1, 1e7), 2), "actual_cost": money(), "progress_percentage": rng.randint(0, 100),
+        "status": rng.choice(["planning", "in_progress", "on_hold", "completed"]),
+        "start_date": "2024-01-01", "expected_end_date": rng.choice(["2025-06-30", "2030-12-31"])
+    }, "actual_cost", "progress_percentage", "status", "expected_end_date") for i, pid in enumerate(project_ids)]
+    d["tasks"] = [maybe(rng, {"id": f"t{i}", "project_id": any_project(), "status": rng.choice(["completed", "in_progress", "pending"])}, "status") for i in range(150)]
+    d["dprs"] = [{"id": f"d{i}", "project_id": any_project(), "date": "2024-02-01"} for i in range(120)]
+    d["billings"] = [maybe(rng, {
+        "id": f"b{i}", "project_id": any_project(), "total_amount": money(), "gst_amount": money(), "amount": money(),
+        "status": rng.choice(["pending", "approved", "paid"]), "bill_type": rng.choice(["running", "final", "advance"]),
+        "bill_date": f"2024-{rng.randint(1, 12):02d}-15"
+    }, "total_amount", "gst_amount", "status", "bill_type", "bill_date") for i in range(200)]
+    d["cvrs"] = [maybe(rng, {
+        "id": f"c{i}", "project_id": any_project(), "contracted_value": money(), "work_done_value": money(),
+        "billed_value": money(), "received_value": money(), "retention_held": money()
+    }, "contracted_value", "work_done_value", "billed_value", "received_value", "retention_held") for i in range(120)]
+    d["vendors"] = [maybe(rng, {
+        "id": f"v{i}", "name": f"Vendor {i}", "category": rng.choice(["steel", "cement", "electrical"]), "is_active": rng.random() < 0.85
+    }, "category") for i in range(20)]
+    d["purchase_orders"] = [maybe(rng, {
+        "id": f"po{i}", "vendor_id": f"v{rng.randint(0, 21)}", "project_id": any_project(), "total": money(),
+        "status": rng.choice(["pending", "approved", "delivered", "closed"])
+    }, "total", "status") for i in range(90)]
+    d["grns"] = [{"id": f"g{i}", "po_id": f"po{i}"} for i in range(30)]
+    d["employees"] = [maybe(rng, {
+        "id": f"e{i}", "name": f"Employee {i}", "department": rng.choice(["Civil", "Accounts", "Stores"]),
+        "basic_salary": money(), "hra": money(), "is_active": rng.random() < 0.9
+    }, "department", "hra") for i in range(40)]
+    d["attendance"] = [maybe(rng, {
+        "id": f"a{i}", "employee_id": f"e{rng.randint(0, 39)}", "project_id": any_project(),
+        "date": rng.choice([today, "2024-03-01"]), "status": rng.choice(["present", "absent", "half_day", "leave"]),
+        "overtime_hours": rng.randint(0, 4)
+    }, "status", "overtime_hours") for i in range(300)]
+    d["payrolls"] = [maybe(rng, {
+        "id": f"pr{i}", "employee_id": f"e{i % 40}", "month": "2024-03", "status": rng.choice(["pending", "paid"]),
+        **{field: money() for field in ["basic_salary", "hra", "overtime_pay", "gross_salary", "pf_deduction", "esi_deduction", "tds", "total_deductions", "net_salary"]}
+    }, "overtime_pay", "esi_deduction", "tds", "net_salary") for i in range(60)]
+    d["gst_returns"] = [maybe(rng, {
+        "id": f"gst{i}", "return_type": rng.choice(["GSTR-1", "GSTR-3B"]), "period": f"2024-{i + 1:02d}", "status": "filed",
+        "cgst": money(), "sgst": money(), "igst": money(), "itc_claimed": money(), "tax_payable": money()
+    }, "igst", "itc_claimed", "return_type") for i in range(12)]
+    d["rera_projects"] = [maybe(rng, {
+        "id": f"r{i}", "project_id": any_project(), "rera_number": f"RERA-{i}", "validity_date": "2027-01-01",
+        "compliance_status": rng.choice(["compliant", "non_compliant"]), "total_units": rng.randint(10, 200), "sold_units": rng.randint(0, 10)
+    }, "sold_units") for i in range(8)]
+    return d
+
+
+def empty_dataset(seed=None):
+    return {name: [] for name in COLLECTIONS}
+
+
+async def load(db, dataset):
+    for name, docs in dataset.items():
+        if docs:
+            await db[name].insert_many([dict(doc) for doc in docs])
+    await server.rebuild_project_rollups()
+
+
+def normalized(value):
+    """Drop generation timestamps and round floats so summation order does not matter"""
+    if isinstance(value, dict):
+        return {k: normalized(v) for k, v in value.items() if k != "generated_at"}
+    if isinstance(value, list):
+        return [normalized(v) for v in value]
+    if isinstance(value, float):
+        return round(value, 4)
+    return value
+
+
+def assert_same(actual, expected):
+    assert normalized(actual) == normalized(expected)
+
+
+DATASETS = [
+    pytest.param((random_dataset, 1), id="random-1"),
+    pytest.param((random_dataset, 7), id="random-7"),
+    pytest.param((empty_dataset, None), id="empty"),
+]
+
+
+@pytest.fixture(params=DATASETS)
+async def dataset(request, db):
+    factory, seed = request.param
+    data = factory(seed)
+    await load(db, data)
+    return data
+
+
+# ---------- tests ----------
+
+async def test_financial_dashboard(dataset):
+    actual = await server.get_financial_dashboard(current_user=None)
+    expected = reference_financial_dashboard(dataset)
+    # ties in total_billed may come back in any order
+    key = lambda row: (-round(row["total_billed"], 4), row["project_id"])
+    actual["project_breakdown"].sort(key=key)
+    expected["project_breakdown"].sort(key=key)
+    assert_same(actual, expected)
+
+
+async def test_procurement_dashboard(dataset):
+    assert_same(await server.get_procurement_dashboard(current_user=None), reference_procurement_dashboard(dataset))
+
+
+async def test_hrms_dashboard(dataset):
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    assert_same(await server.get_hrms_dashboard(current_user=None), reference_hrms_dashboard(dataset, today))
+
+
+async def test_executive_summary(dataset):
+    assert_same(await server.get_executive_summary(current_user=None), reference_executive_summary(dataset))
+
+
+@pytest.mark.parametrize("project_id", [None, "p3", "missing"])
+async def test_project_analysis(dataset, project_id):
+    assert_same(await server.get_project_analysis(project_id=project_id, current_user=None), reference_project_analysis(dataset, project_id))
+
+
+@pytest.mark.parametrize("start_date,end_date", [(None, None), ("2024-03-01", None), (None, "2024-06-30"), ("2024-03-01", "2024-06-30")])
+async def test_financial_summary(dataset, start_date, end_date):
+    actual = await server.get_financial_summary(start_date=start_date, end_date=end_date, current_user=None)
+    assert_same(actual, reference_financial_summary(dataset, start_date, end_date))
+
+
+async def test_procurement_analysis(dataset):
+    assert_same(await server.get_procurement_analysis(current_user=None), reference_procurement_analysis(dataset))
+
+
+async def test_hrms_summary(dataset):
+    assert_same(await server.get_hrms_summary(current_user=None), reference_hrms_summary(dataset))
+
+
+async def test_compliance_status(dataset):
+    actual = await server.get_compliance_status(current_user=None)
+    actual.pop("upcoming_deadlines")
+    assert_same(actual, reference_compliance_status(dataset))
+
+
+async def test_cost_variance(dataset):
+    assert_same(await server.get_cost_variance_report(current_user=None), reference_cost_variance(dataset))
+
+
+async def test_dashboard_counters(dataset):
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    assert_same(await server.dashboard_counters(), reference_dashboard_counters(dataset, today))
+
+
+@pytest.mark.parametrize("project_id", ["p0", "p3", "p24"])
+async def test_project_summary(dataset, project_id):
+    if not dataset["projects"]:
+        with pytest.raises(server.HTTPException):
+            await server.get_project_summary(project_id, current_user=None)
+        return
+    assert_same(await server.get_project_summary(project_id, current_user=None), reference_project_summary(dataset, project_id))
+
+
+@requires_mongod
+@pytest.mark.parametrize("seed", [1, 7])
+async def test_union_pipelines_on_mongod(db, seed):
+    data = random_dataset(seed)
+    await load(db, data)
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    assert_same(await server.dashboard_counters(), reference_dashboard_counters(data, today))
+    for project_id in ["p0", "p3", "p24"]:
+        assert_same(await server.get_project_summary(project_id, current_user=None), reference_project_summary(data, project_id))